@@ -5,6 +5,11 @@ from sqlalchemy import text
 
 from app.core.admin_auth import require_admin_basic
 from app.db import engine
+from app.core.etag import MATCH_SCENES, bump_scene_match_version, bump_version
+from app.core.events import SCENE_DELETED, SCENE_RELEASED, SCENE_UNRELEASED, match_events
+from app.core.match_stats import invalidate_match_stats
+from app.core.rating_queue import invalidate_scene_state
+from app.core.snapshots import thaw_scene
 
 
 admin_router = APIRouter(
@@ -23,15 +28,20 @@ def release_scene(scene_id: UUID):
                release_time = now()
          where scene_id = cast(:scene_id as uuid)
            and is_locked = false
-        returning scene_id, is_released, release_time
+        returning scene_id, match_id, is_released, release_time
     """)
 
     with engine.begin() as conn:
         row = conn.execute(sql, {"scene_id": str(scene_id)}).mappings().first()
-
         if row:
-            return dict(row)
+            bump_scene_match_version(conn, scene_id)
+
+    if row:
+        invalidate_scene_state(scene_id)
+        match_events.publish(row["match_id"], SCENE_RELEASED, dict(row))
+        return dict(row)
 
+    with engine.begin() as conn:
         # Differenzieren: nicht gefunden vs gelockt
         check = conn.execute(
             text("select is_locked from referee_ratings.scenes where scene_id = cast(:scene_id as uuid)"),
@@ -52,15 +62,20 @@ def unrelease_scene(scene_id: UUID):
                release_time = null
          where scene_id = cast(:scene_id as uuid)
            and is_locked = false
-        returning scene_id, is_released
+        returning scene_id, match_id, is_released
     """)
 
     with engine.begin() as conn:
         row = conn.execute(sql, {"scene_id": str(scene_id)}).mappings().first()
-
         if row:
-            return dict(row)
+            bump_scene_match_version(conn, scene_id)
+
+    if row:
+        invalidate_scene_state(scene_id)
+        match_events.publish(row["match_id"], SCENE_UNRELEASED, dict(row))
+        return dict(row)
 
+    with engine.begin() as conn:
         check = conn.execute(
             text("select is_locked from referee_ratings.scenes where scene_id = cast(:scene_id as uuid)"),
             {"scene_id": str(scene_id)},
@@ -78,15 +93,22 @@ def delete_scene(scene_id: UUID):
         delete from referee_ratings.scenes
          where scene_id = cast(:scene_id as uuid)
            and is_locked = false
-        returning scene_id
+        returning scene_id, match_id
     """)
 
     with engine.begin() as conn:
         row = conn.execute(sql, {"scene_id": str(scene_id)}).first()
-
         if row:
-            return
+            bump_version(conn, MATCH_SCENES, row[1])
+            thaw_scene(conn, scene_id, str(row[1]))
 
+    if row:
+        invalidate_match_stats(row[1])
+        invalidate_scene_state(scene_id)
+        match_events.publish(row[1], SCENE_DELETED, {"scene_id": row[0], "match_id": row[1]})
+        return
+
+    with engine.begin() as conn:
         check = conn.execute(
             text("select is_locked from referee_ratings.scenes where scene_id = cast(:scene_id as uuid)"),
             {"scene_id": str(scene_id)},
@@ -7,7 +7,10 @@ from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
 from sqlalchemy import text
 
+from app.core import invalidation
 from app.core.deps import require_admin
+from app.core.invalidation import invalidation_bus
+from app.core.schema import schema_registry
 from app.core.security import create_openapi_dev_token
 from app.db import engine
 
@@ -105,3 +108,11 @@ def create_dev_token(payload: DevTokenIn, request: Request, admin_user_id: UUID
         "expires_at": expires_at.isoformat(),
         "openapi_url": "/api/admin/openapi.json",
     }
+
+
+@router.post("/schema/refresh")
+def refresh_schema():
+    # Nach manuellen Migrationen: Spalten-Registry neu laden (andere Worker ueber den Cache-Bus)
+    schema_registry.refresh()
+    invalidation_bus.broadcast(invalidation.SCHEMA)
+    return {"ok": True, "loads": schema_registry.loads}
@@ -4,6 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import text
 
 from app.core.deps import require_admin
+from app.core.etag import ALL, MATCHES, bump_version
 from app.core.matches.provider_service import get_provider as get_matches_provider
 from app.db import engine
 
@@ -35,3 +36,4 @@ def delete_match(match_id: UUID):
             text("delete from referee_ratings.matches where match_id = :mid"),
             {"mid": str(match_id)},
         )
+        bump_version(conn, MATCHES, ALL)
@@ -12,6 +12,18 @@ from sqlalchemy import text
 from uuid import UUID
 
 from app.db import engine
+from app.core.etag import MATCH_SCENES, bump_scene_match_version, bump_version
+from app.core.events import (
+    SCENE_DELETED,
+    SCENE_LOCKED,
+    SCENE_RELEASED,
+    SCENE_UNLOCKED,
+    SCENE_UNRELEASED,
+    match_events,
+)
+from app.core.match_stats import invalidate_match_stats
+from app.core.rating_queue import invalidate_scene_state
+from app.core.snapshots import freeze_scene, thaw_scene
 from app.core.deps import require_admin
 from app.schemas.voice import VoiceSceneDraft
 
@@ -328,12 +340,16 @@ def release_scene(scene_id: UUID):
         set is_released = true,
             release_time = now()
         where scene_id = cast(:scene_id as uuid)
-        returning scene_id::text as scene_id, is_released, release_time
+        returning scene_id::text as scene_id, match_id::text as match_id, is_released, release_time
     """)
     with engine.begin() as conn:
         row = conn.execute(sql, {"scene_id": str(scene_id)}).mappings().first()
+        if row:
+            bump_scene_match_version(conn, scene_id)
     if not row:
         raise HTTPException(status_code=404, detail="Scene not found")
+    invalidate_scene_state(scene_id)
+    match_events.publish(row["match_id"], SCENE_RELEASED, dict(row))
     return dict(row)
 
 @router.post("/{scene_id}/unrelease")
@@ -343,12 +359,16 @@ def unrelease_scene(scene_id: UUID):
         set is_released = false,
             release_time = null
         where scene_id = cast(:scene_id as uuid)
-        returning scene_id::text as scene_id, is_released, release_time
+        returning scene_id::text as scene_id, match_id::text as match_id, is_released, release_time
     """)
     with engine.begin() as conn:
         row = conn.execute(sql, {"scene_id": str(scene_id)}).mappings().first()
+        if row:
+            bump_scene_match_version(conn, scene_id)
     if not row:
         raise HTTPException(status_code=404, detail="Scene not found")
+    invalidate_scene_state(scene_id)
+    match_events.publish(row["match_id"], SCENE_UNRELEASED, dict(row))
     return dict(row)
 
 @router.post("/{scene_id}/delete", status_code=204)
@@ -356,12 +376,18 @@ def delete_scene(scene_id: UUID):
     sql = text("""
         delete from referee_ratings.scenes
         where scene_id = cast(:scene_id as uuid)
-        returning scene_id::text as scene_id
+        returning scene_id::text as scene_id, match_id
     """)
     with engine.begin() as conn:
         row = conn.execute(sql, {"scene_id": str(scene_id)}).mappings().first()
+        if row:
+            bump_version(conn, MATCH_SCENES, row["match_id"])
+            thaw_scene(conn, scene_id, str(row["match_id"]))
     if not row:
         raise HTTPException(status_code=404, detail="Scene not found")
+    invalidate_match_stats(row["match_id"])
+    invalidate_scene_state(scene_id)
+    match_events.publish(row["match_id"], SCENE_DELETED, {"scene_id": row["scene_id"], "match_id": row["match_id"]})
 
 @router.post("/{scene_id}/lock")
 def lock_scene(scene_id: UUID):
@@ -369,12 +395,17 @@ def lock_scene(scene_id: UUID):
         update referee_ratings.scenes
         set is_locked = true
         where scene_id = cast(:scene_id as uuid)
-        returning scene_id::text as scene_id, is_locked
+        returning scene_id::text as scene_id, match_id::text as match_id, is_locked
     """)
     with engine.begin() as conn:
         row = conn.execute(sql, {"scene_id": str(scene_id)}).mappings().first()
+        if row:
+            bump_scene_match_version(conn, scene_id)
+            freeze_scene(conn, scene_id)
     if not row:
         raise HTTPException(status_code=404, detail="Scene not found")
+    invalidate_scene_state(scene_id)
+    match_events.publish(row["match_id"], SCENE_LOCKED, dict(row))
     return dict(row)
 
 @router.post("/{scene_id}/unlock")
@@ -383,12 +414,17 @@ def unlock_scene(scene_id: UUID):
         update referee_ratings.scenes
         set is_locked = false
         where scene_id = cast(:scene_id as uuid)
-        returning scene_id::text as scene_id, is_locked
+        returning scene_id::text as scene_id, match_id::text as match_id, is_locked
     """)
     with engine.begin() as conn:
         row = conn.execute(sql, {"scene_id": str(scene_id)}).mappings().first()
+        if row:
+            bump_scene_match_version(conn, scene_id)
+            thaw_scene(conn, scene_id)
     if not row:
         raise HTTPException(status_code=404, detail="Scene not found")
+    invalidate_scene_state(scene_id)
+    match_events.publish(row["match_id"], SCENE_UNLOCKED, dict(row))
     return dict(row)
 
 
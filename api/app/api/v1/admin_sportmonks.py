@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, HTTPException, status
 
 from app.core.admin_auth import require_admin_basic
+from app.core.sportmonks.budget import BudgetExhausted
 from app.core.sportmonks.service import sync_team_schedule
 from app.core.sportmonks.inplay_repository import get_inplay_snapshot
+from app.core.sportmonks.worker import get_worker_status
 
 router = APIRouter(
     prefix="/admin/sportmonks",
@@ -13,7 +15,15 @@ router = APIRouter(
 
 @router.post("/sync/team/{team_id}", status_code=status.HTTP_200_OK)
 def sync_team(team_id: int):
-    inserted = sync_team_schedule(team_id)
+    try:
+        inserted = sync_team_schedule(team_id)
+    except BudgetExhausted as exc:
+        # Kontingent ist fuer Inplay reserviert
+        raise HTTPException(
+            status_code=429,
+            detail="SportMonks request budget exhausted",
+            headers={"Retry-After": str(int(exc.retry_after) + 1)},
+        )
     return {"team_id": team_id, "matches_synced": inserted}
 
 
@@ -25,3 +35,9 @@ def poll_inplay():
         "last_fetched_at": snapshot.get("last_fetched_at"),
         "fixtures": snapshot.get("fixtures"),
     }
+
+
+@router.get("/worker", status_code=status.HTTP_200_OK)
+def worker_status():
+    # lag_seconds = Sekunden seit dem letzten erfolgreichen Poll
+    return {"workers": get_worker_status()}
@@ -1,9 +1,12 @@
+from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy import text
 
 from app.core.deps import require_admin
+from app.core.pagination import keyset_clause, parse_cursor, set_next_cursor
+from app.core.user_cache import invalidate_user_status
 from app.db import engine
 from app.schemas.admin_users import AdminUserOut, AdminUserUpdate
 
@@ -15,8 +18,14 @@ router = APIRouter(
 
 
 @router.get("", response_model=list[AdminUserOut])
-def list_users(limit: int = Query(default=200, ge=1, le=1000), offset: int = Query(default=0, ge=0)):
-    sql = text("""
+def list_users(
+    response: Response,
+    limit: int = Query(default=200, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = None,
+):
+    keyset, params = keyset_clause(parse_cursor("admin_users", cursor), "created_at", "user_id")
+    sql = text(f"""
         select
           user_id,
           email,
@@ -25,11 +34,14 @@ def list_users(limit: int = Query(default=200, ge=1, le=1000), offset: int = Que
           email_verified,
           created_at
         from mv_users
-        order by created_at desc
+        {"where " + keyset if keyset else ""}
+        order by created_at desc, user_id desc
         limit :limit offset :offset
     """)
+    params.update(limit=limit, offset=0 if keyset else offset)
     with engine.begin() as conn:
-        rows = conn.execute(sql, {"limit": limit, "offset": offset}).mappings().all()
+        rows = conn.execute(sql, params).mappings().all()
+    set_next_cursor(response, "admin_users", rows, limit, "created_at", "user_id")
     return [dict(r) for r in rows]
 
 
@@ -62,4 +74,5 @@ def update_user(user_id: UUID, payload: AdminUserUpdate):
     if not row:
         raise HTTPException(status_code=404, detail="User not found")
 
+    invalidate_user_status(str(user_id))
     return dict(row)
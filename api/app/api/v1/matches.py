@@ -1,18 +1,24 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
 from sqlalchemy import text
 
 from app.db import engine
-from app.schemas.matches import MatchCreate, MatchOut
+from app.schemas.matches import MatchCreate, MatchOut, MatchStatsOut
 from app.core import settings
+from app.core.etag import ALL, MATCHES, bump_version, conditional_response, get_version, make_etag
+from app.core.events import match_events
+from app.core.match_stats import count_votes_by_match, get_match_stats
+from app.core.pagination import keyset_clause, parse_cursor, set_next_cursor
+from app.core.snapshots import MATCH_STATS, find_snapshot, snapshot_response
 from app.core.sportmonks.league_mapping import resolve_provider_filters
 from app.core.sportmonks.schedule_mapper import map_schedule_rows
 from app.core.sportmonks.schedule_repository import list_schedule_fixtures
 
 
 from fastapi import Depends
+from fastapi.responses import StreamingResponse
 from app.core.user_auth import require_user
 from app.core.matches.provider_service import get_provider as get_matches_provider
 
@@ -22,16 +28,69 @@ router = APIRouter(
     dependencies=[Depends(require_user), Depends(get_matches_provider)],
 )
 
-@router.get("", response_model=List[MatchOut])
+MAX_VOTE_COUNT_IDS = 200
+
+
+def _parse_match_ids(values: List[str]) -> List[str]:
+    ids = []
+    for value in values:
+        for part in value.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                ids.append(str(UUID(part)))
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid match_id: {part}")
+    if len(ids) > MAX_VOTE_COUNT_IDS:
+        raise HTTPException(status_code=400, detail=f"Too many match_ids (max {MAX_VOTE_COUNT_IDS})")
+    return ids
+
+
+def _with_vote_counts(rows) -> List[dict]:
+    rows = [dict(row) for row in rows]
+    with engine.connect() as conn:
+        counts = count_votes_by_match(conn, [row["match_id"] for row in rows])
+    for row in rows:
+        row["vote_count"] = counts.get(str(row["match_id"]), 0)
+    return rows
+
+
+@router.get("/vote-counts", response_model=Dict[str, int])
+def match_vote_counts(match_ids: List[str] = Query(default=[])):
+    # Ein gruppierter Query fuer alle Match-Karten statt /ratings?scene_id=... pro Szene
+    ids = _parse_match_ids(match_ids)
+    if not ids:
+        return {}
+    with engine.connect() as conn:
+        return count_votes_by_match(conn, ids)
+
+
+@router.get("", response_model=List[MatchOut], response_model_exclude_unset=True)
 def list_matches(
+    response: Response,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
     league: Optional[str] = None,
     season: Optional[str] = None,
     matchday_number: Optional[int] = None,
     matchday_name: Optional[str] = None,
     matchday_name_en: Optional[str] = None,
+    include_vote_count: bool = False,
+    if_none_match: Optional[str] = Header(default=None),
 ):
+    if not include_vote_count:
+        # Stimmenzahlen haengen an den Ratings, nicht an der Matches-Version -> dann ohne ETag
+        with engine.connect() as conn:
+            version = get_version(conn, MATCHES, ALL)
+        etag = make_etag(
+            MATCHES, ALL, version, settings.SPORTMONKS_ENABLED,
+            limit, offset, cursor, league, season, matchday_number, matchday_name, matchday_name_en,
+        )
+        not_modified = conditional_response(response, etag, if_none_match)
+        if not_modified:
+            return not_modified
     if settings.SPORTMONKS_ENABLED:
         if matchday_number is not None or matchday_name or matchday_name_en:
             return []
@@ -43,8 +102,12 @@ def list_matches(
             offset=offset,
             league_ids=league_ids,
             season_ids=season_ids,
+            cursor=parse_cursor("schedule", cursor),
         )
-        return map_schedule_rows(rows)
+        # Cursor aus den Rohzeilen, der Mapper kann Zeilen verwerfen
+        set_next_cursor(response, "schedule", rows, limit, "starts_at", "fixture_id")
+        mapped = map_schedule_rows(rows)
+        return _with_vote_counts(mapped) if include_vote_count else mapped
 
     sql = """
         select
@@ -76,11 +139,19 @@ def list_matches(
     if matchday_name_en:
         clauses.append("matchday_name_en = :matchday_name_en")
         params["matchday_name_en"] = matchday_name_en
+    keyset, keyset_params = keyset_clause(parse_cursor("matches", cursor), "match_date", "match_id")
+    if keyset:
+        # Cursor ersetzt offset
+        clauses.append(keyset)
+        params.update(keyset_params, offset=0)
     if clauses:
         sql += " where " + " and ".join(clauses)
-    sql += " order by match_date desc limit :limit offset :offset"
+    sql += " order by match_date desc, match_id desc limit :limit offset :offset"
     with engine.connect() as conn:
         rows = conn.execute(text(sql), params).mappings().all()
+    set_next_cursor(response, "matches", rows, limit, "match_date", "match_id")
+    if include_vote_count:
+        return _with_vote_counts(rows)
     return rows
 
 @router.get("/{match_id}", response_model=MatchOut)
@@ -105,6 +176,30 @@ def get_match(match_id: UUID):
         raise HTTPException(status_code=404, detail="Match not found")
     return row
 
+@router.get("/{match_id}/stats", response_model=MatchStatsOut)
+def match_stats(
+    match_id: UUID,
+    request: Request,
+    if_none_match: Optional[str] = Header(default=None),
+):
+    # abgeschlossenes Match (alle Szenen gelockt): eingefrorener Snapshot
+    snapshot = find_snapshot(MATCH_STATS, match_id)
+    if snapshot:
+        return snapshot_response(snapshot, if_none_match, request.scope.get("root_path", ""))
+    # Pro Szene + Match-Verteilungen in einem Query (gecacht, Invalidierung bei neuem Rating)
+    return get_match_stats(str(match_id))
+
+@router.get("/{match_id}/stream")
+async def match_stream(match_id: UUID):
+    # SSE: scene_released/-locked (+ un-/deleted), gedrosseltes aggregate_updated, resync
+    if not match_events.accepting():
+        raise HTTPException(status_code=503, detail="Too many open streams")
+    return StreamingResponse(
+        match_events.stream(str(match_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.post("", response_model=MatchOut, status_code=201)
 def create_match(payload: MatchCreate):
     sql = text("""
@@ -134,4 +229,5 @@ def create_match(payload: MatchCreate):
             "matchday_name": payload.matchday_name,
             "matchday_name_en": payload.matchday_name_en,
         }).mappings().first()
+        bump_version(conn, MATCHES, ALL)
     return row
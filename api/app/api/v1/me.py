@@ -2,23 +2,17 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import text
 
 from app.db import engine
+from app.core.aggregates import rebuild_scene_aggregates
+from app.core.etag import MATCH_SCENES, bump_versions
+from app.core.match_stats import invalidate_match_stats
+from app.core.schema import column_exists
+from app.core.snapshots import refresh_scene_snapshots
 from app.core.user_auth import require_user
+from app.core.user_cache import invalidate_user_status
 
 router = APIRouter(prefix="/me", tags=["me"])
 
 
-def _column_exists(conn, schema: str, table: str, column: str) -> bool:
-    row = conn.execute(text("""
-        select 1
-        from information_schema.columns
-        where table_schema = :schema
-          and table_name = :table
-          and column_name = :column
-        limit 1
-    """), {"schema": schema, "table": table, "column": column}).first()
-    return bool(row)
-
-
 @router.get("")
 def get_me(user_id: str = Depends(require_user)):
     sql = text("""
@@ -70,31 +64,43 @@ def delete_me(user_id: str = Depends(require_user)):
         if not exists:
             raise HTTPException(status_code=404, detail="User not found")
 
-        if _column_exists(conn, "referee_ratings", "ratings", "user_id"):
-            conn.execute(
-                text("delete from referee_ratings.ratings where user_id = cast(:user_id as uuid)"),
+        if column_exists(conn, "referee_ratings", "ratings", "user_id"):
+            rated = conn.execute(
+                text("""
+                    delete from referee_ratings.ratings
+                    where user_id = cast(:user_id as uuid)
+                    returning scene_id
+                """),
                 {"user_id": user_id},
-            )
+            ).all()
+            rebuild_scene_aggregates(conn, [row[0] for row in rated])
+            # eingefrorene Aggregate gelockter Szenen enthalten die Stimmen ebenfalls
+            refresh_scene_snapshots(conn, [row[0] for row in rated])
 
-        if _column_exists(conn, "referee_ratings", "users", "user_id"):
+        if column_exists(conn, "referee_ratings", "users", "user_id"):
             conn.execute(
                 text("delete from referee_ratings.users where user_id = cast(:user_id as uuid)"),
                 {"user_id": user_id},
             )
 
-        if _column_exists(conn, "referee_ratings", "scenes", "created_by"):
-            conn.execute(
-                text("update referee_ratings.scenes set created_by = null where created_by = cast(:user_id as uuid)"),
+        if column_exists(conn, "referee_ratings", "scenes", "created_by"):
+            authored = conn.execute(
+                text("""
+                    update referee_ratings.scenes set created_by = null
+                    where created_by = cast(:user_id as uuid)
+                    returning match_id
+                """),
                 {"user_id": user_id},
-            )
+            ).all()
+            bump_versions(conn, MATCH_SCENES, [row[0] for row in authored])
 
-        if _column_exists(conn, "referee_ratings", "audit_log", "actor_user_id"):
+        if column_exists(conn, "referee_ratings", "audit_log", "actor_user_id"):
             conn.execute(
                 text("update referee_ratings.audit_log set actor_user_id = null where actor_user_id = cast(:user_id as uuid)"),
                 {"user_id": user_id},
             )
 
-        if _column_exists(conn, "public", "audit_log", "actor_user_id"):
+        if column_exists(conn, "public", "audit_log", "actor_user_id"):
             conn.execute(
                 text("update public.audit_log set actor_user_id = null where actor_user_id = cast(:user_id as uuid)"),
                 {"user_id": user_id},
@@ -106,3 +112,6 @@ def delete_me(user_id: str = Depends(require_user)):
         )
         if deleted.rowcount == 0:
             raise HTTPException(status_code=404, detail="User not found")
+
+    invalidate_match_stats()
+    invalidate_user_status(user_id)
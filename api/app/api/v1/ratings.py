@@ -1,17 +1,103 @@
+import json
+from typing import Dict, List
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
 
+from concurrent.futures import TimeoutError as FutureTimeout
+
 from app.db import engine
-from app.schemas.ratings import RatingCreate, RatingOut
+from app.core.bulk import bulk_upsert
+from app.core.etag import SCENE_RATINGS, bump_version_sql_from
+from app.core.events import match_events
+from app.core.aggregates import apply_rating_sql_from
+from app.core.match_stats import invalidate_match_stats
+from app.core.pagination import keyset_clause, parse_cursor, set_next_cursor
+from app.core.rating_queue import WAIT_SECONDS as QUEUE_WAIT_SECONDS, rating_queue
+from app.core.rating_users import ensure_rating_user
+from app.schemas.ratings import RatingBatchIn, RatingBatchOut, RatingCreate, RatingOut
 
 from fastapi import Depends
 from app.core.user_auth import require_user
 
 router = APIRouter(prefix="/ratings", tags=["ratings"], dependencies=[Depends(require_user)])
 
+_RATING_COLUMNS = (
+    "rating_id, scene_id, user_id, decision_score, confidence_score, "
+    "perception_channel, rule_knowledge, rating_time_type, fav_team, created_at"
+)
+
+MAX_MY_RATING_SCENE_IDS = 200
+
+_MY_RATINGS_BY_SCENES_SQL = text(f"""
+    select {_RATING_COLUMNS}
+    from referee_ratings.ratings
+    where user_id = cast(:user_id as uuid)
+      and scene_id = any(cast(:scene_ids as uuid[]))
+""")
+
+# Szenen des Matches ueber ix_scenes_match_id, Bewertungen dann per (user_id, scene_id)
+_MY_RATINGS_BY_MATCH_SQL = text(f"""
+    select {_RATING_COLUMNS}
+    from referee_ratings.ratings
+    where user_id = cast(:user_id as uuid)
+      and scene_id in (
+        select scene_id from referee_ratings.scenes where match_id = cast(:match_id as uuid)
+      )
+""")
+
+
+def _parse_scene_ids(values: List[str]) -> List[str]:
+    ids = []
+    for value in values:
+        for part in value.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                ids.append(str(UUID(part)))
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid scene_id: {part}")
+    if len(ids) > MAX_MY_RATING_SCENE_IDS:
+        raise HTTPException(status_code=400, detail=f"Too many scene_ids (max {MAX_MY_RATING_SCENE_IDS})")
+    return sorted(set(ids))
+
+
+@router.get("/me", response_model=list[RatingOut])
+def list_my_ratings(
+    match_id: UUID | None = Query(default=None),
+    scene_ids: List[str] = Query(default=[]),
+    user_id: str = Depends(require_user),
+):
+    """Alle eigenen Bewertungen eines Matches oder einer Szenenliste (ersetzt /me/{scene_id} pro Szene)."""
+    if (match_id is None) == (not scene_ids):
+        raise HTTPException(status_code=400, detail="Provide either match_id or scene_ids")
+    if match_id is not None:
+        sql, params = _MY_RATINGS_BY_MATCH_SQL, {"user_id": user_id, "match_id": str(match_id)}
+    else:
+        ids = _parse_scene_ids(scene_ids)
+        if not ids:
+            return []
+        sql, params = _MY_RATINGS_BY_SCENES_SQL, {"user_id": user_id, "scene_ids": ids}
+    with engine.connect() as conn:
+        rows = [dict(row) for row in conn.execute(sql, params).mappings().all()]
+    if rating_queue.running:
+        # Queue-Modus: angenommene, noch nicht geschriebene Bewertungen ergaenzen
+        known = {str(row["scene_id"]) for row in rows}
+        for rating in rating_queue.pending_for_user(user_id):
+            if rating["scene_id"] in known:
+                continue
+            if match_id is not None and rating["match_id"] != str(match_id):
+                continue
+            if match_id is None and rating["scene_id"] not in ids:
+                continue
+            rows.append(rating)
+    return rows
+
+
 @router.get("/me/{scene_id}", response_model=RatingOut)
 def get_my_rating(scene_id: UUID, user_id: str = Depends(require_user)):
     sql = text("""
@@ -22,103 +108,261 @@ def get_my_rating(scene_id: UUID, user_id: str = Depends(require_user)):
     """)
     with engine.begin() as conn:
         row = conn.execute(sql, {"scene_id": str(scene_id), "user_id": user_id}).mappings().first()
+    if not row and rating_queue.running:
+        # Queue-Modus: angenommen, aber noch nicht geschrieben
+        row = rating_queue.pending(str(scene_id), user_id)
     if not row:
         raise HTTPException(status_code=404, detail="Rating not found")
     return dict(row)
 
-@router.post("", response_model=RatingOut, status_code=201)
-def create_rating(payload: RatingCreate, user_id: str = Depends(require_user)):
-    # 1) Szene muss existieren + released + nicht locked
-    check_scene = text("""
-        select
-          s.scene_id,
-          s.is_released,
-          s.is_locked,
-          m.team_home,
-          m.team_away
-        from referee_ratings.scenes s
-        join referee_ratings.matches m on m.match_id = s.match_id
-        where s.scene_id = :scene_id
-    """)
 
-    insert_sql = text("""
-        insert into referee_ratings.ratings
-          (scene_id, user_id, decision_score, confidence_score, perception_channel, rule_knowledge, rating_time_type, fav_team)
-        values
-          (:scene_id, :user_id, :decision_score, :confidence_score, :perception_channel, :rule_knowledge, :rating_time_type, :fav_team)
-        returning
-          rating_id, scene_id, user_id, decision_score, confidence_score, perception_channel, rule_knowledge, rating_time_type, fav_team, created_at
-    """)
-    ensure_user_sql = text("""
-        insert into referee_ratings.users (user_id, email_hash, password_hash)
-        select
-          m.user_id,
-          encode(digest(lower(trim(m.email)), 'sha256'), 'hex'),
-          m.password_hash
-        from mv_users m
-        where m.user_id = cast(:user_id as uuid)
-        on conflict do nothing
-    """)
-    existing_sql = text("""
-        select rating_id
-        from referee_ratings.ratings
-        where scene_id = :scene_id and user_id = :user_id
-        limit 1
-    """)
+# Ein Statement pro Bewertung: Szene pruefen, einfuegen (Duplikate per ON CONFLICT),
+# Aggregat und ETag-Version fortschreiben und das Ergebnis als outcome zurueckgeben.
+# FOR SHARE: ein paralleler Lock wartet auf den Commit und friert die Bewertung mit ein.
+_SUBMIT_RATING_SQL = text(f"""
+    with s as (
+      select
+        s.scene_id,
+        s.is_released,
+        s.is_locked,
+        s.match_id,
+        m.team_home,
+        m.team_away
+      from referee_ratings.scenes s
+      join referee_ratings.matches m on m.match_id = s.match_id
+      where s.scene_id = cast(:scene_id as uuid)
+      for share of s
+    ),
+    ok as (
+      select scene_id
+      from s
+      where s.is_released
+        and not s.is_locked
+        and (cast(:fav_team as text) is null or cast(:fav_team as text) in (s.team_home, s.team_away))
+    ),
+    ins as (
+      insert into referee_ratings.ratings
+        (scene_id, user_id, decision_score, confidence_score, perception_channel, rule_knowledge, rating_time_type, fav_team)
+      select
+        ok.scene_id, :user_id, :decision_score, :confidence_score, :perception_channel, :rule_knowledge, :rating_time_type, :fav_team
+      from ok
+      on conflict (scene_id, user_id) do nothing
+      returning {_RATING_COLUMNS}
+    ),
+    agg as (
+      {apply_rating_sql_from("ins")}
+    ),
+    ver as (
+      {bump_version_sql_from("ins", SCENE_RATINGS, "scene_id")}
+    )
+    select
+      case
+        when s.scene_id is null then 'scene_not_found'
+        when not s.is_released then 'not_released'
+        when s.is_locked then 'locked'
+        when not exists (select 1 from ok) then 'fav_team_mismatch'
+        when ins.rating_id is null then 'duplicate'
+        else 'created'
+      end as outcome,
+      s.match_id,
+      ins.*
+    from (select 1) as one
+    left join s on true
+    left join ins on true
+""")
 
-    with engine.begin() as conn:
-        s = conn.execute(check_scene, {"scene_id": str(payload.scene_id)}).mappings().first()
-        if not s:
-            raise HTTPException(status_code=404, detail="Scene not found")
-        if not s["is_released"]:
-            raise HTTPException(status_code=409, detail="Scene not released yet")
-        if s["is_locked"]:
-            raise HTTPException(status_code=409, detail="Scene is locked")
-        if payload.fav_team is not None:
-            if payload.fav_team not in (s["team_home"], s["team_away"]):
-                raise HTTPException(status_code=400, detail="fav_team must match the match teams")
-
-        conn.execute(ensure_user_sql, {"user_id": user_id})
-
-        existing = conn.execute(existing_sql, {
-            "scene_id": str(payload.scene_id),
-            "user_id": user_id,
-        }).mappings().first()
-        if existing:
-            raise HTTPException(status_code=409, detail="User already rated this scene")
+_OUTCOME_ERRORS = {
+    "scene_not_found": (404, "Scene not found"),
+    "not_released": (409, "Scene not released yet"),
+    "locked": (409, "Scene is locked"),
+    "fav_team_mismatch": (400, "fav_team must match the match teams"),
+    "duplicate": (409, "User already rated this scene"),
+    # Queue-Modus: Flush endgueltig gescheitert, nichts geschrieben
+    "error": (503, "Rating could not be saved, please retry"),
+}
+
+
+def _submit_rating(conn, params: dict):
+    return conn.execute(_SUBMIT_RATING_SQL, params).mappings().first()
 
+
+@router.post("", response_model=RatingOut, status_code=201)
+def create_rating(payload: RatingCreate, response: Response, user_id: str = Depends(require_user)):
+    params = {
+        "scene_id": str(payload.scene_id),
+        "user_id": user_id,
+        "decision_score": payload.decision_score,
+        "confidence_score": payload.confidence_score,
+        "perception_channel": payload.perception_channel,
+        "rule_knowledge": payload.rule_knowledge,
+        "rating_time_type": payload.rating_time_type,
+        "fav_team": payload.fav_team,
+    }
+    if rating_queue.running:
+        outcome, rating, result = rating_queue.submit(params)
+        if outcome == "queued":
+            try:
+                outcome = result.result(timeout=QUEUE_WAIT_SECONDS)
+            except FutureTimeout:
+                # angenommen, aber noch nicht committet: Status per GET /ratings/me/{scene_id}
+                response.status_code = 202
+                return dict(rating, pending=True)
+            if outcome == "created":
+                return rating
+        if outcome != "queue_full":
+            status_code, detail = _OUTCOME_ERRORS[outcome]
+            raise HTTPException(status_code=status_code, detail=detail)
+        # Queue voll -> synchron schreiben
+
+    try:
+        with engine.begin() as conn:
+            row = _submit_rating(conn, params)
+    except IntegrityError:
+        # Fallback: Konto noch nicht nach referee_ratings.users gespiegelt
+        # (z. B. vor der Verifikations-Spiegelung verifiziert) -> spiegeln und einmal wiederholen
         try:
-            row = conn.execute(insert_sql, {
-                "scene_id": str(payload.scene_id),
-                "user_id": user_id,
-                "decision_score": payload.decision_score,
-                "confidence_score": payload.confidence_score,
-                "perception_channel": payload.perception_channel,
-                "rule_knowledge": payload.rule_knowledge,
-                "rating_time_type": payload.rating_time_type,
-                "fav_team": payload.fav_team,
-            }).mappings().first()
+            with engine.begin() as conn:
+                ensure_rating_user(conn, user_id)
+                row = _submit_rating(conn, params)
         except IntegrityError:
-            recheck = conn.execute(existing_sql, {
-                "scene_id": str(payload.scene_id),
-                "user_id": user_id,
-            }).mappings().first()
-            if recheck:
-                raise HTTPException(status_code=409, detail="User already rated this scene")
             raise HTTPException(status_code=500, detail="Rating insert failed")
 
+    outcome = row["outcome"] if row else None
+    if outcome != "created":
+        status_code, detail = _OUTCOME_ERRORS.get(outcome, (500, "Rating insert failed"))
+        raise HTTPException(status_code=status_code, detail=detail)
+
+    invalidate_match_stats(row["match_id"])
+    match_events.aggregate_changed(row["match_id"], [row["scene_id"]])
+    if rating_queue.running:
+        rating_queue.note_written(str(row["scene_id"]), user_id)
     return dict(row)
 
 
+# Idempotenz-Schluessel: ein Replay liefert das gespeicherte Ergebnis, ohne neu zu schreiben
+_IDEMPOTENCY_LOOKUP_SQL = text("""
+    select idempotency_key, scene_id::text as scene_id, response
+    from referee_ratings.rating_idempotency_keys
+    where user_id = cast(:user_id as uuid)
+      and idempotency_key = any(cast(:keys as text[]))
+""")
+
+# Batches eines Nutzers nacheinander: ein paralleler Retry wartet und sieht dann die gespeicherten Schluessel
+_USER_BATCH_LOCK_SQL = text("select pg_advisory_xact_lock(hashtext('rating_batch:' || :user_id))")
+
+_IDEMPOTENCY_COLUMNS = ("user_id", "idempotency_key", "scene_id", "status", "outcome", "rating_id", "response")
+
+# Nur endgueltige Ergebnisse werden gespeichert und wiederholt. not_released/locked haengen
+# vom Szenen-Zustand ab, pending/5xx vom Zeitpunkt: ein Retry mit demselben Schluessel
+# muss spaeter noch gelingen koennen.
+_FINAL_OUTCOMES = {"created", "duplicate", "scene_not_found", "fav_team_mismatch"}
+
+
+@router.post("/batch", response_model=RatingBatchOut)
+def create_ratings_batch(payload: RatingBatchIn, user_id: str = Depends(require_user)):
+    keys = [item.idempotency_key for item in payload.items]
+    if len(set(keys)) != len(keys):
+        raise HTTPException(status_code=400, detail="Duplicate idempotency_key in batch")
+
+    results = []
+    new_keys = []
+    created_matches: Dict[str, set] = {}
+    with engine.begin() as conn:
+        conn.execute(_USER_BATCH_LOCK_SQL, {"user_id": user_id})
+        ensure_rating_user(conn, user_id)
+        stored = {
+            row["idempotency_key"]: row
+            for row in conn.execute(_IDEMPOTENCY_LOOKUP_SQL, {"user_id": user_id, "keys": keys}).mappings().all()
+        }
+        for item in payload.items:
+            previous = stored.get(item.idempotency_key)
+            if previous is not None:
+                if previous["scene_id"] != str(item.scene_id):
+                    result = {
+                        "status": 422,
+                        "outcome": "idempotency_key_reused",
+                        "detail": "idempotency_key was used for another scene",
+                    }
+                else:
+                    result = dict(previous["response"], replayed=True)
+                results.append(dict(result, idempotency_key=item.idempotency_key, scene_id=str(item.scene_id)))
+                continue
+
+            params = item.model_dump(exclude={"idempotency_key"})
+            params.update({"scene_id": str(item.scene_id), "user_id": user_id})
+            if rating_queue.running and rating_queue.pending(params["scene_id"], user_id):
+                # liegt noch in der Queue: Ergebnis offen, spaeter erneut senden
+                row = {"outcome": "pending"}
+            else:
+                row = _submit_rating(conn, params)
+            outcome = row["outcome"] if row else None
+            if outcome == "pending":
+                result = {"status": 202, "outcome": outcome, "detail": "Rating is still being saved", "rating": None}
+            elif outcome == "created":
+                rating = jsonable_encoder(RatingOut.model_validate(dict(row)))
+                result = {"status": 201, "outcome": outcome, "detail": None, "rating": rating}
+                created_matches.setdefault(row["match_id"], set()).add(row["scene_id"])
+            else:
+                status_code, detail = _OUTCOME_ERRORS.get(outcome, (500, "Rating insert failed"))
+                result = {"status": status_code, "outcome": outcome or "error", "detail": detail, "rating": None}
+            results.append(dict(result, idempotency_key=item.idempotency_key, scene_id=params["scene_id"]))
+            if outcome not in _FINAL_OUTCOMES:
+                continue
+            new_keys.append({
+                "user_id": user_id,
+                "idempotency_key": item.idempotency_key,
+                "scene_id": params["scene_id"],
+                "status": result["status"],
+                "outcome": result["outcome"],
+                "rating_id": result["rating"]["rating_id"] if result["rating"] else None,
+                "response": json.dumps(result),
+            })
+
+        if new_keys:
+            bulk_upsert(
+                conn,
+                "referee_ratings.rating_idempotency_keys",
+                _IDEMPOTENCY_COLUMNS,
+                new_keys,
+                conflict=("user_id", "idempotency_key"),
+                update_columns=(),
+            )
+
+    for match_id, scene_ids in created_matches.items():
+        invalidate_match_stats(match_id)
+        match_events.aggregate_changed(match_id, scene_ids)
+    if rating_queue.running:
+        for result in results:
+            if result["outcome"] == "created" and not result.get("replayed"):
+                rating_queue.note_written(result["scene_id"], user_id)
+    return {"results": results}
+
+
 @router.get("", response_model=list[RatingOut])
-def list_ratings(scene_id: UUID | None = Query(default=None)):
-    sql = text("""
-        select rating_id, scene_id, user_id, decision_score, confidence_score, perception_channel, rule_knowledge, rating_time_type, fav_team, created_at
+def list_ratings(
+    response: Response,
+    scene_id: UUID | None = Query(default=None),
+    limit: int = Query(default=200, ge=1, le=1000),
+    cursor: str | None = None,
+):
+    clauses = []
+    params = {"limit": limit}
+    if scene_id:
+        clauses.append("scene_id = cast(:scene_id as uuid)")
+        params["scene_id"] = str(scene_id)
+    keyset, keyset_params = keyset_clause(parse_cursor("ratings", cursor), "created_at", "rating_id")
+    if keyset:
+        clauses.append(keyset)
+        params.update(keyset_params)
+    sql = text(f"""
+        select {_RATING_COLUMNS}
         from referee_ratings.ratings
-        where (:scene_id is null or scene_id = :scene_id)
-        order by created_at desc
-        limit 200
+        {"where " + " and ".join(clauses) if clauses else ""}
+        order by created_at desc, rating_id desc
+        limit :limit
     """)
     with engine.begin() as conn:
-        rows = conn.execute(sql, {"scene_id": str(scene_id) if scene_id else None}).mappings().all()
+        rows = conn.execute(sql, params).mappings().all()
+    # Seite voll -> X-Next-Cursor fuer die naechste (bisher: stillschweigend bei 200 abgeschnitten)
+    set_next_cursor(response, "ratings", rows, limit, "created_at", "rating_id")
     return [dict(r) for r in rows]
@@ -2,12 +2,19 @@ from datetime import datetime, timezone
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, HTTPException, Header, Request, Response
 from sqlalchemy import text
 
 from app.db import engine
 from app.schemas.scenes import SceneCreate, SceneOut, get_scene_type_label
 from app.schemas.ratings import SceneAggregateOut
+from app.core.aggregates import get_scene_aggregate
+from app.core.etag import MATCH_SCENES, SCENE_RATINGS, bump_version, conditional_response, get_version, make_etag
+from app.core.events import SCENE_RELEASED, match_events
+from app.core.match_stats import invalidate_match_stats
+from app.core.pagination import keyset_clause, parse_cursor, set_next_cursor
+from app.core.schema import column_exists
+from app.core.snapshots import SCENE_AGGREGATE, find_snapshot, refresh_match_snapshot, snapshot_response
 
 from fastapi import Depends
 from app.core.user_auth import require_user
@@ -25,17 +32,6 @@ def _pick_lang(accept_language: Optional[str]) -> str:
             return "en"
     return "en"
 
-def _column_exists(conn, schema: str, table: str, column: str) -> bool:
-    row = conn.execute(text("""
-        select 1
-        from information_schema.columns
-        where table_schema = :schema
-          and table_name = :table
-          and column_name = :column
-        limit 1
-    """), {"schema": schema, "table": table, "column": column}).first()
-    return bool(row)
-
 def _add_scene_type_label(rows, lang: str):
     return [
         {
@@ -46,58 +42,64 @@ def _add_scene_type_label(rows, lang: str):
         for row in rows
     ]
 
+_LIST_SCENES_SQL = """
+    select
+      scene_id,
+      match_id,
+      minute,
+      stoppage_time,
+      scene_type,
+      description_de,
+      description_en,
+      is_released,
+      release_time,
+      created_by,
+      created_at
+    from referee_ratings.scenes
+    where {where}
+    order by created_at desc nulls last, scene_id desc
+    limit :limit offset :offset
+"""
+
+
 @router.get("", response_model=List[SceneOut])
 def list_scenes(
+    response: Response,
     match_id: Optional[UUID] = None,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
     accept_language: Optional[str] = Header(default=None, alias="Accept-Language"),
+    if_none_match: Optional[str] = Header(default=None),
 ):
+    lang = _pick_lang(accept_language)
+    if match_id:
+        # Szenenliste eines Matches: Version statt Query, wenn der Client aktuell ist
+        with engine.connect() as conn:
+            version = get_version(conn, MATCH_SCENES, match_id)
+        etag = make_etag(MATCH_SCENES, match_id, version, lang, limit, offset, cursor)
+        not_modified = conditional_response(response, etag, if_none_match)
+        if not_modified:
+            return not_modified
+
+    clauses = ["scene_type != 'GOAL'"]
+    params = {"limit": limit, "offset": offset}
     if match_id:
-        sql = text("""
-            select
-              scene_id,
-              match_id,
-              minute,
-              stoppage_time,
-              scene_type,
-              description_de,
-              description_en,
-              is_released,
-              release_time,
-              created_by,
-              created_at
-            from referee_ratings.scenes
-            where match_id = :match_id
-              and scene_type != 'GOAL'
-            order by created_at desc nulls last
-            limit :limit offset :offset
-        """)
-        params = {"match_id": str(match_id), "limit": limit, "offset": offset}
-    else:
-        sql = text("""
-            select
-              scene_id,
-              match_id,
-              minute,
-              stoppage_time,
-              scene_type,
-              description_de,
-              description_en,
-              is_released,
-              release_time,
-              created_by,
-              created_at
-            from referee_ratings.scenes
-            where scene_type != 'GOAL'
-            order by created_at desc nulls last
-            limit :limit offset :offset
-        """)
-        params = {"limit": limit, "offset": offset}
+        clauses.insert(0, "match_id = :match_id")
+        params["match_id"] = str(match_id)
+    keyset, keyset_params = keyset_clause(
+        parse_cursor("scenes", cursor), "created_at", "scene_id", nullable=True
+    )
+    if keyset:
+        # Cursor ersetzt offset
+        clauses.append(keyset)
+        params.update(keyset_params, offset=0)
+    sql = text(_LIST_SCENES_SQL.format(where="\n      and ".join(clauses)))
 
     with engine.connect() as conn:
         rows = [dict(row) for row in conn.execute(sql, params).mappings().all()]
-    return _add_scene_type_label(rows, _pick_lang(accept_language))
+    set_next_cursor(response, "scenes", rows, limit, "created_at", "scene_id")
+    return _add_scene_type_label(rows, lang)
 
 @router.get("/{scene_id}", response_model=SceneOut)
 def get_scene(
@@ -138,7 +140,7 @@ def create_scene(
 ):
     # created_by wird serverseitig aus dem JWT gesetzt
     with engine.begin() as conn:
-        include_legacy = _column_exists(conn, "referee_ratings", "scenes", "description")
+        include_legacy = column_exists(conn, "referee_ratings", "scenes", "description")
         if include_legacy:
             sql = text("""
                 insert into referee_ratings.scenes
@@ -192,52 +194,38 @@ def create_scene(
             "release_time": payload.release_time,
             "created_by": user_id,
         }).mappings().first()
+        bump_version(conn, MATCH_SCENES, row["match_id"])
+        refresh_match_snapshot(conn, str(row["match_id"]))
+    invalidate_match_stats(row["match_id"])
+    if row["is_released"]:
+        match_events.publish(row["match_id"], SCENE_RELEASED, {
+            "scene_id": row["scene_id"],
+            "match_id": row["match_id"],
+            "is_released": True,
+            "release_time": row["release_time"],
+        })
     result = dict(row)
     result["scene_type_label"] = get_scene_type_label(result["scene_type"], _pick_lang(accept_language))
     result["description"] = result.get("description_de")
     return result
 @router.get("/{scene_id}/aggregate", response_model=SceneAggregateOut)
-def scene_aggregate(scene_id: UUID):
-    # scene exists?
-    scene_sql = text("""
-        select scene_id
-        from referee_ratings.scenes
-        where scene_id = :scene_id
-          and scene_type != 'GOAL'
-    """)
-    agg_sql = text("""
-with r as (
-  select
-    decision_score,
-    confidence_score,
-    perception_channel::text as perception_channel,
-    rating_time_type::text as rating_time_type,
-    rule_knowledge::text as rule_knowledge
-  from referee_ratings.ratings
-  where scene_id = cast(:scene_id as uuid)
-)
-select
-  cast(:scene_id as uuid) as scene_id,
-  (select count(*) from r) as rating_count,
-  (select coalesce(avg(decision_score)::numeric, 0)::float from r) as avg_decision,
-  (select coalesce(avg(confidence_score)::numeric, 0)::float from r) as avg_confidence,
-  (select coalesce(jsonb_object_agg(decision_score::text, cnt), '{}'::jsonb)
-     from (select decision_score, count(*) cnt from r group by decision_score order by decision_score) x) as decision_dist,
-  (select coalesce(jsonb_object_agg(confidence_score::text, cnt), '{}'::jsonb)
-     from (select confidence_score, count(*) cnt from r group by confidence_score order by confidence_score) x) as confidence_dist,
-  (select coalesce(jsonb_object_agg(perception_channel, cnt), '{}'::jsonb)
-     from (select perception_channel, count(*) cnt from r group by perception_channel order by perception_channel) x) as channel_dist,
-  (select coalesce(jsonb_object_agg(rating_time_type, cnt), '{}'::jsonb)
-     from (select rating_time_type, count(*) cnt from r group by rating_time_type order by rating_time_type) x) as time_type_dist,
-  (select coalesce(jsonb_object_agg(rule_knowledge, cnt), '{}'::jsonb)
-     from (select rule_knowledge, count(*) cnt from r group by rule_knowledge order by rule_knowledge) x) as rule_knowledge_dist,
-  now()::timestamptz as computed_at
-""")
-
-    with engine.begin() as conn:
-        srow = conn.execute(scene_sql, {"scene_id": str(scene_id)}).first()
-        if not srow:
-            raise HTTPException(status_code=404, detail="Scene not found")
-        row = conn.execute(agg_sql, {"scene_id": str(scene_id)}).mappings().first()
-
-    return dict(row)
+def scene_aggregate(
+    scene_id: UUID,
+    request: Request,
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
+):
+    # gelockte Szene: eingefrorener Snapshot (siehe app/core/snapshots.py)
+    snapshot = find_snapshot(SCENE_AGGREGATE, scene_id)
+    if snapshot:
+        return snapshot_response(snapshot, if_none_match, request.scope.get("root_path", ""))
+    # Aggregat wird beim Rating-Insert gepflegt (scene_rating_aggregates) -> PK-Read
+    with engine.connect() as conn:
+        etag = make_etag(SCENE_RATINGS, scene_id, get_version(conn, SCENE_RATINGS, scene_id))
+        not_modified = conditional_response(response, etag, if_none_match)
+        if not_modified:
+            return not_modified
+        row = get_scene_aggregate(conn, str(scene_id))
+    if not row:
+        raise HTTPException(status_code=404, detail="Scene not found")
+    return row
@@ -0,0 +1,30 @@
+import re
+
+from fastapi import APIRouter, Header, HTTPException, Response
+from typing import Optional
+
+from app.db import engine
+from app.core.etag import etag_matches
+from app.core.snapshots import IMMUTABLE_CACHE_CONTROL, get_snapshot_body
+
+# Inhaltsadressiert (SHA-256 der Bytes) -> aendert sich nie, daher ohne Login und
+# "immutable"; nginx kann /api/snapshots/ komplett aus dem Cache bedienen.
+router = APIRouter(prefix="/snapshots", tags=["snapshots"])
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+@router.get("/{content_sha256}")
+def get_snapshot(content_sha256: str, if_none_match: Optional[str] = Header(default=None)):
+    if not _SHA256_RE.match(content_sha256):
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    etag = f'"{content_sha256}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    with engine.connect() as conn:
+        body = get_snapshot_body(conn, content_sha256)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    if etag_matches(if_none_match, etag):
+        # Inhalt zu einem Hash kann sich nicht aendern
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
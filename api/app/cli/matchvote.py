@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import sys
 import traceback
 from pathlib import Path
@@ -10,10 +11,18 @@ import re
 import httpx
 
 from app.core import settings
+from app.core.http_cache import http_cache
+from app.core.sportmonks import close_sportmonks_client, get_sportmonks_client
+from app.core.sportmonks.budget import BudgetExhausted
+from app.core.sportmonks.client import SportMonksClient
 from app.core.providers.sportmonks.participants import parse_participants_from_schedules
 from app.core.providers.sportmonks.schedules import parse_schedules
 from app.core.sportmonks.fetcher import fetch_inplay_readonly, fetch_schedule_readonly
 from app.core.sportmonks.normalizer import normalize_fixture
+from app.core.sportmonks.profiles import PROFILES, SHADOW as SHADOW_PROFILE, apply_profile, compare_profiles
+
+# Saisonlisten aendern sich selten; 0 = immer frisch holen
+SEASONS_CACHE_TTL_SECONDS = float(os.getenv("SPORTMONKS_SEASONS_CACHE_TTL_SECONDS", "86400"))
 
 
 def _default_shadow_schedule_path() -> str:
@@ -23,8 +32,20 @@ def _default_shadow_schedule_path() -> str:
     )
 
 
+def _default_shadow_inplay_path() -> str:
+    return str(
+        Path(__file__).resolve().parents[3]
+        / "api/tests/fixtures/sportmonks/inplay_example.json"
+    )
+
+
 def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(prog="matchvote", description="MatchVote CLI")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the on-disk HTTP cache for provider requests",
+    )
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     sync = subparsers.add_parser("sync-schedules", help="Sync schedules from SportMonks")
@@ -81,6 +102,32 @@ def _build_parser() -> argparse.ArgumentParser:
         help="Print normalized participants as JSON",
     )
 
+    shadow_profiles = shadow_sub.add_parser(
+        "profiles",
+        help="Compare payload bytes per include/select profile against a recorded inplay payload",
+    )
+    shadow_profiles.add_argument(
+        "--from-file",
+        default=_default_shadow_inplay_path(),
+        help="Recorded inplay payload (JSON file)",
+    )
+    shadow_profiles.add_argument(
+        "--from-archive",
+        action="store_true",
+        help="Use the latest archived inplay payload from the database instead of --from-file",
+    )
+    shadow_profiles.add_argument(
+        "--profile",
+        action="append",
+        choices=sorted(PROFILES),
+        help="Profile to compare (repeatable, default: all)",
+    )
+    shadow_profiles.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the comparison as JSON",
+    )
+
     sportmonks = subparsers.add_parser("sportmonks", help="SportMonks utilities")
     sportmonks_sub = sportmonks.add_subparsers(dest="sportmonks_command", required=True)
 
@@ -100,10 +147,173 @@ def _build_parser() -> argparse.ArgumentParser:
         help="Max pages to fetch (per_page=50)",
     )
 
+    aggregates = subparsers.add_parser("aggregates", help="Scene rating aggregates")
+    aggregates_sub = aggregates.add_subparsers(dest="aggregates_command", required=True)
+
+    aggregates_rebuild = aggregates_sub.add_parser(
+        "rebuild",
+        help="Rebuild scene_rating_aggregates from ratings",
+    )
+    aggregates_rebuild.add_argument(
+        "--scene-id",
+        action="append",
+        help="Only rebuild this scene (repeatable)",
+    )
+
+    aggregates_check = aggregates_sub.add_parser(
+        "check",
+        help="Compare scene_rating_aggregates with the live aggregate query",
+    )
+    aggregates_check.add_argument(
+        "--scene-id",
+        action="append",
+        help="Only check this scene (repeatable)",
+    )
+    aggregates_check.add_argument("--limit", type=int, default=20, help="Limit mismatches logged")
+
+    snapshots = subparsers.add_parser("snapshots", help="Immutable snapshots of locked scenes/finished matches")
+    snapshots_sub = snapshots.add_subparsers(dest="snapshots_command", required=True)
+    snapshots_sub.add_parser(
+        "freeze",
+        help="(Re)freeze all locked scenes and finished matches",
+    )
+
+    inplay_raw = subparsers.add_parser("inplay-raw", help="SportMonks inplay raw archive")
+    inplay_raw_sub = inplay_raw.add_subparsers(dest="inplay_raw_command", required=True)
+    inplay_raw_maintain = inplay_raw_sub.add_parser(
+        "maintain",
+        help="Create upcoming day partitions, roll up and drop old ones",
+    )
+    inplay_raw_maintain.add_argument("--keep-days", type=int, default=14, help="Days of raw payloads to keep")
+    inplay_raw_maintain.add_argument("--days-ahead", type=int, default=3, help="Partitions to pre-create")
+    inplay_raw_maintain.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+
+    jobs = subparsers.add_parser("jobs", help="Exclusive job runs (advisory locks)")
+    jobs_sub = jobs.add_subparsers(dest="jobs_command", required=True)
+    jobs_list = jobs_sub.add_parser("list", help="List recent job runs")
+    jobs_list.add_argument("--job", help="Filter by job key, e.g. sportmonks:inplay")
+    jobs_list.add_argument("--limit", type=int, default=20, help="Rows to show")
+
+    cache = subparsers.add_parser("http-cache", help="On-disk HTTP response cache")
+    cache_sub = cache.add_subparsers(dest="http_cache_command", required=True)
+    cache_prune = cache_sub.add_parser("prune", help="Remove long expired entries and unreferenced bodies")
+    cache_prune.add_argument(
+        "--keep-seconds",
+        type=float,
+        default=None,
+        help="Keep expired entries this long for revalidation (default HTTP_CACHE_KEEP_SECONDS)",
+    )
+
+    worker = subparsers.add_parser("worker", help="Run the SportMonks inplay ingest worker")
+    worker.add_argument("--name", default="inplay", help="Worker name (status row key)")
+    worker.add_argument("--once", action="store_true", help="Run a single scheduling step and exit")
+
     return parser
 
 
+def _run_inplay_raw_maintain(args: argparse.Namespace) -> int:
+    from datetime import datetime, timezone
+
+    from app.core.sportmonks.raw_partitions import ensure_partitions, prune_inplay_raw
+    from app.db import engine
+
+    today = datetime.now(timezone.utc).date()
+    with engine.begin() as conn:
+        created = [] if args.dry_run else ensure_partitions(conn, today, args.days_ahead)
+        result = prune_inplay_raw(conn, args.keep_days, dry_run=args.dry_run)
+    print(
+        f"[inplay-raw] maintain cutoff={result['cutoff'].date().isoformat()} "
+        f"partitions_ensured={len(created)} partitions_dropped={len(result['dropped'])} "
+        f"rows_deleted={result['deleted_rows']} dry_run={args.dry_run}"
+    )
+    for name in result["dropped"]:
+        print(f"[inplay-raw] drop {name}")
+    return 0
+
+
+def _run_worker(args: argparse.Namespace) -> int:
+    import logging
+
+    from app.core.sportmonks.worker import InplayWorker
+
+    if not settings.SPORTMONKS_ENABLED:
+        print("[sportmonks] disabled")
+        return 0
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    worker = InplayWorker(name=args.name)
+    if args.once:
+        # wie der Dauerlauf nur mit dem sportmonks:inplay-Lock (nie neben Worker/Cron-Poll)
+        if not worker.lease.acquire():
+            print("[worker] skipped: sportmonks:inplay already running")
+            return 0
+        try:
+            delay = worker.step()
+        finally:
+            worker.lease.release(result={"last_success_at": worker.status["last_success_at"]})
+        status = worker.status
+        print(
+            f"[worker] mode={status['mode']} live_fixtures={status['live_fixtures']} "
+            f"latency_ms={status['last_latency_ms']} next_poll_in={delay:.0f}s"
+        )
+        return 0
+    worker.run()
+    return 0
+
+
+def _run_aggregates_rebuild(args: argparse.Namespace) -> int:
+    from app.core.aggregates import rebuild_scene_aggregates
+    from app.db import engine
+
+    scope = ",".join(args.scene_id) if args.scene_id else "all"
+    print(f"[aggregates] rebuild start scenes={scope}")
+    with engine.begin() as conn:
+        count = rebuild_scene_aggregates(conn, args.scene_id)
+    print(f"[aggregates] rebuild done scenes_written={count}")
+    return 0
+
+
+def _run_aggregates_check(args: argparse.Namespace) -> int:
+    from app.core.aggregates import check_scene_aggregates
+    from app.db import engine
+
+    with engine.connect() as conn:
+        mismatches = check_scene_aggregates(conn, args.scene_id)
+    limit = max(0, int(args.limit))
+    for item in mismatches[:limit]:
+        print(
+            "[aggregates] mismatch scene_id={scene_id} fields={fields}".format(
+                scene_id=item["scene_id"],
+                fields=",".join(item["fields"]),
+            )
+        )
+    print(f"[aggregates] check done mismatches={len(mismatches)}")
+    return 1 if mismatches else 0
+
+
+def _run_snapshots_freeze(_args: argparse.Namespace) -> int:
+    from app.core.snapshots import freeze_locked_scenes
+    from app.db import engine
+
+    with engine.begin() as conn:
+        count = freeze_locked_scenes(conn)
+    print(f"[snapshots] freeze done locked_scenes={count}")
+    return 0
+
+
+def _run_jobs_list(args: argparse.Namespace) -> int:
+    from app.core.jobs import list_job_runs
+
+    for row in list_job_runs(args.limit, args.job):
+        print(
+            f"[jobs] run_id={row['run_id']} job={row['job_key']} status={row['status']} "
+            f"holder={row['holder']} started_at={row['started_at']} duration_ms={row['duration_ms']}"
+            + (f" error={row['error']}" if row["error"] else "")
+        )
+    return 0
+
+
 def _run_sync_schedules(args: argparse.Namespace) -> int:
+    from app.core.jobs import JobAlreadyRunning
     from app.core.sportmonks.service import sync_league_schedule
 
     if not settings.SPORTMONKS_ENABLED:
@@ -116,7 +326,11 @@ def _run_sync_schedules(args: argparse.Namespace) -> int:
     total = {"processed": 0, "inserted": 0, "updated": 0, "skipped": 0}
     print(f"[sync-schedules] start season={args.season} leagues={','.join(leagues)}")
     for league in leagues:
-        result = sync_league_schedule(league, args.season)
+        try:
+            result = sync_league_schedule(league, args.season)
+        except JobAlreadyRunning as exc:
+            print(f"[sync-schedules] league={league} skipped, {exc.job_key} already running")
+            continue
         print(
             f"[sync-schedules] league={league} "
             f"processed={result['processed']} inserted={result['inserted']} "
@@ -132,14 +346,22 @@ def _run_sync_schedules(args: argparse.Namespace) -> int:
 
 
 def _run_poll_inplay(_args: argparse.Namespace) -> int:
+    from app.core.jobs import JobAlreadyRunning
     from app.core.sportmonks.service import poll_inplay_and_persist
 
     if not settings.SPORTMONKS_ENABLED:
         print("[sportmonks] disabled")
         return 0
     print("[poll-inplay] start")
-    count = poll_inplay_and_persist()
-    print(f"[poll-inplay] done matches_upserted={count}")
+    try:
+        result = poll_inplay_and_persist()
+    except JobAlreadyRunning as exc:
+        print(f"[poll-inplay] skipped, {exc.job_key} already running")
+        return 0
+    print(
+        f"[poll-inplay] done fixtures={result['fixtures']} changed={result['changed']} "
+        f"unchanged={result['unchanged']} matches_upserted={result['matches_upserted']}"
+    )
     return 0
 
 
@@ -173,13 +395,16 @@ def _run_shadow_inplay(args: argparse.Namespace) -> int:
 
     try:
         payload, status_code, payload_size = fetch_inplay_readonly(
-            include="participants;events;league;season"
+            include=SHADOW_PROFILE.include
         )
     except (httpx.ConnectTimeout, httpx.ReadTimeout, httpx.ConnectError) as exc:
         print(
             f"[shadow] sportmonks fetch failed: {exc.__class__.__name__} -> exit 0"
         )
         return 0
+    except BudgetExhausted as exc:
+        print(f"[shadow] skipped: {exc} -> exit 0")
+        return 0
 
     fixtures = _extract_fixtures(payload)
     normalized = []
@@ -236,6 +461,9 @@ def _run_shadow_schedule(args: argparse.Namespace) -> int:
             f"[shadow] sportmonks fetch failed: {exc.__class__.__name__} -> exit 0"
         )
         return 0
+    except BudgetExhausted as exc:
+        print(f"[shadow] skipped: {exc} -> exit 0")
+        return 0
 
     fixtures = _extract_fixtures(payload)
     fixture_ids = []
@@ -318,69 +546,117 @@ def _run_shadow_participants(args: argparse.Namespace) -> int:
     return 0
 
 
+def _load_archived_inplay_payload():
+    from sqlalchemy import text
+
+    from app.core.sportmonks.raw_archive import unpack_payload
+    from app.db import engine
+
+    with engine.connect() as conn:
+        row = conn.execute(text("""
+            select r.payload_gz, r.payload
+            from referee_ratings.sportmonks_inplay_raw_summary s
+            join referee_ratings.sportmonks_inplay_raw r
+              on r.id = s.last_raw_id and r.fetched_at = s.last_raw_fetched_at
+            where s.stream = 'inplay'
+        """)).first()
+    if not row:
+        raise RuntimeError("No archived inplay payload found")
+    return unpack_payload(row[0], row[1])
+
+
+def _run_shadow_profiles(args: argparse.Namespace) -> int:
+    from datetime import datetime, timezone
+
+    from app.core.sportmonks.inplay_repository import build_inplay_state_rows
+
+    if not settings.SPORTMONKS_ENABLED:
+        print("[shadow] provider != sportmonks -> exit 0")
+        return 0
+
+    settings.validate_settings()
+
+    if args.from_archive:
+        payload = _load_archived_inplay_payload()
+        source = "archive"
+    else:
+        with Path(args.from_file).open("r", encoding="utf-8") as handle:
+            payload = json.load(handle)
+        source = args.from_file
+
+    # Profil taugt fuers Inplay-Polling, wenn daraus dieselben Zustandszeilen entstehen
+    fetched_at = datetime.now(timezone.utc)
+    expected_rows = build_inplay_state_rows(payload, fetched_at=fetched_at)
+    rows = compare_profiles(payload, args.profile)
+    for row in rows:
+        trimmed = apply_profile(payload, PROFILES[row["profile"]])
+        row["inplay_state_ok"] = build_inplay_state_rows(trimmed, fetched_at=fetched_at) == expected_rows
+
+    print(
+        "[shadow] profiles: source={source} fixtures={fixtures} recorded_bytes={size}".format(
+            source=source,
+            fixtures=len(expected_rows),
+            size=rows[0]["recorded_bytes"] if rows else 0,
+        )
+    )
+    for row in rows:
+        print(
+            "[shadow] profile={profile} bytes={bytes} saved_pct={saved_pct} inplay_state_ok={ok}".format(
+                ok="yes" if row["inplay_state_ok"] else "no",
+                **row,
+            )
+        )
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    return 0
+
+
 def _run_sportmonks_seasons(args: argparse.Namespace) -> int:
     token = settings.SPORTMONKS_API_TOKEN
     if not token:
         raise ValueError("SPORTMONKS_API_TOKEN is required for sportmonks seasons")
 
-    base_url = "https://api.sportmonks.com/v3/football"
     page_limit = max(1, int(args.page_limit))
     matcher = re.compile(args.contains) if args.contains else None
 
     rows = []
-    timeout = httpx.Timeout(connect=10.0, read=30.0, write=30.0, pool=10.0)
-    with httpx.Client(base_url=base_url, timeout=timeout) as client:
-        for page in range(1, page_limit + 1):
-            params = {
-                "api_token": token,
-                "include": "league",
-                "select": "id,name,league_id,is_current",
-                "filters": f"seasonLeagues:{args.league_id}",
-                "order": "desc",
-                "per_page": 50,
-                "page": page,
-            }
-            safe_params = dict(params)
-            safe_params["api_token"] = "***"
-            request_url = str(client.base_url.join("/seasons"))
-            print(f"[sportmonks] GET {request_url} params={safe_params}")
-            response = None
-            for attempt in range(2):
-                try:
-                    response = client.get("https://api.sportmonks.com/v3/football/seasons", params=params)
-                    break
-                except httpx.ReadTimeout:
-                    if attempt == 0:
-                        print("[sportmonks] read timeout, retrying once")
-                        continue
-                    raise
-            print(f"[sportmonks] status={response.status_code}")
-            if response.status_code != 200:
-                body_preview = response.text[:500]
-                print(f"[sportmonks] body_preview={body_preview}")
-                raise RuntimeError(
-                    f"SportMonks request failed with status {response.status_code}"
-                )
-            payload = response.json()
-            data = payload.get("data") if isinstance(payload, dict) else None
-            if not isinstance(data, list) or not data:
-                if isinstance(payload, dict):
-                    message = payload.get("message")
-                    if isinstance(message, str):
-                        lowered = message.lower()
-                        if "don't have access" in lowered or "subscription" in lowered:
-                            raise RuntimeError(
-                                "SportMonks subscription does not grant access to seasons for this request. "
-                                "Current plan appears to be Free. Upgrade subscription or provide season_id "
-                                "manually in league_mapping.py."
-                            )
-                    keys = list(payload.keys())
-                    pagination = payload.get("pagination") if isinstance(payload.get("pagination"), dict) else None
+    params = {
+        "include": "league",
+        "select": "id,name,league_id,is_current",
+        "filters": f"seasonLeagues:{args.league_id}",
+        "order": "desc",
+        "per_page": 50,
+    }
+    # Der geteilte Prozess-Client (main() schliesst ihn). seasons dient auch zum Nachschlagen
+    # der season_id vor dem Einschalten der Ingestion: dann ein eigener Client, der hier
+    # geschlossen wird.
+    shared = settings.is_sportmonks_active()
+    client = get_sportmonks_client() if shared else SportMonksClient(token)
+    try:
+        print(f"[sportmonks] GET {client.base_url}/seasons params={params} page_limit={page_limit}")
+        # Folgeseiten kommen parallel und ungeordnet an; fuer die Ausgabe nach Seite sortieren
+        pages = sorted(client.iter_pages(
+            "seasons", "/seasons", params, max_pages=page_limit, cache_ttl=SEASONS_CACHE_TTL_SECONDS
+        ))
+        print(f"[sportmonks] pages={len(pages)} retries={client.retries}")
+        payload = pages[0].payload
+        if not payload.get("data"):
+            message = payload.get("message")
+            if isinstance(message, str):
+                lowered = message.lower()
+                if "don't have access" in lowered or "subscription" in lowered:
                     raise RuntimeError(
-                        f"SportMonks seasons response missing data: keys={keys} pagination={pagination}"
+                        "SportMonks subscription does not grant access to seasons for this request. "
+                        "Current plan appears to be Free. Upgrade subscription or provide season_id "
+                        "manually in league_mapping.py."
                     )
-                raise RuntimeError("SportMonks seasons response missing data and payload is not a dict")
-            for item in data:
+            keys = list(payload.keys())
+            pagination = payload.get("pagination") if isinstance(payload.get("pagination"), dict) else None
+            raise RuntimeError(
+                f"SportMonks seasons response missing data: keys={keys} pagination={pagination}"
+            )
+        for page in pages:
+            for item in page.payload.get("data") or []:
                 if not isinstance(item, dict):
                     continue
                 name = str(item.get("name") or "")
@@ -394,6 +670,10 @@ def _run_sportmonks_seasons(args: argparse.Namespace) -> int:
                         "is_current": item.get("is_current"),
                     }
                 )
+    finally:
+        _print_client_stats(client)
+        if not shared:
+            client.close()
 
     header = f"{'id':>8}  {'league_id':>9}  {'current':>7}  name"
     print(header)
@@ -405,9 +685,40 @@ def _run_sportmonks_seasons(args: argparse.Namespace) -> int:
     return 0
 
 
+def _run_http_cache_prune(args: argparse.Namespace) -> int:
+    if args.keep_seconds is None:
+        removed = http_cache.prune()
+    else:
+        removed = http_cache.prune(args.keep_seconds)
+    print(f"[http-cache] dir={http_cache.directory} removed_entries={removed['entries']} removed_bodies={removed['bodies']}")
+    return 0
+
+
+def _print_client_stats(client: SportMonksClient) -> None:
+    for endpoint, item in client.stats()["endpoints"].items():
+        print(
+            f"[sportmonks] endpoint={endpoint} requests={item['requests']} errors={item['errors']} "
+            f"bytes={item['bytes']} latency_ms_avg={item['latency_ms_avg']} latency_ms_max={item['latency_ms_max']}",
+            file=sys.stderr,
+        )
+
+
+def _print_cache_stats() -> None:
+    stats = http_cache.stats()
+    if not stats["enabled"] or not (stats["hits"] or stats["misses"] or stats["stores"]):
+        return
+    print(
+        f"[http-cache] hits={stats['hits']} misses={stats['misses']} revalidated={stats['revalidated']} "
+        f"stores={stats['stores']} errors={stats['errors']}",
+        file=sys.stderr,
+    )
+
+
 def main() -> int:
     parser = _build_parser()
     args = parser.parse_args()
+    if args.no_cache:
+        http_cache.enabled = False
     try:
         if args.command == "sync-schedules":
             return _run_sync_schedules(args)
@@ -422,13 +733,38 @@ def main() -> int:
                 return _run_shadow_schedules(args)
             if args.shadow_command == "participants":
                 return _run_shadow_participants(args)
+            if args.shadow_command == "profiles":
+                return _run_shadow_profiles(args)
         if args.command == "sportmonks":
             if args.sportmonks_command == "seasons":
                 return _run_sportmonks_seasons(args)
+        if args.command == "aggregates":
+            if args.aggregates_command == "rebuild":
+                return _run_aggregates_rebuild(args)
+            if args.aggregates_command == "check":
+                return _run_aggregates_check(args)
+        if args.command == "snapshots":
+            if args.snapshots_command == "freeze":
+                return _run_snapshots_freeze(args)
+        if args.command == "inplay-raw":
+            if args.inplay_raw_command == "maintain":
+                return _run_inplay_raw_maintain(args)
+        if args.command == "jobs":
+            if args.jobs_command == "list":
+                return _run_jobs_list(args)
+        if args.command == "http-cache":
+            if args.http_cache_command == "prune":
+                return _run_http_cache_prune(args)
+        if args.command == "worker":
+            return _run_worker(args)
         raise RuntimeError(f"Unknown command: {args.command}")
     except Exception:
         traceback.print_exc()
         return 1
+    finally:
+        # Pool sauber schliessen (offene Keep-Alive-Verbindungen)
+        close_sportmonks_client()
+        _print_cache_stats()
 
 
 if __name__ == "__main__":
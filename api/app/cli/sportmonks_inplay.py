@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+from app.core.jobs import JobAlreadyRunning
 from app.core.sportmonks.service import poll_inplay_and_persist
 
 
 def main() -> None:
-    result = poll_inplay_and_persist()
+    try:
+        result = poll_inplay_and_persist()
+    except JobAlreadyRunning as exc:
+        print(f"skipped, {exc.job_key} already running")
+        return
     print(result)
 
 
@@ -0,0 +1,371 @@
+from __future__ import annotations
+
+import json
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from sqlalchemy import text
+
+from app.core.etag import SCENE_RATINGS, bump_versions
+
+
+# Inkrementell gepflegte Szenen-Aggregate (referee_ratings.scene_rating_aggregates).
+# Jede neue Bewertung erhoeht die Zaehler in derselben Transaktion wie der Insert,
+# der Aggregate-Endpoint liest danach nur noch eine Zeile per Primary Key.
+
+DIST_COLUMNS = (
+    "decision_dist",
+    "confidence_dist",
+    "channel_dist",
+    "time_type_dist",
+    "rule_knowledge_dist",
+)
+
+
+# Upsert eines Ratings ins Aggregat; {source} ist entweder "values (...)" (apply_rating)
+# oder "select ... from <cte>" (Ein-Statement-Submission in ratings.py).
+_APPLY_RATING_EXPRS = """
+        cast(:scene_id as uuid),
+        1,
+        :decision_score,
+        :confidence_score,
+        jsonb_build_object(cast(:decision_score as text), 1),
+        jsonb_build_object(cast(:confidence_score as text), 1),
+        jsonb_build_object(cast(:perception_channel as text), 1),
+        jsonb_build_object(cast(:rating_time_type as text), 1),
+        jsonb_build_object(cast(:rule_knowledge as text), 1),
+        now()
+"""
+
+_APPLY_RATING_TEMPLATE = """
+    insert into referee_ratings.scene_rating_aggregates as a (
+        scene_id,
+        rating_count,
+        decision_sum,
+        confidence_sum,
+        decision_dist,
+        confidence_dist,
+        channel_dist,
+        time_type_dist,
+        rule_knowledge_dist,
+        updated_at
+    ) {source}
+    on conflict (scene_id) do update set
+        rating_count = a.rating_count + 1,
+        decision_sum = a.decision_sum + excluded.decision_sum,
+        confidence_sum = a.confidence_sum + excluded.confidence_sum,
+        decision_dist = a.decision_dist || jsonb_build_object(
+            cast(:decision_score as text),
+            coalesce((a.decision_dist ->> cast(:decision_score as text))::int, 0) + 1
+        ),
+        confidence_dist = a.confidence_dist || jsonb_build_object(
+            cast(:confidence_score as text),
+            coalesce((a.confidence_dist ->> cast(:confidence_score as text))::int, 0) + 1
+        ),
+        channel_dist = a.channel_dist || jsonb_build_object(
+            cast(:perception_channel as text),
+            coalesce((a.channel_dist ->> cast(:perception_channel as text))::int, 0) + 1
+        ),
+        time_type_dist = a.time_type_dist || jsonb_build_object(
+            cast(:rating_time_type as text),
+            coalesce((a.time_type_dist ->> cast(:rating_time_type as text))::int, 0) + 1
+        ),
+        rule_knowledge_dist = a.rule_knowledge_dist || jsonb_build_object(
+            cast(:rule_knowledge as text),
+            coalesce((a.rule_knowledge_dist ->> cast(:rule_knowledge as text))::int, 0) + 1
+        ),
+        updated_at = now()
+"""
+
+_APPLY_RATING_SQL = text(_APPLY_RATING_TEMPLATE.format(source=f"values ({_APPLY_RATING_EXPRS})"))
+
+
+def apply_rating_sql_from(cte: str) -> str:
+    """Aggregat-Upsert als SQL-Fragment, das nur fuer Zeilen aus cte greift (fuer WITH-Statements)."""
+    return _APPLY_RATING_TEMPLATE.format(source=f"select {_APPLY_RATING_EXPRS} from {cte}")
+
+
+# Verteilungen zweier Aggregate schluesselweise addieren (Batch-Upsert).
+def _merge_dist_sql(column: str) -> str:
+    return f"""(
+            select coalesce(jsonb_object_agg(k, n), '{{}}'::jsonb)
+            from (
+              select k, sum(v::int) as n
+              from (
+                select * from jsonb_each_text(a.{column})
+                union all
+                select * from jsonb_each_text(excluded.{column})
+              ) x(k, v)
+              group by k
+            ) y
+        )"""
+
+
+_APPLY_BATCH_TEMPLATE = """
+    insert into referee_ratings.scene_rating_aggregates as a (
+        scene_id, rating_count, decision_sum, confidence_sum,
+        decision_dist, confidence_dist, channel_dist, time_type_dist, rule_knowledge_dist,
+        updated_at
+    ) values {values}
+    on conflict (scene_id) do update set
+        rating_count = a.rating_count + excluded.rating_count,
+        decision_sum = a.decision_sum + excluded.decision_sum,
+        confidence_sum = a.confidence_sum + excluded.confidence_sum,
+""" + ",\n".join(f"        {col} = {_merge_dist_sql(col)}" for col in DIST_COLUMNS) + """,
+        updated_at = now()
+"""
+
+# Rating-Feld -> Verteilungsspalte
+_DIST_SOURCES = (
+    ("decision_score", "decision_dist"),
+    ("confidence_score", "confidence_dist"),
+    ("perception_channel", "channel_dist"),
+    ("rating_time_type", "time_type_dist"),
+    ("rule_knowledge", "rule_knowledge_dist"),
+)
+
+
+def summarize_ratings(ratings: Iterable[Mapping[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Fasst Bewertungen pro Szene zu Aggregat-Deltas zusammen (Zaehler, Summen, Verteilungen)."""
+    deltas: Dict[str, Dict[str, Any]] = {}
+    for rating in ratings:
+        scene_id = str(rating["scene_id"])
+        delta = deltas.get(scene_id)
+        if delta is None:
+            delta = {"rating_count": 0, "decision_sum": 0, "confidence_sum": 0}
+            delta.update({col: Counter() for col in DIST_COLUMNS})
+            deltas[scene_id] = delta
+        delta["rating_count"] += 1
+        delta["decision_sum"] += int(rating["decision_score"])
+        delta["confidence_sum"] += int(rating["confidence_score"])
+        for field, col in _DIST_SOURCES:
+            delta[col][str(rating[field])] += 1
+    return deltas
+
+
+def apply_ratings(conn, ratings: Iterable[Mapping[str, Any]]) -> int:
+    """Zaehlt mehrere frisch eingefuegte Bewertungen mit einem Statement ein; liefert die Anzahl Szenen."""
+    deltas = summarize_ratings(ratings)
+    if not deltas:
+        return 0
+    values = []
+    params: Dict[str, Any] = {}
+    for i, (scene_id, delta) in enumerate(sorted(deltas.items())):
+        dists = ", ".join(f"cast(:{col}_{i} as jsonb)" for col in DIST_COLUMNS)
+        values.append(
+            f"(cast(:scene_id_{i} as uuid), :rating_count_{i}, :decision_sum_{i}, :confidence_sum_{i}, {dists}, now())"
+        )
+        params[f"scene_id_{i}"] = scene_id
+        params[f"rating_count_{i}"] = delta["rating_count"]
+        params[f"decision_sum_{i}"] = delta["decision_sum"]
+        params[f"confidence_sum_{i}"] = delta["confidence_sum"]
+        for col in DIST_COLUMNS:
+            params[f"{col}_{i}"] = json.dumps(dict(delta[col]))
+    conn.execute(text(_APPLY_BATCH_TEMPLATE.replace("{values}", ", ".join(values))), params)
+    return len(deltas)
+
+
+_AGGREGATE_COLUMNS = """
+      coalesce(a.rating_count, 0) as rating_count,
+      case when coalesce(a.rating_count, 0) > 0
+           then a.decision_sum::float / a.rating_count
+           else 0 end as avg_decision,
+      case when coalesce(a.rating_count, 0) > 0
+           then a.confidence_sum::float / a.rating_count
+           else 0 end as avg_confidence,
+      coalesce(a.decision_dist, '{}'::jsonb) as decision_dist,
+      coalesce(a.confidence_dist, '{}'::jsonb) as confidence_dist,
+      coalesce(a.channel_dist, '{}'::jsonb) as channel_dist,
+      coalesce(a.time_type_dist, '{}'::jsonb) as time_type_dist,
+      coalesce(a.rule_knowledge_dist, '{}'::jsonb) as rule_knowledge_dist,
+      now()::timestamptz as computed_at
+"""
+
+_GET_AGGREGATE_SQL = text(f"""
+    select
+      s.scene_id,
+      {_AGGREGATE_COLUMNS}
+    from referee_ratings.scenes s
+    left join referee_ratings.scene_rating_aggregates a on a.scene_id = s.scene_id
+    where s.scene_id = cast(:scene_id as uuid)
+      and s.scene_type != 'GOAL'
+""")
+
+_STORED_AGGREGATE_SQL = text(f"""
+    select
+      a.scene_id,
+      {_AGGREGATE_COLUMNS}
+    from referee_ratings.scene_rating_aggregates a
+    where a.scene_id = cast(:scene_id as uuid)
+""")
+
+# Bisherige Live-Berechnung, bleibt fuer den Konsistenz-Check erhalten.
+LIVE_AGGREGATE_SQL = text("""
+with r as (
+  select
+    decision_score,
+    confidence_score,
+    perception_channel::text as perception_channel,
+    rating_time_type::text as rating_time_type,
+    rule_knowledge::text as rule_knowledge
+  from referee_ratings.ratings
+  where scene_id = cast(:scene_id as uuid)
+)
+select
+  cast(:scene_id as uuid) as scene_id,
+  (select count(*) from r) as rating_count,
+  (select coalesce(avg(decision_score)::numeric, 0)::float from r) as avg_decision,
+  (select coalesce(avg(confidence_score)::numeric, 0)::float from r) as avg_confidence,
+  (select coalesce(jsonb_object_agg(decision_score::text, cnt), '{}'::jsonb)
+     from (select decision_score, count(*) cnt from r group by decision_score order by decision_score) x) as decision_dist,
+  (select coalesce(jsonb_object_agg(confidence_score::text, cnt), '{}'::jsonb)
+     from (select confidence_score, count(*) cnt from r group by confidence_score order by confidence_score) x) as confidence_dist,
+  (select coalesce(jsonb_object_agg(perception_channel, cnt), '{}'::jsonb)
+     from (select perception_channel, count(*) cnt from r group by perception_channel order by perception_channel) x) as channel_dist,
+  (select coalesce(jsonb_object_agg(rating_time_type, cnt), '{}'::jsonb)
+     from (select rating_time_type, count(*) cnt from r group by rating_time_type order by rating_time_type) x) as time_type_dist,
+  (select coalesce(jsonb_object_agg(rule_knowledge, cnt), '{}'::jsonb)
+     from (select rule_knowledge, count(*) cnt from r group by rule_knowledge order by rule_knowledge) x) as rule_knowledge_dist,
+  now()::timestamptz as computed_at
+""")
+
+_REBUILD_SELECT = """
+    select
+      t.scene_id,
+      t.rating_count,
+      t.decision_sum,
+      t.confidence_sum,
+      (select jsonb_object_agg(decision_score::text, cnt)
+         from (select decision_score, count(*) cnt from referee_ratings.ratings x
+               where x.scene_id = t.scene_id group by decision_score) d) as decision_dist,
+      (select jsonb_object_agg(confidence_score::text, cnt)
+         from (select confidence_score, count(*) cnt from referee_ratings.ratings x
+               where x.scene_id = t.scene_id group by confidence_score) d) as confidence_dist,
+      (select jsonb_object_agg(perception_channel::text, cnt)
+         from (select perception_channel, count(*) cnt from referee_ratings.ratings x
+               where x.scene_id = t.scene_id group by perception_channel) d) as channel_dist,
+      (select jsonb_object_agg(rating_time_type::text, cnt)
+         from (select rating_time_type, count(*) cnt from referee_ratings.ratings x
+               where x.scene_id = t.scene_id group by rating_time_type) d) as time_type_dist,
+      (select jsonb_object_agg(rule_knowledge::text, cnt)
+         from (select rule_knowledge, count(*) cnt from referee_ratings.ratings x
+               where x.scene_id = t.scene_id group by rule_knowledge) d) as rule_knowledge_dist,
+      now() as updated_at
+    from (
+      select scene_id, count(*) as rating_count,
+             sum(decision_score) as decision_sum,
+             sum(confidence_score) as confidence_sum
+      from referee_ratings.ratings
+      {where}
+      group by scene_id
+    ) t
+"""
+
+
+def apply_rating(conn, rating: Mapping[str, Any]) -> None:
+    """Zaehlt eine frisch eingefuegte Bewertung in das Szenen-Aggregat ein."""
+    conn.execute(_APPLY_RATING_SQL, {
+        "scene_id": str(rating["scene_id"]),
+        "decision_score": rating["decision_score"],
+        "confidence_score": rating["confidence_score"],
+        "perception_channel": rating["perception_channel"],
+        "rating_time_type": rating["rating_time_type"],
+        "rule_knowledge": rating["rule_knowledge"],
+    })
+
+
+def get_scene_aggregate(conn, scene_id: str) -> Optional[Dict[str, Any]]:
+    """Liest das gespeicherte Aggregat; None, wenn die Szene nicht existiert."""
+    row = conn.execute(_GET_AGGREGATE_SQL, {"scene_id": str(scene_id)}).mappings().first()
+    return dict(row) if row else None
+
+
+def compute_live_aggregate(conn, scene_id: str) -> Dict[str, Any]:
+    row = conn.execute(LIVE_AGGREGATE_SQL, {"scene_id": str(scene_id)}).mappings().first()
+    return dict(row)
+
+
+def rebuild_scene_aggregates(conn, scene_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Baut die Aggregate aus referee_ratings.ratings neu auf.
+    Ohne scene_ids wird die komplette Tabelle ersetzt.
+    """
+    if scene_ids is None:
+        conn.execute(text("delete from referee_ratings.scene_rating_aggregates"))
+        where = ""
+        params: Dict[str, Any] = {}
+        ids = [row[0] for row in conn.execute(text("select scene_id::text from referee_ratings.scenes")).all()]
+    else:
+        ids = sorted({str(sid) for sid in scene_ids})
+        if not ids:
+            return 0
+        params = {"scene_ids": ids}
+        conn.execute(
+            text("""
+                delete from referee_ratings.scene_rating_aggregates
+                where scene_id = any(cast(:scene_ids as uuid[]))
+            """),
+            params,
+        )
+        where = "where scene_id = any(cast(:scene_ids as uuid[]))"
+
+    result = conn.execute(text(f"""
+        insert into referee_ratings.scene_rating_aggregates (
+            scene_id, rating_count, decision_sum, confidence_sum,
+            decision_dist, confidence_dist, channel_dist, time_type_dist, rule_knowledge_dist,
+            updated_at
+        )
+        {_REBUILD_SELECT.format(where=where)}
+    """), params)
+    bump_versions(conn, SCENE_RATINGS, ids)
+    return int(result.rowcount or 0)
+
+
+def _normalize_dist(value: Any) -> Dict[str, int]:
+    if not isinstance(value, dict):
+        return {}
+    return {str(k): int(v) for k, v in value.items() if v}
+
+
+def diff_aggregates(stored: Mapping[str, Any], live: Mapping[str, Any]) -> List[str]:
+    """Liefert die Feldnamen, in denen gespeichertes und live berechnetes Aggregat abweichen."""
+    fields = []
+    if int(stored.get("rating_count") or 0) != int(live.get("rating_count") or 0):
+        fields.append("rating_count")
+    for key in ("avg_decision", "avg_confidence"):
+        if abs(float(stored.get(key) or 0) - float(live.get(key) or 0)) > 1e-9:
+            fields.append(key)
+    for key in DIST_COLUMNS:
+        if _normalize_dist(stored.get(key)) != _normalize_dist(live.get(key)):
+            fields.append(key)
+    return fields
+
+
+def check_scene_aggregates(conn, scene_ids: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Vergleicht die gespeicherten Aggregate mit der Live-CTE.
+    Geprueft werden alle Szenen mit Bewertungen oder Aggregat-Zeile (oder nur scene_ids).
+    """
+    if scene_ids is None:
+        rows = conn.execute(text("""
+            select distinct scene_id::text as scene_id from referee_ratings.ratings
+            union
+            select scene_id::text from referee_ratings.scene_rating_aggregates
+        """)).all()
+        ids = sorted(row[0] for row in rows)
+    else:
+        ids = sorted({str(sid) for sid in scene_ids})
+
+    mismatches = []
+    for scene_id in ids:
+        row = conn.execute(_STORED_AGGREGATE_SQL, {"scene_id": scene_id}).mappings().first()
+        stored = dict(row) if row else None
+        live = compute_live_aggregate(conn, scene_id)
+        if stored is None:
+            if int(live.get("rating_count") or 0) > 0:
+                mismatches.append({"scene_id": scene_id, "fields": ["aggregate_missing"]})
+            continue
+        fields = diff_aggregates(stored, live)
+        if fields:
+            mismatches.append({"scene_id": scene_id, "fields": fields})
+    return mismatches
@@ -3,6 +3,13 @@ import os
 from fastapi import FastAPI
 
 from app.core import settings
+from app.core.cache import cache_stats
+from app.core.events import match_events
+from app.core.http_cache import http_cache
+from app.core.invalidation import invalidation_bus
+from app.core.rating_queue import rating_queue
+from app.core.sportmonks import sportmonks_client_stats
+from app.core.sportmonks.budget import sportmonks_budget
 
 
 app = FastAPI(
@@ -22,4 +29,11 @@ def health():
         "status": "ok",
         "sportmonks_enabled": settings.SPORTMONKS_ENABLED,
         "sportmonks_token_present": bool(token and token.strip()),
+        "caches": cache_stats(),
+        "rating_queue": rating_queue.stats(),
+        "match_streams": match_events.stats(),
+        "cache_bus": invalidation_bus.stats(),
+        "sportmonks_http": sportmonks_client_stats(),
+        "sportmonks_budget": sportmonks_budget.stats(),
+        "http_cache": http_cache.stats(),
     }
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+
+# Set-basierte Upserts: ein INSERT ... VALUES (...), (...) ON CONFLICT pro Chunk
+# statt einem Round Trip pro Zeile.
+DEFAULT_CHUNK_SIZE = 500
+
+
+@lru_cache(maxsize=64)
+def _upsert_statement(
+    table: str,
+    columns: Tuple[str, ...],
+    conflict: Tuple[str, ...],
+    update_columns: Tuple[str, ...],
+    row_count: int,
+    skip_unchanged: bool = False,
+) -> TextClause:
+    values = ",\n".join(
+        "(" + ", ".join(f":{col}_{i}" for col in columns) + ")"
+        for i in range(row_count)
+    )
+    if update_columns:
+        action = "do update set " + ", ".join(f"{col} = excluded.{col}" for col in update_columns)
+        if skip_unchanged:
+            # unveraenderte Zeilen nicht anfassen (kein neues Tupel, kein RETURNING)
+            current = ", ".join(f"t.{col}" for col in update_columns)
+            incoming = ", ".join(f"excluded.{col}" for col in update_columns)
+            action += f" where ({current}) is distinct from ({incoming})"
+    else:
+        action = "do nothing"
+    return text(f"""
+        insert into {table} as t ({", ".join(columns)})
+        values {values}
+        on conflict ({", ".join(conflict)}) {action}
+        returning (xmax = 0) as inserted
+    """)
+
+
+def dedupe_rows(rows: Iterable[Dict[str, Any]], key: Sequence[str]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Pro Konfliktschluessel gewinnt die letzte Zeile (wie beim frueheren Loop).
+    Noetig, weil ON CONFLICT DO UPDATE dieselbe Zeile nicht zweimal pro Statement aendern darf.
+    """
+    unique: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    total = 0
+    for row in rows:
+        total += 1
+        unique[tuple(row.get(col) for col in key)] = row
+    return list(unique.values()), total - len(unique)
+
+
+def bulk_upsert(
+    conn,
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Dict[str, Any]],
+    conflict: Sequence[str],
+    update_columns: Optional[Sequence[str]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    skip_unchanged: bool = False,
+) -> Dict[str, int]:
+    """
+    Schreibt rows in Chunks von chunk_size Zeilen.
+    update_columns=None aktualisiert alle Nicht-Konflikt-Spalten.
+    Doppelte Schluessel zaehlen als "updated", damit die Zahlen dem Einzel-Loop entsprechen.
+    skip_unchanged: bestehende Zeilen nur bei echten Aenderungen schreiben; die uebrigen
+    zaehlen als "unchanged" statt "updated".
+    """
+    columns = tuple(columns)
+    conflict = tuple(conflict)
+    if update_columns is None:
+        update_columns = tuple(col for col in columns if col not in conflict)
+    else:
+        update_columns = tuple(update_columns)
+
+    unique, duplicates = dedupe_rows(rows, conflict)
+    inserted = 0
+    # mit skip_unchanged sind ueberholte Duplikate keine Aenderung
+    updated = 0 if skip_unchanged else duplicates
+    unchanged = duplicates if skip_unchanged else 0
+    chunk_size = max(1, int(chunk_size))
+    for start in range(0, len(unique), chunk_size):
+        chunk = unique[start:start + chunk_size]
+        sql = _upsert_statement(table, columns, conflict, update_columns, len(chunk), skip_unchanged)
+        params: Dict[str, Any] = {}
+        for i, row in enumerate(chunk):
+            for col in columns:
+                params[f"{col}_{i}"] = row.get(col)
+        returned = conn.execute(sql, params).mappings().all()
+        for row in returned:
+            if row.get("inserted"):
+                inserted += 1
+            else:
+                updated += 1
+        unchanged += len(chunk) - len(returned)
+    counts = {"inserted": inserted, "updated": updated}
+    if skip_unchanged:
+        counts["unchanged"] = unchanged
+    return counts
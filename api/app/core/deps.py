@@ -1,10 +1,9 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy import text
 from uuid import UUID
 
-from app.db import engine
 from app.core.security import decode_token
+from app.core.user_cache import get_user_status
 
 bearer_scheme = HTTPBearer(auto_error=False)
 openapi_bearer = HTTPBearer(auto_error=False)
@@ -31,13 +30,8 @@ def require_user(
             detail="Invalid token",
         )
 
-    # MVP: Auth-Quelle ist mv_users
-    with engine.begin() as conn:
-        row = conn.execute(
-            text("SELECT user_id, is_active FROM mv_users WHERE user_id = :uid"),
-            {"uid": str(user_id)},
-        ).mappings().first()
-
+    # MVP: Auth-Quelle ist mv_users (gecacht, siehe user_cache)
+    row = get_user_status(str(user_id))
     if not row:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     if not row.get("is_active", False):
@@ -47,12 +41,7 @@ def require_user(
 
 
 def require_admin(user_id: UUID = Depends(require_user)) -> UUID:
-    with engine.begin() as conn:
-        row = conn.execute(
-            text("SELECT is_admin FROM mv_users WHERE user_id = :uid"),
-            {"uid": str(user_id)},
-        ).mappings().first()
-
+    row = get_user_status(str(user_id))
     if not row or row.get("is_admin") is not True:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
 
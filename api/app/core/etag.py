@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Iterable, Optional
+
+from fastapi import Response
+from sqlalchemy import text
+
+
+# Versionszaehler pro Ressource (referee_ratings.resource_versions) als Grundlage fuer
+# starke ETags: ein Conditional GET liest nur die Versionszeile, nicht scenes/ratings.
+# Jeder Schreibpfad, der den Inhalt einer Ressource aendert, muss die Version in
+# derselben Transaktion erhoehen. Manuelle SQL-Aenderungen: Version per Hand hochzaehlen.
+
+MATCH_SCENES = "match_scenes"    # Szenenliste eines Matches (resource_id = match_id)
+SCENE_RATINGS = "scene_ratings"  # Bewertungen/Aggregat einer Szene (resource_id = scene_id)
+MATCHES = "matches"              # Matchliste (resource_id = ALL)
+ALL = "all"
+
+_BUMP_SQL = text("""
+    insert into referee_ratings.resource_versions as v (resource, resource_id, version, updated_at)
+    select :resource, ids.resource_id, 1, now()
+    from unnest(cast(:ids as text[])) as ids(resource_id)
+    on conflict (resource, resource_id) do update set
+        version = v.version + 1,
+        updated_at = now()
+""")
+
+_GET_VERSION_SQL = text("""
+    select version
+    from referee_ratings.resource_versions
+    where resource = :resource and resource_id = :resource_id
+""")
+
+
+def bump_versions(conn, resource: str, resource_ids: Iterable[Any]) -> None:
+    # doppelte ids wuerden ON CONFLICT DO UPDATE zweimal auf dieselbe Zeile treffen
+    ids = sorted({str(rid) for rid in resource_ids if rid is not None})
+    if ids:
+        conn.execute(_BUMP_SQL, {"resource": resource, "ids": ids})
+
+
+def bump_version(conn, resource: str, resource_id: Any) -> None:
+    bump_versions(conn, resource, [resource_id])
+
+
+def bump_scene_match_version(conn, scene_id: Any) -> None:
+    """Szenenliste des Matches, zu dem scene_id gehoert, als geaendert markieren."""
+    conn.execute(text("""
+        insert into referee_ratings.resource_versions as v (resource, resource_id, version, updated_at)
+        select :resource, s.match_id::text, 1, now()
+        from referee_ratings.scenes s
+        where s.scene_id = cast(:scene_id as uuid)
+        on conflict (resource, resource_id) do update set
+            version = v.version + 1,
+            updated_at = now()
+    """), {"resource": MATCH_SCENES, "scene_id": str(scene_id)})
+
+
+def bump_version_sql_from(cte: str, resource: str, id_column: str) -> str:
+    """Versions-Bump als SQL-Fragment fuer WITH-Statements (eine Zeile pro Zeile aus cte)."""
+    return f"""
+        insert into referee_ratings.resource_versions as v (resource, resource_id, version, updated_at)
+        select '{resource}', {cte}.{id_column}::text, 1, now()
+        from {cte}
+        on conflict (resource, resource_id) do update set
+            version = v.version + 1,
+            updated_at = now()
+    """
+
+
+def get_version(conn, resource: str, resource_id: Any) -> int:
+    """0, solange die Ressource nie geaendert wurde."""
+    value = conn.execute(_GET_VERSION_SQL, {"resource": resource, "resource_id": str(resource_id)}).scalar()
+    return int(value or 0)
+
+
+def make_etag(resource: str, resource_id: Any, version: int, *variant: Any) -> str:
+    """Starker ETag; variant = alles, was die Darstellung sonst noch bestimmt (Sprache, Paging)."""
+    tag = f"{resource}-{resource_id}-{version}"
+    if variant:
+        digest = hashlib.sha256(json.dumps(variant, default=str).encode("utf-8")).hexdigest()[:16]
+        tag = f"{tag}-{digest}"
+    return f'"{tag}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        # If-None-Match vergleicht schwach (RFC 9110 13.1.2)
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def conditional_response(response: Response, etag: str, if_none_match: Optional[str]) -> Optional[Response]:
+    """Setzt ETag auf response; liefert eine 304-Antwort, wenn der Client die Version schon hat."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
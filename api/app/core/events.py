@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core import invalidation
+from app.core.aggregates import get_scene_aggregate
+from app.core.invalidation import invalidation_bus
+from app.db import engine
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# Server-Sent Events pro Match (GET /matches/{id}/stream) statt Polling.
+# Alle Streams eines Prozesses haengen am Event-Loop; ein offener Stream kostet nur
+# eine asyncio.Queue mit fester Groesse. publish() ist thread-sicher und wird aus den
+# (synchronen) Admin-/Rating-Endpunkten und dem Rating-Queue-Thread aufgerufen.
+# Laeuft der Puffer eines langsamen Clients voll, wird er geleert und durch ein
+# "resync"-Event ersetzt (Client laedt neu) - der Publisher blockiert nie.
+# aggregate_updated ist pro Szene auf ein Event je AGGREGATE_INTERVAL gedrosselt; das
+# Aggregat wird einmal gelesen und an alle Streams des Matches verteilt.
+# Andere Uvicorn-Worker erfahren Events ueber den Cache-Bus (LISTEN/NOTIFY, app/core/
+# invalidation.py) und stellen sie ihren eigenen Streams zu; aggregate_updated liest
+# jeder Worker selbst. Nach einem Bus-Abbruch bekommen alle Streams "resync".
+# Ohne Bus erreichen Events nur Streams im selben Prozess.
+
+BUFFER_SIZE = int(os.getenv("MATCH_STREAM_BUFFER", "64"))
+MAX_STREAMS = int(os.getenv("MATCH_STREAM_MAX_CONNECTIONS", "5000"))
+HEARTBEAT_SECONDS = float(os.getenv("MATCH_STREAM_HEARTBEAT_SECONDS", "20"))
+AGGREGATE_INTERVAL = float(os.getenv("MATCH_STREAM_AGGREGATE_INTERVAL_SECONDS", "1"))
+RETRY_MS = int(os.getenv("MATCH_STREAM_RETRY_MS", "5000"))
+
+SCENE_RELEASED = "scene_released"
+SCENE_UNRELEASED = "scene_unreleased"
+SCENE_LOCKED = "scene_locked"
+SCENE_UNLOCKED = "scene_unlocked"
+SCENE_DELETED = "scene_deleted"
+AGGREGATE_UPDATED = "aggregate_updated"
+RESYNC = "resync"
+
+
+def encode_event(event: str, data: Any) -> bytes:
+    payload = json.dumps(jsonable_encoder(data), separators=(",", ":"))
+    return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+_RESYNC_MESSAGE = encode_event(RESYNC, {})
+
+
+def _load_aggregates(scene_ids: Iterable[str]) -> list:
+    with engine.connect() as conn:
+        rows = [get_scene_aggregate(conn, scene_id) for scene_id in sorted(scene_ids)]
+    return [row for row in rows if row is not None]
+
+
+class MatchEventHub:
+    def __init__(
+        self,
+        buffer_size: int = BUFFER_SIZE,
+        max_streams: int = MAX_STREAMS,
+        aggregate_interval: float = AGGREGATE_INTERVAL,
+        heartbeat: float = HEARTBEAT_SECONDS,
+    ) -> None:
+        self.buffer_size = max(1, int(buffer_size))
+        self.max_streams = max(1, int(max_streams))
+        self.aggregate_interval = max(0.0, float(aggregate_interval))
+        self.heartbeat = max(1.0, float(heartbeat))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # nur im Event-Loop veraendert; publish() liest lediglich, ob es Abonnenten gibt
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._pending_aggregates: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.published = 0
+        self.delivered = 0
+        self.resyncs = 0
+        self.rejected = 0
+        self.aggregate_batches = 0
+
+    def accepting(self) -> bool:
+        """Stream-Limit pro Prozess (weiche Grenze, geprueft vor dem Oeffnen)."""
+        with self._lock:
+            if self.streams >= self.max_streams:
+                self.rejected += 1
+                return False
+            return True
+
+    def subscribe(self, match_id: str) -> asyncio.Queue:
+        """Nur im Event-Loop aufrufen."""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.buffer_size)
+        self._subscribers.setdefault(match_id, set()).add(queue)
+        with self._lock:
+            self.streams += 1
+        return queue
+
+    def unsubscribe(self, match_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(match_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                self._subscribers.pop(match_id, None)
+        with self._lock:
+            self.streams -= 1
+
+    def _call_in_loop(self, match_id: str, callback, *args) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed() or match_id not in self._subscribers:
+            return
+        try:
+            loop.call_soon_threadsafe(callback, match_id, *args)
+        except RuntimeError:
+            # Loop wurde gerade beendet (Shutdown)
+            pass
+
+    def publish(self, match_id: Any, event: str, data: Any) -> None:
+        """Thread-sicher, nach dem Commit aufrufen; geht auch an Streams anderer Worker (Cache-Bus)."""
+        match_id = str(match_id)
+        data = jsonable_encoder(data)
+        key = json.dumps({"m": match_id, "e": event, "d": data}, separators=(",", ":"))
+        if len(key) > invalidation.MAX_PAYLOAD_BYTES // 2:
+            # passt nicht sicher in ein NOTIFY: andere Worker laden neu
+            key = json.dumps({"m": match_id, "e": RESYNC, "d": {}}, separators=(",", ":"))
+        invalidation_bus.broadcast(invalidation.MATCH_EVENT, key)
+        self.publish_local(match_id, event, data)
+
+    def publish_local(self, match_id: str, event: str, data: Any) -> None:
+        """Nur Streams dieses Prozesses; ohne Abonnenten fuer das Match ein No-Op."""
+        if match_id not in self._subscribers:
+            return
+        self._call_in_loop(match_id, self._deliver, encode_event(event, data))
+
+    def aggregate_changed(self, match_id: Any, scene_ids: Iterable[Any]) -> None:
+        """Thread-sicher; neue Bewertungen -> gedrosseltes aggregate_updated (auch in anderen Workern)."""
+        match_id = str(match_id)
+        scene_ids = sorted({str(sid) for sid in scene_ids})
+        invalidation_bus.broadcast(
+            invalidation.MATCH_AGGREGATES,
+            json.dumps({"m": match_id, "s": scene_ids}, separators=(",", ":")),
+        )
+        self.aggregates_changed_local(match_id, scene_ids)
+
+    def aggregates_changed_local(self, match_id: str, scene_ids: Iterable[str]) -> None:
+        if match_id not in self._subscribers:
+            return
+        self._call_in_loop(match_id, self._schedule_aggregates, set(scene_ids))
+
+    def resync_all(self) -> None:
+        """Thread-sicher; alle Streams dieses Prozesses laden neu (Events koennen verloren sein)."""
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self._subscribers:
+            return
+        try:
+            loop.call_soon_threadsafe(self._resync_all)
+        except RuntimeError:
+            pass
+
+    def _resync_all(self) -> None:
+        for match_id in list(self._subscribers):
+            self._deliver(match_id, _RESYNC_MESSAGE)
+
+    def _deliver(self, match_id: str, message: bytes) -> None:
+        self.published += 1
+        for queue in list(self._subscribers.get(match_id, ())):
+            try:
+                queue.put_nowait(message)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                # langsamer Client: Puffer verwerfen, Client laedt per resync neu
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_RESYNC_MESSAGE)
+                self.resyncs += 1
+
+    def _schedule_aggregates(self, match_id: str, scene_ids: Set[str]) -> None:
+        pending = self._pending_aggregates.get(match_id)
+        if pending is not None:
+            # Timer laeuft schon, Szenen werden mit ausgeliefert
+            pending.update(scene_ids)
+            return
+        self._pending_aggregates[match_id] = set(scene_ids)
+        asyncio.get_running_loop().call_later(self.aggregate_interval, self._start_aggregates, match_id)
+
+    def _start_aggregates(self, match_id: str) -> None:
+        scene_ids = self._pending_aggregates.pop(match_id, set())
+        if scene_ids and match_id in self._subscribers:
+            asyncio.get_running_loop().create_task(self._emit_aggregates(match_id, scene_ids))
+
+    async def _emit_aggregates(self, match_id: str, scene_ids: Set[str]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            rows = await loop.run_in_executor(None, _load_aggregates, scene_ids)
+        except Exception:
+            logger.exception("match stream aggregates failed match_id=%s", match_id)
+            return
+        self.aggregate_batches += 1
+        for row in rows:
+            self._deliver(match_id, encode_event(AGGREGATE_UPDATED, row))
+
+    async def stream(self, match_id: str) -> AsyncIterator[bytes]:
+        queue = self.subscribe(match_id)
+        try:
+            yield f"retry: {RETRY_MS}\n\n".encode("ascii")
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    # Kommentarzeile haelt Proxies/Load-Balancer offen
+                    yield b": keepalive\n\n"
+        finally:
+            self.unsubscribe(match_id, queue)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "streams": self.streams,
+            "matches": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "resyncs": self.resyncs,
+            "rejected": self.rejected,
+            "aggregate_batches": self.aggregate_batches,
+        }
+
+
+match_events = MatchEventHub()
+
+
+def _on_bus_event(key: Optional[str]) -> None:
+    if key is None:
+        match_events.resync_all()
+        return
+    message = json.loads(key)
+    match_events.publish_local(str(message["m"]), str(message["e"]), message.get("d"))
+
+
+def _on_bus_aggregates(key: Optional[str]) -> None:
+    if key is None:
+        match_events.resync_all()
+        return
+    message = json.loads(key)
+    match_events.aggregates_changed_local(str(message["m"]), [str(sid) for sid in message["s"]])
+
+
+invalidation.register(invalidation.MATCH_EVENT, _on_bus_event)
+invalidation.register(invalidation.MATCH_AGGREGATES, _on_bus_aggregates)
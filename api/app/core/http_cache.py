@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional, Tuple
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+# Festplatten-Cache fuer selten geaenderte Provider-Antworten (Saisons, Spielplaene,
+# OpenLigaDB /getavailableleagues), gemeinsam fuer App, CLI und Skripte auf einem Host.
+# entries/<key>.json haelt URL, Ablaufzeit und Validatoren (ETag/Last-Modified),
+# bodies/<sha256> die Antwortbytes inhaltsadressiert (gleiche Antworten nur einmal).
+# Abgelaufene Eintraege werden mit If-None-Match/If-Modified-Since revalidiert, sofern
+# der Upstream Validatoren geliefert hat; 304 verlaengert nur die Ablaufzeit.
+# Geschrieben wird atomar (tmp + rename), parallele Prozesse sehen nie halbe Dateien.
+# Der api_token geht nicht in den Key ein und wird nicht gespeichert.
+
+CACHE_DIR = os.getenv("HTTP_CACHE_DIR", os.path.expanduser("~/.cache/matchvote/http"))
+ENABLED = os.getenv("HTTP_CACHE_ENABLED", "1").strip().lower() in {"1", "true", "yes", "on"}
+# abgelaufene Eintraege so lange fuer Revalidierung behalten (prune)
+KEEP_SECONDS = float(os.getenv("HTTP_CACHE_KEEP_SECONDS", str(7 * 24 * 3600)))
+
+_SECRET_PARAMS = {"api_token"}
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    fresh: bool
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def cache_key(url: str, params: Optional[Mapping[str, Any]] = None) -> str:
+    public = sorted((str(k), str(v)) for k, v in (params or {}).items() if k not in _SECRET_PARAMS)
+    return hashlib.sha256(f"GET {url}?{urlencode(public)}".encode("utf-8")).hexdigest()
+
+
+def _public_url(url: str, params: Optional[Mapping[str, Any]]) -> str:
+    public = {k: v for k, v in (params or {}).items() if k not in _SECRET_PARAMS}
+    return f"{url}?{urlencode(sorted(public.items()))}" if public else url
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class HttpCache:
+    def __init__(self, directory: str = CACHE_DIR, enabled: bool = ENABLED) -> None:
+        self.directory = directory
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stores = 0
+        self.errors = 0
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, "entries", f"{key}.json")
+
+    def _body_path(self, content_sha256: str) -> str:
+        return os.path.join(self.directory, "bodies", content_sha256[:2], content_sha256)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _read_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._entry_path(key), "r", encoding="utf-8") as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            self._count("errors")
+            return None
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        """
+        Frischer oder (mit Validatoren) revalidierbarer Eintrag. Zaehlt hits (kein Request noetig)
+        bzw. misses (Request noetig, auch bei revalidierbarem Eintrag; ein 304 zaehlt zusaetzlich
+        als revalidated), damit alle Aufrufer gleich zaehlen.
+        """
+        if not self.enabled:
+            return None
+        entry = self._read_entry(key)
+        body = None
+        if entry is not None:
+            try:
+                with open(self._body_path(entry["content_sha256"]), "rb") as handle:
+                    body = handle.read()
+            except OSError:
+                body = None
+        if body is None or hashlib.sha256(body).hexdigest() != entry["content_sha256"]:
+            self._count("misses")
+            return None
+        fresh = time.time() < float(entry["expires_at"])
+        if fresh:
+            self._count("hits")
+        else:
+            self._count("misses")
+            if not (entry.get("etag") or entry.get("last_modified")):
+                return None
+        return CachedResponse(body, fresh, entry.get("etag"), entry.get("last_modified"))
+
+    def store(
+        self,
+        key: str,
+        url: str,
+        params: Optional[Mapping[str, Any]],
+        body: bytes,
+        ttl: float,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        if not self.enabled:
+            return
+        headers = headers or {}
+        content_sha256 = hashlib.sha256(body).hexdigest()
+        try:
+            body_path = self._body_path(content_sha256)
+            if not os.path.exists(body_path):
+                _write_atomic(body_path, body)
+            now = time.time()
+            entry = {
+                "url": _public_url(url, params),
+                "content_sha256": content_sha256,
+                "bytes": len(body),
+                "stored_at": now,
+                "expires_at": now + float(ttl),
+                "etag": headers.get("ETag") or headers.get("etag"),
+                "last_modified": headers.get("Last-Modified") or headers.get("last-modified"),
+            }
+            _write_atomic(self._entry_path(key), json.dumps(entry).encode("utf-8"))
+            self._count("stores")
+        except OSError:
+            # Cache ist Optimierung; ein volles/readonly Dateisystem darf den Abruf nicht stoppen
+            self._count("errors")
+
+    def refresh(self, key: str, ttl: float) -> None:
+        """Nach 304: gleiche Bytes, neue Ablaufzeit."""
+        entry = self._read_entry(key)
+        if entry is None:
+            return
+        entry["expires_at"] = time.time() + float(ttl)
+        try:
+            _write_atomic(self._entry_path(key), json.dumps(entry).encode("utf-8"))
+        except OSError:
+            self._count("errors")
+        self._count("revalidated")
+
+    def fetch(
+        self,
+        url: str,
+        params: Optional[Mapping[str, Any]],
+        ttl: float,
+        request: Callable[[Dict[str, str]], Tuple[int, bytes, Mapping[str, str]]],
+    ) -> Tuple[int, bytes, bool]:
+        """
+        request(headers) -> (status, body, headers) fuehrt den echten Abruf aus (beliebiger Client).
+        Liefert (status, body, aus_cache); nur 200 wird gespeichert. ttl <= 0: Cache umgehen.
+        """
+        if not self.enabled or ttl <= 0:
+            status, body, _ = request({})
+            return status, body, False
+        key = cache_key(url, params)
+        cached = self.lookup(key)
+        if cached is not None and cached.fresh:
+            return 200, cached.body, True
+        status, body, headers = request(cached.validators() if cached else {})
+        if status == 304 and cached is not None:
+            self.refresh(key, ttl)
+            return 200, cached.body, True
+        if status == 200:
+            self.store(key, url, params, body, ttl, headers)
+        return status, body, False
+
+    def prune(self, keep_seconds: float = KEEP_SECONDS) -> Dict[str, int]:
+        """Lange abgelaufene Eintraege und nicht mehr referenzierte Bodies loeschen."""
+        removed_entries = removed_bodies = 0
+        referenced = set()
+        entries_dir = os.path.join(self.directory, "entries")
+        cutoff = time.time() - keep_seconds
+        for name in os.listdir(entries_dir) if os.path.isdir(entries_dir) else []:
+            if not name.endswith(".json"):
+                continue
+            entry = self._read_entry(name[:-5])
+            if entry is None or float(entry.get("expires_at", 0)) < cutoff:
+                try:
+                    os.unlink(os.path.join(entries_dir, name))
+                    removed_entries += 1
+                except OSError:
+                    pass
+                continue
+            referenced.add(entry["content_sha256"])
+        bodies_dir = os.path.join(self.directory, "bodies")
+        for root, _, files in os.walk(bodies_dir):
+            for name in files:
+                if name not in referenced:
+                    try:
+                        os.unlink(os.path.join(root, name))
+                        removed_bodies += 1
+                    except OSError:
+                        pass
+        return {"entries": removed_entries, "bodies": removed_bodies}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "stores": self.stores,
+            "errors": self.errors,
+        }
+
+
+def urlopen_cached(
+    cache: HttpCache,
+    url: str,
+    ttl: float,
+    headers: Optional[Mapping[str, str]] = None,
+    timeout: float = 30,
+) -> bytes:
+    """urllib-GET ueber den Cache (fuer die Skripte); HTTPError wie bei urlopen."""
+
+    def request(validators: Dict[str, str]) -> Tuple[int, bytes, Mapping[str, str]]:
+        req = Request(url, headers={**(headers or {}), **validators})
+        try:
+            with urlopen(req, timeout=timeout) as resp:
+                return resp.status, resp.read(), dict(resp.headers.items())
+        except HTTPError as exc:
+            if exc.code == 304:
+                return 304, b"", {}
+            raise
+
+    _, body, _ = cache.fetch(url, None, ttl, request)
+    return body
+
+
+# ein Cache pro Prozess; --no-cache in CLI/Skripten setzt enabled = False
+http_cache = HttpCache()
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import select
+import socket
+import threading
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from app.db import engine
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# Cache-Invalidierung ueber Worker-Grenzen per Postgres LISTEN/NOTIFY (CACHE_BUS_ENABLED=1).
+# Jeder Cache registriert fuer seinen Typ (kind) einen lokalen Evict-Handler; die
+# invalidate_*-Funktionen evicten lokal und melden (kind, key) hier an. Ein Thread pro
+# Prozess haelt eine eigene Verbindung: LISTEN auf CHANNEL, verschickt gesammelte
+# Invalidierungen gebuendelt (ein pg_notify pro Schub) und evictet bei fremden
+# Nachrichten lokal. Nach einem Verbindungsabbruch werden alle registrierten Caches
+# geleert (Nachrichten koennen verloren sein). key None = ganzer Cache.
+# Ohne Bus bleibt alles prozesslokal (TTL begrenzt die Verzoegerung wie bisher).
+
+CHANNEL = os.getenv("CACHE_BUS_CHANNEL", "mv_cache_invalidation")
+RECONNECT_SECONDS = float(os.getenv("CACHE_BUS_RECONNECT_SECONDS", "2"))
+# NOTIFY-Payload ist auf 8000 Bytes begrenzt
+MAX_PAYLOAD_BYTES = 7000
+
+USER_STATUS = "user_status"
+MATCH_STATS = "match_stats"
+SCENE_STATE = "scene_state"
+SNAPSHOT = "snapshot"
+SCHEMA = "schema"
+# keine Caches: SSE-Events fuer Streams in anderen Workern (app/core/events.py)
+MATCH_EVENT = "match_event"
+MATCH_AGGREGATES = "match_aggregates"
+# Events sind keine idempotenten Keys: nicht deduplizieren, Reihenfolge beibehalten
+ORDERED_KINDS = frozenset({MATCH_EVENT, MATCH_AGGREGATES})
+
+Key = Tuple[str, Optional[str]]
+
+_NOTIFY_SQL = text("select pg_notify(:channel, :payload)")
+
+_handlers: Dict[str, Callable[[Optional[str]], None]] = {}
+
+
+def register(kind: str, handler: Callable[[Optional[str]], None]) -> None:
+    """handler(key) evictet nur lokal (key None = alles) und darf nicht selbst broadcasten."""
+    _handlers[kind] = handler
+
+
+def evict_local(kind: str, key: Optional[str]) -> None:
+    handler = _handlers.get(kind)
+    if handler is None:
+        return
+    try:
+        handler(key)
+    except Exception:
+        logger.exception("cache bus evict failed kind=%s key=%s", kind, key)
+
+
+def encode_payloads(origin: str, keys: Iterable[Key]) -> List[str]:
+    """Buendelt Keys zu JSON-Payloads unterhalb des NOTIFY-Limits."""
+    payloads: List[str] = []
+    batch: List[List[Optional[str]]] = []
+    size = 0
+    for kind, key in keys:
+        item = [kind, key]
+        item_size = len(json.dumps(item)) + 1
+        if batch and size + item_size > MAX_PAYLOAD_BYTES:
+            payloads.append(json.dumps({"o": origin, "k": batch}, separators=(",", ":")))
+            batch, size = [], 0
+        batch.append(item)
+        size += item_size
+    if batch:
+        payloads.append(json.dumps({"o": origin, "k": batch}, separators=(",", ":")))
+    return payloads
+
+
+def decode_payload(payload: str) -> Tuple[Optional[str], List[Key]]:
+    try:
+        data = json.loads(payload)
+        keys = [(str(kind), None if key is None else str(key)) for kind, key in data["k"]]
+        return data.get("o"), keys
+    except Exception:
+        logger.warning("cache bus ignored malformed payload")
+        return None, []
+
+
+class InvalidationBus:
+    def __init__(self, channel: str = CHANNEL) -> None:
+        self.channel = channel
+        self.origin = uuid.uuid4().hex[:12]
+        self._outbox: Set[Key] = set()
+        # ORDERED_KINDS in Publish-Reihenfolge (FIFO)
+        self._events: Deque[Key] = deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self.connected = False
+        self.sent = 0
+        self.notifies = 0
+        self.received = 0
+        self.evicted = 0
+        self.reconnects = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-bus", daemon=True)
+        self._thread.start()
+        logger.info("cache bus started channel=%s origin=%s", self.channel, self.origin)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    def broadcast(self, kind: str, key: Any = None) -> None:
+        """Nach dem Commit aufrufen; lokal ist bereits evictet. Ohne laufenden Bus ein No-Op."""
+        if not self.running:
+            return
+        item = (kind, None if key is None else str(key))
+        with self._lock:
+            if kind in ORDERED_KINDS:
+                self._events.append(item)
+            else:
+                self._outbox.add(item)
+        self._wake()
+
+    def notify_in_transaction(self, conn, keys: Iterable[Key]) -> None:
+        """NOTIFY innerhalb der Schreib-Transaktion (wird erst mit dem Commit zugestellt)."""
+        if not self.running:
+            return
+        for payload in encode_payloads(self.origin, keys):
+            conn.execute(_NOTIFY_SQL, {"channel": self.channel, "payload": payload})
+
+    def _take_outbox(self) -> List[Key]:
+        """Cache-Keys (dedupliziert, sortiert), danach die Events in Publish-Reihenfolge."""
+        with self._lock:
+            keys = sorted(self._outbox, key=lambda item: (item[0], item[1] or ""))
+            keys.extend(self._events)
+            self._outbox.clear()
+            self._events.clear()
+        return keys
+
+    def _requeue(self, keys: List[Key]) -> None:
+        """Nach fehlgeschlagenem Senden; Events vor spaeter publizierte stellen."""
+        with self._lock:
+            self._outbox.update(key for key in keys if key[0] not in ORDERED_KINDS)
+            self._events.extendleft(reversed([key for key in keys if key[0] in ORDERED_KINDS]))
+
+    def _connect(self):
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        raw = engine.dialect.loaded_dbapi.connect(*cargs, **cparams)
+        raw.autocommit = True
+        with raw.cursor() as cur:
+            cur.execute(f'LISTEN "{self.channel}"')
+        return raw
+
+    def _send(self, raw, keys: List[Key]) -> None:
+        payloads = encode_payloads(self.origin, keys)
+        with raw.cursor() as cur:
+            for payload in payloads:
+                cur.execute("select pg_notify(%s, %s)", (self.channel, payload))
+        self.sent += len(keys)
+        self.notifies += len(payloads)
+
+    def handle_payload(self, payload: str) -> None:
+        origin, keys = decode_payload(payload)
+        if origin == self.origin:
+            return
+        self.received += len(keys)
+        for kind, key in keys:
+            evict_local(kind, key)
+            self.evicted += 1
+
+    def _evict_everything(self) -> None:
+        for kind in list(_handlers):
+            evict_local(kind, None)
+
+    def _run(self) -> None:
+        raw = None
+        while not self._stop.is_set():
+            try:
+                if raw is None:
+                    raw = self._connect()
+                    if self.reconnects:
+                        # waehrend der Luecke verpasste Invalidierungen
+                        self._evict_everything()
+                    self.connected = True
+                keys = self._take_outbox()
+                if keys:
+                    try:
+                        self._send(raw, keys)
+                    except Exception:
+                        self._requeue(keys)
+                        raise
+                readable, _, _ = select.select([raw, self._wake_r], [], [], 5.0)
+                if self._wake_r in readable:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                if raw in readable:
+                    raw.poll()
+                    while raw.notifies:
+                        self.handle_payload(raw.notifies.pop(0).payload)
+            except Exception as exc:
+                self.last_error = str(exc)[:200]
+                logger.warning("cache bus connection lost: %s", self.last_error)
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+                raw = None
+                self.connected = False
+                self.reconnects += 1
+                self._stop.wait(RECONNECT_SECONDS)
+        if raw is not None:
+            try:
+                keys = self._take_outbox()
+                if keys:
+                    self._send(raw, keys)
+            finally:
+                raw.close()
+        self.connected = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "connected": self.connected,
+            "channel": self.channel,
+            "pending": len(self._outbox) + len(self._events),
+            "sent": self.sent,
+            "notifies": self.notifies,
+            "received": self.received,
+            "evicted": self.evicted,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+        }
+
+
+invalidation_bus = InvalidationBus()
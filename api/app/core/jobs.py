@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text
+
+from app.db import engine
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# Gegenseitiger Ausschluss fuer Poller/Sync-Jobs ueber Hosts und Cron-Laeufe hinweg.
+# Pro Job-Key ein pg_try_advisory_lock auf einer eigenen Verbindung: der Lock lebt so
+# lange wie die Session (Lease) und faellt bei Absturz/Verbindungsverlust automatisch.
+# Ein Heartbeat-Thread schreibt heartbeat_at in job_runs und merkt, wenn die Session
+# (und damit der Lock) verloren ist -> lease.lost; Jobs rufen zwischen ihren Batches
+# run.check() bzw. lease.check() auf und brechen mit JobLeaseLost ab, bevor sie weiterschreiben.
+# Jeder gehaltene Lauf wird in referee_ratings.job_runs protokolliert.
+
+HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+KEEP_DAYS = int(os.getenv("JOB_RUNS_KEEP_DAYS", "14"))
+
+INPLAY_POLL = "sportmonks:inplay"
+
+
+def schedule_sync_job(league_code: str, season_key: str) -> str:
+    return f"sportmonks:schedule:{league_code}:{season_key}"
+
+
+class JobAlreadyRunning(RuntimeError):
+    def __init__(self, job_key: str) -> None:
+        super().__init__(f"job {job_key} is already running elsewhere")
+        self.job_key = job_key
+
+
+class JobLeaseLost(RuntimeError):
+    def __init__(self, job_key: str) -> None:
+        super().__init__(f"job {job_key} does not hold its lock")
+        self.job_key = job_key
+
+
+def lock_id(job_key: str) -> int:
+    """Stabiler signed-64-bit-Key fuer pg_advisory_lock(bigint)."""
+    digest = hashlib.sha256(f"mv_job:{job_key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+def _holder() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# alte Laeufe desselben Jobs beim Start mit wegraeumen (Poller laufen alle paar Sekunden)
+_PRUNE_SQL = text("""
+    delete from referee_ratings.job_runs
+    where job_key = :job_key
+      and started_at < now() - make_interval(days => :keep_days)
+""")
+
+_START_SQL = text("""
+    insert into referee_ratings.job_runs (job_key, holder, status, started_at, heartbeat_at)
+    values (:job_key, :holder, 'running', now(), now())
+    returning run_id
+""")
+
+_HEARTBEAT_SQL = text("""
+    update referee_ratings.job_runs
+    set heartbeat_at = now()
+    where run_id = :run_id
+""")
+
+_FINISH_SQL = text("""
+    update referee_ratings.job_runs
+    set status = :status,
+        finished_at = now(),
+        heartbeat_at = now(),
+        duration_ms = :duration_ms,
+        result = cast(:result as jsonb),
+        error = :error
+    where run_id = :run_id
+""")
+
+
+class JobLease:
+    """Advisory-Lock + job_runs-Zeile; acquire() ist nicht blockierend."""
+
+    def __init__(self, job_key: str, heartbeat_seconds: float = HEARTBEAT_SECONDS) -> None:
+        self.job_key = job_key
+        self.lock_id = lock_id(job_key)
+        self.heartbeat_seconds = max(1.0, float(heartbeat_seconds))
+        self.run_id: Optional[int] = None
+        self.lost = False
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    @property
+    def held(self) -> bool:
+        return self._conn is not None and not self.lost
+
+    def check(self) -> None:
+        """JobLeaseLost, wenn der Lock nicht (mehr) gehalten wird (nie geholt oder verloren)."""
+        if not self.held:
+            raise JobLeaseLost(self.job_key)
+
+    def acquire(self) -> bool:
+        if self._conn is not None:
+            return not self.lost
+        conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            acquired = conn.execute(text("select pg_try_advisory_lock(:lock_id)"), {"lock_id": self.lock_id}).scalar()
+            if not acquired:
+                conn.close()
+                return False
+            conn.execute(_PRUNE_SQL, {"job_key": self.job_key, "keep_days": KEEP_DAYS})
+            self.run_id = conn.execute(_START_SQL, {"job_key": self.job_key, "holder": _holder()}).scalar()
+        except Exception:
+            conn.close()
+            raise
+        self._conn = conn
+        self.lost = False
+        self._started = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._heartbeat, name=f"job-lease-{self.job_key}", daemon=True)
+        self._thread.start()
+        return True
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.heartbeat_seconds):
+            try:
+                with self._conn_lock:
+                    self._conn.execute(_HEARTBEAT_SQL, {"run_id": self.run_id})
+            except Exception:
+                # Session weg -> Advisory-Lock weg; der Job darf nicht weiterlaufen
+                self.lost = True
+                logger.error("job lease lost job=%s run_id=%s", self.job_key, self.run_id)
+                return
+
+    def release(self, status: str = "ok", result: Any = None, error: Optional[str] = None) -> None:
+        conn = self._conn
+        if conn is None:
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.heartbeat_seconds)
+            self._thread = None
+        duration_ms = int((time.monotonic() - self._started) * 1000)
+        try:
+            with self._conn_lock:
+                conn.execute(_FINISH_SQL, {
+                    "run_id": self.run_id,
+                    "status": "lost" if self.lost else status,
+                    "duration_ms": duration_ms,
+                    "result": json.dumps(jsonable_encoder(result)) if result is not None else None,
+                    "error": error[:500] if error else None,
+                })
+                conn.execute(text("select pg_advisory_unlock(:lock_id)"), {"lock_id": self.lock_id})
+        except Exception:
+            logger.exception("job lease release failed job=%s run_id=%s", self.job_key, self.run_id)
+        finally:
+            conn.close()
+            self._conn = None
+
+
+class JobRun:
+    def __init__(self, lease: JobLease) -> None:
+        self.lease = lease
+        self.result: Any = None
+
+    @property
+    def lost(self) -> bool:
+        return self.lease.lost
+
+    def check(self) -> None:
+        self.lease.check()
+
+
+@contextmanager
+def job_run(job_key: str, heartbeat_seconds: float = HEARTBEAT_SECONDS) -> Iterator[JobRun]:
+    """
+    Exklusiver Lauf eines Jobs; JobAlreadyRunning, wenn ihn gerade jemand anders haelt.
+    run.result wird als Ergebnis in job_runs gespeichert.
+    """
+    lease = JobLease(job_key, heartbeat_seconds)
+    if not lease.acquire():
+        logger.info("job skipped, already running job=%s", job_key)
+        raise JobAlreadyRunning(job_key)
+    run = JobRun(lease)
+    try:
+        yield run
+    except BaseException as exc:
+        lease.release("error", run.result, f"{type(exc).__name__}: {exc}")
+        raise
+    lease.release("ok", run.result)
+
+
+def list_job_runs(limit: int = 50, job_key: Optional[str] = None) -> list:
+    sql = """
+        select run_id, job_key, holder, status, started_at, heartbeat_at, finished_at, duration_ms, result, error
+        from referee_ratings.job_runs
+    """
+    params: Dict[str, Any] = {"limit": limit}
+    if job_key:
+        sql += " where job_key = :job_key"
+        params["job_key"] = job_key
+    sql += " order by started_at desc limit :limit"
+    with engine.connect() as conn:
+        return [dict(row) for row in conn.execute(text(sql), params).mappings().all()]
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+
+from app.core.aggregates import DIST_COLUMNS
+from app.core import invalidation
+from app.core.cache import TTLCache
+from app.core.invalidation import invalidation_bus
+from app.db import engine
+
+
+# Match-Statistik (ersetzt die per-Szene-Schleife in web/ratings.js).
+# Gecacht pro match_id; create_rating invalidiert den Eintrag des betroffenen Matches.
+match_stats_cache = TTLCache(
+    "match_stats",
+    maxsize=int(os.getenv("MATCH_STATS_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("MATCH_STATS_CACHE_TTL_SECONDS", "60")),
+)
+
+_MATCH_STATS_SQL = text("""
+    select
+      s.scene_id,
+      s.minute,
+      s.stoppage_time,
+      s.scene_type::text as scene_type,
+      coalesce(a.rating_count, 0) as rating_count,
+      coalesce(a.decision_sum, 0) as decision_sum,
+      coalesce(a.confidence_sum, 0) as confidence_sum,
+      coalesce(a.decision_dist, '{}'::jsonb) as decision_dist,
+      coalesce(a.confidence_dist, '{}'::jsonb) as confidence_dist,
+      coalesce(a.channel_dist, '{}'::jsonb) as channel_dist,
+      coalesce(a.time_type_dist, '{}'::jsonb) as time_type_dist,
+      coalesce(a.rule_knowledge_dist, '{}'::jsonb) as rule_knowledge_dist
+    from referee_ratings.scenes s
+    left join referee_ratings.scene_rating_aggregates a on a.scene_id = s.scene_id
+    where s.match_id = cast(:match_id as uuid)
+      and s.scene_type != 'GOAL'
+    order by s.minute, s.stoppage_time nulls first, s.scene_id
+""")
+
+
+_VOTE_COUNTS_SQL = text("""
+    select
+      s.match_id::text as match_id,
+      sum(a.rating_count) as vote_count
+    from referee_ratings.scenes s
+    join referee_ratings.scene_rating_aggregates a on a.scene_id = s.scene_id
+    where s.match_id = any(cast(:match_ids as uuid[]))
+      and s.scene_type != 'GOAL'
+    group by s.match_id
+""")
+
+
+def _avg(total: int, count: int) -> Optional[float]:
+    return (float(total) / count) if count else None
+
+
+def build_match_stats(match_id: str, rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fasst die Szenen-Aggregate eines Matches zu Match-Verteilungen zusammen."""
+    merged: Dict[str, Dict[str, int]] = {key: {} for key in DIST_COLUMNS}
+    scenes: List[Dict[str, Any]] = []
+    total = 0
+    decision_total = 0
+    confidence_total = 0
+    rated_scenes = 0
+
+    for row in rows:
+        count = int(row.get("rating_count") or 0)
+        decision_sum = int(row.get("decision_sum") or 0)
+        confidence_sum = int(row.get("confidence_sum") or 0)
+        total += count
+        decision_total += decision_sum
+        confidence_total += confidence_sum
+        if count:
+            rated_scenes += 1
+        for key in DIST_COLUMNS:
+            dist = row.get(key) or {}
+            for bucket, value in dist.items():
+                merged[key][str(bucket)] = merged[key].get(str(bucket), 0) + int(value or 0)
+        scenes.append({
+            "scene_id": row["scene_id"],
+            "minute": row.get("minute"),
+            "stoppage_time": row.get("stoppage_time"),
+            "scene_type": row.get("scene_type"),
+            "rating_count": count,
+            "avg_decision": _avg(decision_sum, count),
+            "avg_confidence": _avg(confidence_sum, count),
+        })
+
+    return {
+        "match_id": match_id,
+        "rating_count": total,
+        "rated_scene_count": rated_scenes,
+        "avg_decision": _avg(decision_total, total),
+        "avg_confidence": _avg(confidence_total, total),
+        **merged,
+        "scenes": scenes,
+        "computed_at": datetime.now(timezone.utc),
+    }
+
+
+def get_match_stats(match_id: str) -> Dict[str, Any]:
+    match_id = str(match_id)
+    cached = match_stats_cache.get(match_id)
+    if cached is not None:
+        return cached
+    with engine.connect() as conn:
+        stats = compute_match_stats(conn, match_id)
+    match_stats_cache.set(match_id, stats)
+    return stats
+
+
+def compute_match_stats(conn, match_id: str) -> Dict[str, Any]:
+    """Ungecacht, auf einer bestehenden Verbindung (z. B. fuer Snapshots beim Lock)."""
+    rows = [dict(row) for row in conn.execute(_MATCH_STATS_SQL, {"match_id": str(match_id)}).mappings().all()]
+    return build_match_stats(str(match_id), rows)
+
+
+def count_votes_by_match(conn, match_ids: Iterable[str]) -> Dict[str, int]:
+    """Anzahl Bewertungen je Match (alle IDs im Ergebnis, fehlende mit 0)."""
+    ids = list(dict.fromkeys(str(mid) for mid in match_ids))
+    if not ids:
+        return {}
+    counts = {mid: 0 for mid in ids}
+    for row in conn.execute(_VOTE_COUNTS_SQL, {"match_ids": ids}).mappings().all():
+        counts[row["match_id"]] = int(row["vote_count"] or 0)
+    return counts
+
+
+def _evict_match_stats(match_id: Optional[str]) -> None:
+    if match_id is None:
+        match_stats_cache.clear()
+        return
+    match_stats_cache.pop(str(match_id))
+
+
+def invalidate_match_stats(match_id: Optional[str] = None) -> None:
+    """Verwirft die Statistik eines Matches (oder alle, ohne match_id), auch in anderen Workern."""
+    _evict_match_stats(match_id)
+    invalidation_bus.broadcast(invalidation.MATCH_STATS, match_id)
+
+
+invalidation.register(invalidation.MATCH_STATS, _evict_match_stats)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+
+
+# Keyset-Pagination: der Cursor ist (Sortwert, id) der letzten Zeile einer Seite,
+# base64url-kodiert und an die Liste gebunden (kind), fuer Clients opak.
+# Sortierung immer "<sort> desc [nulls last], <id> desc" -> passt zu den Composite-Indizes
+# aus 20261017_keyset_pagination_indexes.sql. offset bleibt fuer bestehende Clients erhalten.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+Cursor = Tuple[Optional[str], str]
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    return str(value)
+
+
+def encode_cursor(kind: str, sort_value: Any, row_id: Any) -> str:
+    raw = json.dumps({"k": kind, "v": [_to_json(sort_value), _to_json(row_id)]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(kind: str, token: str) -> Cursor:
+    """Liefert (sort_value, id) als Strings; ValueError bei kaputtem oder fremdem Cursor."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        sort_value, row_id = data["v"]
+    except Exception:
+        raise ValueError("malformed cursor")
+    if data.get("k") != kind or row_id is None:
+        raise ValueError("cursor belongs to another list")
+    return (None if sort_value is None else str(sort_value)), str(row_id)
+
+
+def parse_cursor(kind: str, token: Optional[str]) -> Optional[Cursor]:
+    if not token:
+        return None
+    try:
+        return decode_cursor(kind, token)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_clause(
+    cursor: Optional[Cursor],
+    sort_column: str,
+    id_column: str,
+    sort_type: str = "timestamptz",
+    id_type: str = "uuid",
+    nullable: bool = False,
+) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    WHERE-Fragment fuer "Zeilen nach dem Cursor" bei order by sort desc nulls last, id desc.
+    Liefert (None, {}) ohne Cursor.
+    """
+    if cursor is None:
+        return None, {}
+    sort_value, row_id = cursor
+    params: Dict[str, Any] = {"cursor_sort": sort_value, "cursor_id": row_id}
+    cursor_id = f"cast(:cursor_id as {id_type})"
+    if sort_value is None:
+        # schon im NULL-Block am Ende der Sortierung
+        return f"({sort_column} is null and {id_column} < {cursor_id})", params
+    clause = f"({sort_column}, {id_column}) < (cast(:cursor_sort as {sort_type}), {cursor_id})"
+    if nullable:
+        clause = f"({clause} or {sort_column} is null)"
+    return clause, params
+
+
+def set_next_cursor(
+    response: Response,
+    kind: str,
+    rows: Sequence[Mapping[str, Any]],
+    limit: int,
+    sort_key: str,
+    id_key: str,
+) -> Optional[str]:
+    """Setzt X-Next-Cursor, wenn die Seite voll ist (es also weitere Zeilen geben kann)."""
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    token = encode_cursor(kind, last[sort_key], last[id_key])
+    response.headers[NEXT_CURSOR_HEADER] = token
+    return token
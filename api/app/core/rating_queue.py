@@ -0,0 +1,445 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from app.core import invalidation
+from app.core.aggregates import apply_ratings
+from app.core.cache import TTLCache
+from app.core.etag import SCENE_RATINGS, bump_versions
+from app.core.events import match_events
+from app.core.invalidation import invalidation_bus
+from app.core.match_stats import invalidate_match_stats
+from app.core.rating_users import ensure_rating_users
+from app.db import engine
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# Optionaler Queue-Modus fuer POST /ratings (RATING_QUEUE_ENABLED=1).
+# Die Anfrage prueft vorab gegen gecachten Szenen-Zustand und die bereits geschriebenen
+# Nutzer pro Szene (offensichtliche 404/409 ohne DB-Verbindung) und reiht die Bewertung
+# sonst ein. Ein Hintergrund-Thread schreibt alle FLUSH_MS Millisekunden bzw. ab
+# FLUSH_MAX_ROWS Bewertungen einen Multi-Row-Insert samt Aggregat-Upsert in einer
+# Transaktion (Group Commit); die Anfrage wartet auf das Ergebnis und bekommt 201 erst,
+# wenn die Zeile committet ist. Dauert das laenger als WAIT_SECONDS: 202, Status per
+# GET /ratings/me/{scene_id} (pending). Der Flush prueft Release/Lock erneut unter
+# FOR SHARE (der Szenen-Cache ist pro Prozess), Duplikate entscheidet der Unique-Index
+# (scene_id, user_id). Scheitert der Batch, wird zeilenweise (Savepoint) wiederholt,
+# damit nur die fehlerhafte Zeile abgelehnt wird.
+
+FLUSH_INTERVAL_MS = float(os.getenv("RATING_QUEUE_FLUSH_MS", "50"))
+FLUSH_MAX_ROWS = int(os.getenv("RATING_QUEUE_FLUSH_MAX_ROWS", "500"))
+MAX_DEPTH = int(os.getenv("RATING_QUEUE_MAX_DEPTH", "20000"))
+MAX_FLUSH_ATTEMPTS = int(os.getenv("RATING_QUEUE_MAX_FLUSH_ATTEMPTS", "5"))
+SEEN_SCENES = int(os.getenv("RATING_QUEUE_SEEN_SCENES", "256"))
+WAIT_SECONDS = float(os.getenv("RATING_QUEUE_WAIT_SECONDS", "5"))
+
+# Release/Lock invalidieren sofort, andere Prozesse ueber den Cache-Bus (sonst nach der TTL)
+scene_state_cache = TTLCache(
+    "rating_scene_state",
+    maxsize=int(os.getenv("RATING_QUEUE_SCENE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RATING_QUEUE_SCENE_TTL_SECONDS", "5")),
+)
+
+RATING_COLUMNS = (
+    "rating_id",
+    "scene_id",
+    "user_id",
+    "decision_score",
+    "confidence_score",
+    "perception_channel",
+    "rule_knowledge",
+    "rating_time_type",
+    "fav_team",
+    "created_at",
+)
+
+_SCENE_STATE_SQL = text("""
+    select
+      s.scene_id::text as scene_id,
+      s.match_id::text as match_id,
+      s.is_released,
+      s.is_locked,
+      m.team_home,
+      m.team_away
+    from referee_ratings.scenes s
+    join referee_ratings.matches m on m.match_id = s.match_id
+    where s.scene_id = cast(:scene_id as uuid)
+""")
+
+# Sperrt die Szenen bis zum Commit: ein parallel laufender Lock/Unrelease wartet, bis
+# die Bewertungen (samt Aggregat) geschrieben sind, und friert sie mit ein
+_LOCK_SCENES_SQL = text("""
+    select scene_id::text as scene_id, is_released, is_locked
+    from referee_ratings.scenes
+    where scene_id = any(cast(:scene_ids as uuid[]))
+    for share
+""")
+
+_SCENE_USERS_SQL = text("""
+    select user_id::text
+    from referee_ratings.ratings
+    where scene_id = cast(:scene_id as uuid)
+""")
+
+
+def get_scene_state(scene_id: str) -> Optional[Dict[str, Any]]:
+    key = str(scene_id)
+    state = scene_state_cache.get(key)
+    if state is not None:
+        return state
+    with engine.connect() as conn:
+        row = conn.execute(_SCENE_STATE_SQL, {"scene_id": key}).mappings().first()
+    if not row:
+        # unbekannte Szenen nicht cachen (koennen gleich angelegt werden)
+        return None
+    state = dict(row)
+    scene_state_cache.set(key, state)
+    return state
+
+
+def _evict_scene_state(scene_id: Optional[str]) -> None:
+    if scene_id is None:
+        scene_state_cache.clear()
+    else:
+        scene_state_cache.pop(str(scene_id))
+
+
+def invalidate_scene_state(scene_id: Optional[str] = None) -> None:
+    _evict_scene_state(scene_id)
+    invalidation_bus.broadcast(invalidation.SCENE_STATE, scene_id)
+
+
+invalidation.register(invalidation.SCENE_STATE, _evict_scene_state)
+
+
+def check_scene_state(state: Optional[Dict[str, Any]], fav_team: Optional[str]) -> Optional[str]:
+    """Gleiche Regeln wie das Ein-Statement-Submit; None = Bewertung zulaessig."""
+    if state is None:
+        return "scene_not_found"
+    if not state["is_released"]:
+        return "not_released"
+    if state["is_locked"]:
+        return "locked"
+    if fav_team is not None and fav_team not in (state["team_home"], state["team_away"]):
+        return "fav_team_mismatch"
+    return None
+
+
+def insert_ratings(conn, ratings: List[Dict[str, Any]]) -> Set[str]:
+    """Multi-Row-Insert; liefert die rating_ids der tatsaechlich eingefuegten Zeilen."""
+    if not ratings:
+        return set()
+    values = []
+    params: Dict[str, Any] = {}
+    for i, rating in enumerate(ratings):
+        values.append("(" + ", ".join(f":{col}_{i}" for col in RATING_COLUMNS) + ")")
+        for col in RATING_COLUMNS:
+            params[f"{col}_{i}"] = rating[col]
+    rows = conn.execute(text(f"""
+        insert into referee_ratings.ratings ({", ".join(RATING_COLUMNS)})
+        values {", ".join(values)}
+        on conflict (scene_id, user_id) do nothing
+        returning rating_id::text
+    """), params).all()
+    return {row[0] for row in rows}
+
+
+def _scene_outcome(state: Optional[Dict[str, Any]]) -> Optional[str]:
+    if state is None:
+        return "scene_not_found"
+    if not state["is_released"]:
+        return "not_released"
+    if state["is_locked"]:
+        return "locked"
+    return None
+
+
+class RatingQueue:
+    def __init__(
+        self,
+        flush_interval_ms: float = FLUSH_INTERVAL_MS,
+        max_rows: int = FLUSH_MAX_ROWS,
+        max_depth: int = MAX_DEPTH,
+    ) -> None:
+        self.flush_interval = max(0.0, float(flush_interval_ms)) / 1000.0
+        self.max_rows = max(1, int(max_rows))
+        self.max_depth = max(1, int(max_depth))
+        self._pending: Deque[Dict[str, Any]] = deque()
+        # (scene_id, user_id) -> Bewertung, bis sie geschrieben (oder verworfen) ist
+        self._inflight: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # rating_id -> Ergebnis des Flushs (outcome), auf das die Anfrage wartet
+        self._results: Dict[str, "Future[str]"] = {}
+        # nur Nutzer mit committeter Bewertung (DB oder eigener Flush)
+        self._seen: "OrderedDict[str, Set[str]]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.enqueued = 0
+        self.duplicates = 0
+        self.flushes = 0
+        self.flushed = 0
+        self.conflicts = 0
+        self.rejected = 0
+        self.flush_errors = 0
+        self.dropped = 0
+        self.last_flush_size = 0
+        self.last_flush_ms: Optional[float] = None
+        self.max_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rating-queue", daemon=True)
+        self._thread.start()
+        logger.info(
+            "rating queue started flush_ms=%.0f max_rows=%s max_depth=%s",
+            self.flush_interval * 1000, self.max_rows, self.max_depth,
+        )
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Beendet den Writer; bereits angenommene Bewertungen werden vorher noch geschrieben."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _load_scene_users(self, scene_id: str) -> Set[str]:
+        with engine.connect() as conn:
+            return {row[0] for row in conn.execute(_SCENE_USERS_SQL, {"scene_id": scene_id}).all()}
+
+    def _scene_users(self, scene_id: str) -> Set[str]:
+        with self._cond:
+            users = self._seen.get(scene_id)
+            if users is not None:
+                self._seen.move_to_end(scene_id)
+                return users
+        loaded = self._load_scene_users(scene_id)
+        with self._cond:
+            users = self._seen.get(scene_id)
+            if users is None:
+                users = self._seen[scene_id] = loaded
+                while len(self._seen) > max(1, SEEN_SCENES):
+                    self._seen.popitem(last=False)
+            return users
+
+    def submit(self, params: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]], "Optional[Future[str]]"]:
+        """
+        Prueft eine Bewertung vorab und reiht sie ein.
+        Liefert (outcome, rating, result); bei outcome "queued" liefert result das endgueltige
+        outcome des Flushs ("created", "duplicate", "locked", ..., "error").
+        outcome "queue_full" heisst: synchron schreiben.
+        """
+        scene_id = str(params["scene_id"])
+        user_id = str(params["user_id"])
+        state = get_scene_state(scene_id)
+        outcome = check_scene_state(state, params.get("fav_team"))
+        if outcome:
+            return outcome, None, None
+        users = self._scene_users(scene_id)
+        with self._cond:
+            if user_id in users or (scene_id, user_id) in self._inflight:
+                self.duplicates += 1
+                return "duplicate", None, None
+            if len(self._pending) >= self.max_depth:
+                return "queue_full", None, None
+            rating = {col: params.get(col) for col in RATING_COLUMNS}
+            rating.update({
+                "rating_id": str(uuid.uuid4()),
+                "scene_id": scene_id,
+                "user_id": user_id,
+                "created_at": datetime.now(timezone.utc),
+                "match_id": state["match_id"],
+            })
+            result: "Future[str]" = Future()
+            self._inflight[(scene_id, user_id)] = rating
+            self._results[rating["rating_id"]] = result
+            self._pending.append(rating)
+            self.enqueued += 1
+            # Writer nur wecken, wenn er auf die erste Zeile wartet oder der Batch voll ist
+            if len(self._pending) == 1 or len(self._pending) >= self.max_rows:
+                self._cond.notify()
+        return "queued", dict(rating), result
+
+    def note_written(self, scene_id: str, user_id: str) -> None:
+        """Synchron (am Queue vorbei) geschriebene Bewertung ins Duplikat-Set uebernehmen."""
+        with self._cond:
+            users = self._seen.get(str(scene_id))
+            if users is not None:
+                users.add(str(user_id))
+
+    def pending(self, scene_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """Noch nicht geschriebene Bewertung (fuer GET /ratings/me nach einem 202)."""
+        with self._cond:
+            rating = self._inflight.get((str(scene_id), str(user_id)))
+            return dict(rating, pending=True) if rating else None
+
+    def pending_for_user(self, user_id: str) -> List[Dict[str, Any]]:
+        with self._cond:
+            return [
+                dict(rating, pending=True)
+                for (_, uid), rating in self._inflight.items()
+                if uid == str(user_id)
+            ]
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            while not self._pending and not self._stop.is_set():
+                self._cond.wait()
+            if not self._pending:
+                return []
+            # Erste Zeile ist da: bis zum Ablauf des Intervalls weitere sammeln
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._pending) < self.max_rows and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            count = min(len(self._pending), self.max_rows)
+            return [self._pending.popleft() for _ in range(count)]
+
+    def _resolve(self, batch: Iterable[Dict[str, Any]], outcomes: Dict[str, str]) -> None:
+        """Wartende Anfragen bedienen; fehlende outcomes gelten als "error" (nicht geschrieben)."""
+        results = []
+        with self._cond:
+            for rating in batch:
+                self._inflight.pop((rating["scene_id"], rating["user_id"]), None)
+                outcome = outcomes.get(rating["rating_id"], "error")
+                if outcome in ("created", "duplicate"):
+                    # die DB hat eine Zeile fuer (scene_id, user_id)
+                    users = self._seen.get(rating["scene_id"])
+                    if users is not None:
+                        users.add(rating["user_id"])
+                result = self._results.pop(rating["rating_id"], None)
+                if result is not None:
+                    results.append((result, outcome))
+        for result, outcome in results:
+            result.set_result(outcome)
+
+    def _insert(self, conn, ratings: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Ein Multi-Row-Insert; scheitert er, zeilenweise mit Savepoint (nur die kaputte Zeile faellt raus)."""
+        try:
+            with conn.begin_nested():
+                inserted_ids = insert_ratings(conn, ratings)
+            return {r["rating_id"]: "created" if r["rating_id"] in inserted_ids else "duplicate" for r in ratings}
+        except Exception:
+            logger.warning("rating queue batch insert failed size=%s, retrying row by row", len(ratings), exc_info=True)
+        outcomes = {}
+        for rating in ratings:
+            try:
+                with conn.begin_nested():
+                    inserted_ids = insert_ratings(conn, [rating])
+            except Exception:
+                # z. B. FK-Verletzung: ohne outcome -> "error"
+                logger.exception("rating queue rejected rating scene_id=%s", rating["scene_id"])
+                continue
+            outcomes[rating["rating_id"]] = "created" if rating["rating_id"] in inserted_ids else "duplicate"
+        return outcomes
+
+    def flush(self, batch: List[Dict[str, Any]]) -> int:
+        """Schreibt einen Batch in einer Transaktion; liefert die Anzahl eingefuegter Zeilen."""
+        started = time.monotonic()
+        outcomes: Dict[str, str] = {}
+        with engine.begin() as conn:
+            scene_ids = sorted({rating["scene_id"] for rating in batch})
+            states = {
+                row["scene_id"]: dict(row)
+                for row in conn.execute(_LOCK_SCENES_SQL, {"scene_ids": scene_ids}).mappings().all()
+            }
+            writable = []
+            for rating in batch:
+                outcome = _scene_outcome(states.get(rating["scene_id"]))
+                if outcome:
+                    # seit der Vorpruefung gelockt/zurueckgezogen/geloescht
+                    outcomes[rating["rating_id"]] = outcome
+                else:
+                    writable.append(rating)
+            ensure_rating_users(conn, (rating["user_id"] for rating in writable))
+            outcomes.update(self._insert(conn, writable))
+            inserted = [rating for rating in writable if outcomes.get(rating["rating_id"]) == "created"]
+            apply_ratings(conn, inserted)
+            bump_versions(conn, SCENE_RATINGS, (rating["scene_id"] for rating in inserted))
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._cond:
+            self.flushes += 1
+            self.flushed += len(inserted)
+            conflicts = sum(1 for outcome in outcomes.values() if outcome == "duplicate")
+            self.conflicts += conflicts
+            self.rejected += len(batch) - len(inserted) - conflicts
+            self.last_flush_size = len(batch)
+            self.last_flush_ms = round(elapsed_ms, 1)
+            self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+        self._resolve(batch, outcomes)
+        scenes_by_match: Dict[str, Set[str]] = {}
+        for rating in inserted:
+            scenes_by_match.setdefault(rating["match_id"], set()).add(rating["scene_id"])
+        for match_id, scene_ids in scenes_by_match.items():
+            invalidate_match_stats(match_id)
+            match_events.aggregate_changed(match_id, scene_ids)
+        return len(inserted)
+
+    def _flush_with_retry(self, batch: List[Dict[str, Any]]) -> None:
+        for attempt in range(1, max(1, MAX_FLUSH_ATTEMPTS) + 1):
+            try:
+                self.flush(batch)
+                return
+            except Exception:
+                with self._cond:
+                    self.flush_errors += 1
+                logger.exception("rating queue flush failed size=%s attempt=%s", len(batch), attempt)
+                if attempt < MAX_FLUSH_ATTEMPTS:
+                    time.sleep(min(0.1 * 2 ** attempt, 5.0))
+        with self._cond:
+            self.dropped += len(batch)
+        # wartende Anfragen bekommen einen Fehler (503), nach einem 202 fehlt die Bewertung in /ratings/me
+        self._resolve(batch, {})
+        logger.error("rating queue dropped %s ratings after %s attempts", len(batch), MAX_FLUSH_ATTEMPTS)
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                if self._stop.is_set():
+                    return
+                continue
+            self._flush_with_retry(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "running": self.running,
+                "depth": len(self._pending),
+                "inflight": len(self._inflight),
+                "enqueued": self.enqueued,
+                "duplicates": self.duplicates,
+                "flushes": self.flushes,
+                "flushed": self.flushed,
+                "conflicts": self.conflicts,
+                "rejected": self.rejected,
+                "flush_errors": self.flush_errors,
+                "dropped": self.dropped,
+                "last_flush_size": self.last_flush_size,
+                "avg_flush_size": round(self.flushed / self.flushes, 1) if self.flushes else None,
+                "last_flush_ms": self.last_flush_ms,
+                "max_flush_ms": self.max_flush_ms,
+            }
+
+
+rating_queue = RatingQueue()
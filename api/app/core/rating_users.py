@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from sqlalchemy import text
+
+
+# referee_ratings.users spiegelt verifizierte mv_users-Konten (FK-Ziel von ratings.user_id).
+# Gespiegelt wird bei der E-Mail-Verifikation, nicht mehr bei jeder Bewertung.
+_ENSURE_RATING_USERS_SQL = text("""
+    insert into referee_ratings.users (user_id, email_hash, password_hash)
+    select
+      m.user_id,
+      encode(digest(lower(trim(m.email)), 'sha256'), 'hex'),
+      m.password_hash
+    from mv_users m
+    where m.user_id = any(cast(:user_ids as uuid[]))
+    on conflict do nothing
+""")
+
+
+def ensure_rating_users(conn, user_ids: Iterable[str]) -> None:
+    ids = sorted({str(user_id) for user_id in user_ids})
+    if ids:
+        conn.execute(_ENSURE_RATING_USERS_SQL, {"user_ids": ids})
+
+
+def ensure_rating_user(conn, user_id: str) -> None:
+    ensure_rating_users(conn, [user_id])
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.core import invalidation
+from app.db import engine
+
+
+# Spalten-Verfuegbarkeit fuer optionale/Legacy-Spalten.
+# Wird einmal pro Prozess aus information_schema gelesen (statt pro Request)
+# und nur durch refresh() neu geladen, z. B. nach init_db() oder einer Migration.
+
+INTROSPECTED_SCHEMAS = ("referee_ratings", "public")
+
+_COLUMNS_SQL = text("""
+    select table_schema, table_name, column_name
+    from information_schema.columns
+    where table_schema = any(:schemas)
+""")
+
+
+class SchemaRegistry:
+    def __init__(self, schemas: Tuple[str, ...] = INTROSPECTED_SCHEMAS) -> None:
+        self.schemas = tuple(schemas)
+        self._columns: Optional[Dict[Tuple[str, str], FrozenSet[str]]] = None
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _load(self, conn) -> Dict[Tuple[str, str], FrozenSet[str]]:
+        rows = conn.execute(_COLUMNS_SQL, {"schemas": list(self.schemas)}).all()
+        tables: Dict[Tuple[str, str], set] = {}
+        for schema, table, column in rows:
+            tables.setdefault((schema, table), set()).add(column)
+        return {key: frozenset(cols) for key, cols in tables.items()}
+
+    def _ensure(self, conn=None) -> Dict[Tuple[str, str], FrozenSet[str]]:
+        columns = self._columns
+        if columns is not None:
+            return columns
+        with self._lock:
+            if self._columns is None:
+                if conn is not None:
+                    self._columns = self._load(conn)
+                else:
+                    with engine.connect() as own:
+                        self._columns = self._load(own)
+                self.loads += 1
+            return self._columns
+
+    def invalidate(self) -> None:
+        """Beim naechsten Zugriff neu laden (Cache-Bus: Migration in anderem Worker)."""
+        with self._lock:
+            self._columns = None
+
+    def refresh(self, conn=None) -> None:
+        self.invalidate()
+        self._ensure(conn)
+
+    def columns(self, schema: str, table: str, conn=None) -> FrozenSet[str]:
+        return self._ensure(conn).get((schema, table), frozenset())
+
+    def has_column(self, schema: str, table: str, column: str, conn=None) -> bool:
+        return column in self.columns(schema, table, conn)
+
+    def has_table(self, schema: str, table: str, conn=None) -> bool:
+        return (schema, table) in self._ensure(conn)
+
+
+schema_registry = SchemaRegistry()
+invalidation.register(invalidation.SCHEMA, lambda _key: schema_registry.invalidate())
+
+
+def column_exists(conn, schema: str, table: str, column: str) -> bool:
+    """Drop-in fuer die frueheren _column_exists-Helfer (Antwort aus dem Registry)."""
+    return schema_registry.has_column(schema, table, column, conn)
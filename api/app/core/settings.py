@@ -19,6 +19,12 @@ SPORTMONKS_API_TOKEN = (
     else None
 )
 
+# Optionaler Queue-Modus fuer POST /ratings (siehe app/core/rating_queue.py)
+RATING_QUEUE_ENABLED = _env_flag("RATING_QUEUE_ENABLED", default=False)
+
+# Cache-Invalidierung ueber Worker hinweg per LISTEN/NOTIFY (siehe app/core/invalidation.py)
+CACHE_BUS_ENABLED = _env_flag("CACHE_BUS_ENABLED", default=False)
+
 ACTIVE_MATCH_PROVIDER = "sportmonks" if SPORTMONKS_ENABLED else "openligadb"
 
 
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, text
+
+from app.core import invalidation
+from app.core.aggregates import get_scene_aggregate
+from app.core.cache import TTLCache
+from app.core.etag import etag_matches
+from app.core.invalidation import invalidation_bus
+from app.core.match_stats import compute_match_stats
+from app.db import engine
+
+
+# Eingefrorene Antworten fuer Daten, die sich nicht mehr aendern koennen:
+# - Szenen-Aggregat, sobald die Szene gelockt ist (keine neuen Bewertungen mehr)
+# - Match-Statistik, sobald alle (Nicht-Tor-)Szenen des Matches gelockt sind
+# Gespeichert werden die exakten JSON-Bytes samt SHA-256; /snapshots/{sha256} ist
+# inhaltsadressiert und darf daher "immutable" gecacht werden (auch von nginx).
+# Unlock, Loeschen oder eine neue Szene verwerfen den Snapshot.
+
+SCENE_AGGREGATE = "scene_aggregate"
+MATCH_STATS = "match_stats"
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# (resource, resource_id) -> Snapshot oder False; spart den Lookup auf den heissen Lesepfaden.
+# Andere Prozesse erfahren Aenderungen per NOTIFY mit dem Commit (Cache-Bus), sonst nach der TTL.
+snapshot_cache = TTLCache(
+    "snapshots",
+    maxsize=int(os.getenv("SNAPSHOT_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("SNAPSHOT_CACHE_TTL_SECONDS", "60")),
+)
+
+_STORE_SQL = text("""
+    insert into referee_ratings.resource_snapshots (resource, resource_id, content_sha256, body, created_at)
+    values (:resource, :resource_id, :content_sha256, :body, now())
+    on conflict (resource, resource_id) do update set
+        content_sha256 = excluded.content_sha256,
+        body = excluded.body,
+        created_at = now()
+""")
+
+_GET_SQL = text("""
+    select content_sha256, body
+    from referee_ratings.resource_snapshots
+    where resource = :resource and resource_id = :resource_id
+""")
+
+_GET_BY_HASH_SQL = text("""
+    select body
+    from referee_ratings.resource_snapshots
+    where content_sha256 = :content_sha256
+    limit 1
+""")
+
+_DROP_SQL = text("""
+    delete from referee_ratings.resource_snapshots
+    where resource = :resource and resource_id = any(cast(:ids as text[]))
+""")
+
+_SCENE_SQL = text("""
+    select match_id::text as match_id, is_locked
+    from referee_ratings.scenes
+    where scene_id = cast(:scene_id as uuid)
+""")
+
+# Match gilt als abgeschlossen, wenn es bewertbare Szenen hat und keine davon offen ist
+_MATCH_FINISHED_SQL = text("""
+    select count(*) > 0 and bool_and(is_locked)
+    from referee_ratings.scenes
+    where match_id = cast(:match_id as uuid)
+      and scene_type != 'GOAL'
+""")
+
+
+def serialize(payload: Any) -> bytes:
+    return json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def store_snapshot(conn, resource: str, resource_id: Any, payload: Any) -> str:
+    body = serialize(payload)
+    content_sha256 = hashlib.sha256(body).hexdigest()
+    conn.execute(_STORE_SQL, {
+        "resource": resource,
+        "resource_id": str(resource_id),
+        "content_sha256": content_sha256,
+        "body": body,
+    })
+    _evict(conn, resource, [str(resource_id)])
+    return content_sha256
+
+
+def _evict_snapshot(key: Optional[str]) -> None:
+    if key is None:
+        snapshot_cache.clear()
+        return
+    resource, _, resource_id = key.partition(":")
+    snapshot_cache.pop((resource, resource_id))
+
+
+# Keys, die nach dem Commit lokal (nochmal) evictet werden; haengt an der DB-Verbindung
+_PENDING_EVICTIONS = "snapshot_evictions"
+
+
+def _evict(conn, resource: str, resource_ids: Iterable[str]) -> None:
+    keys = [f"{resource}:{rid}" for rid in resource_ids]
+    for key in keys:
+        _evict_snapshot(key)
+    # ein paralleler Leser kann bis zum Commit noch den alten Stand cachen -> nach dem Commit erneut
+    conn.info.setdefault(_PENDING_EVICTIONS, set()).update(keys)
+    invalidation_bus.notify_in_transaction(conn, ((invalidation.SNAPSHOT, key) for key in keys))
+
+
+@event.listens_for(engine, "checkin")
+def _evict_after_commit(dbapi_connection, connection_record) -> None:
+    # Rueckgabe an den Pool: engine.begin() hat committet (oder zurueckgerollt, dann schadet es nicht)
+    keys = connection_record.info.pop(_PENDING_EVICTIONS, None) if connection_record is not None else None
+    for key in keys or ():
+        _evict_snapshot(key)
+
+
+invalidation.register(invalidation.SNAPSHOT, _evict_snapshot)
+
+
+def get_snapshot(conn, resource: str, resource_id: Any) -> Optional[Dict[str, Any]]:
+    row = conn.execute(_GET_SQL, {"resource": resource, "resource_id": str(resource_id)}).mappings().first()
+    if not row:
+        return None
+    return {"content_sha256": row["content_sha256"], "body": bytes(row["body"])}
+
+
+def find_snapshot(resource: str, resource_id: Any) -> Optional[Dict[str, Any]]:
+    key = (resource, str(resource_id))
+    cached = snapshot_cache.get(key)
+    if cached is None:
+        with engine.connect() as conn:
+            cached = get_snapshot(conn, resource, resource_id) or False
+        snapshot_cache.set(key, cached)
+    return cached or None
+
+
+def get_snapshot_body(conn, content_sha256: str) -> Optional[bytes]:
+    row = conn.execute(_GET_BY_HASH_SQL, {"content_sha256": content_sha256}).first()
+    return bytes(row[0]) if row else None
+
+
+def drop_snapshots(conn, resource: str, resource_ids: Iterable[Any]) -> None:
+    ids = sorted({str(rid) for rid in resource_ids if rid is not None})
+    if ids:
+        conn.execute(_DROP_SQL, {"resource": resource, "ids": ids})
+    _evict(conn, resource, ids)
+
+
+def freeze_match_if_finished(conn, match_id: str) -> Optional[str]:
+    if not conn.execute(_MATCH_FINISHED_SQL, {"match_id": str(match_id)}).scalar():
+        return None
+    return store_snapshot(conn, MATCH_STATS, match_id, compute_match_stats(conn, match_id))
+
+
+def refresh_match_snapshot(conn, match_id: Optional[str]) -> None:
+    """Nach Aenderungen an der Szenenliste: neu einfrieren oder verwerfen."""
+    if match_id is None:
+        return
+    if freeze_match_if_finished(conn, match_id) is None:
+        drop_snapshots(conn, MATCH_STATS, [match_id])
+
+
+def freeze_scene(conn, scene_id: str) -> Optional[str]:
+    """Beim Lock: Aggregat einfrieren, ggf. auch die Match-Statistik. Liefert den Szenen-Hash."""
+    scene = conn.execute(_SCENE_SQL, {"scene_id": str(scene_id)}).mappings().first()
+    if not scene or not scene["is_locked"]:
+        return None
+    content_sha256 = None
+    aggregate = get_scene_aggregate(conn, str(scene_id))
+    if aggregate is not None:
+        # Tor-Szenen haben kein Aggregat
+        content_sha256 = store_snapshot(conn, SCENE_AGGREGATE, scene_id, aggregate)
+    freeze_match_if_finished(conn, scene["match_id"])
+    return content_sha256
+
+
+def thaw_scene(conn, scene_id: str, match_id: Optional[str] = None) -> None:
+    """Beim Unlock/Loeschen: Szenen-Snapshot verwerfen, Match-Statistik neu bewerten."""
+    if match_id is None:
+        scene = conn.execute(_SCENE_SQL, {"scene_id": str(scene_id)}).mappings().first()
+        match_id = scene["match_id"] if scene else None
+    drop_snapshots(conn, SCENE_AGGREGATE, [scene_id])
+    refresh_match_snapshot(conn, match_id)
+
+
+def refresh_scene_snapshots(conn, scene_ids: Iterable[Any]) -> None:
+    """Nach Aenderungen an Bewertungen gelockter Szenen (Kontoloeschung) neu einfrieren."""
+    for scene_id in sorted({str(sid) for sid in scene_ids}):
+        if get_snapshot(conn, SCENE_AGGREGATE, scene_id) is not None:
+            freeze_scene(conn, scene_id)
+
+
+def freeze_locked_scenes(conn) -> int:
+    """Backfill/Reparatur: alle gelockten Szenen (und abgeschlossenen Matches) neu einfrieren."""
+    rows = conn.execute(text("""
+        select scene_id::text
+        from referee_ratings.scenes
+        where is_locked
+        order by match_id, scene_id
+    """)).all()
+    for (scene_id,) in rows:
+        freeze_scene(conn, scene_id)
+    return len(rows)
+
+
+def snapshot_response(snapshot: Dict[str, Any], if_none_match: Optional[str], root_path: str = "") -> Response:
+    """Antwort aus einem Snapshot unter der normalen URL (revalidierbar, verweist auf die immutable URL)."""
+    etag = f'"{snapshot["content_sha256"]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Content-Location": f"{root_path}/snapshots/{snapshot['content_sha256']}",
+    }
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot["body"], media_type="application/json", headers=headers)
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import os
-from typing import Optional
+import threading
+from typing import Any, Dict, Optional
 
 from app.core import settings
 from app.core.sportmonks.client import SportMonksClient
 
+# Ein Client pro Prozess (App, CLI, Worker): gemeinsamer Connection-Pool
 _sportmonks_client: Optional[SportMonksClient] = None
+_client_lock = threading.Lock()
 
 
 def get_sportmonks_api_token() -> str:
@@ -18,11 +21,13 @@ def get_sportmonks_api_token() -> str:
 
 def init_sportmonks_client() -> Optional[SportMonksClient]:
     global _sportmonks_client
-    if not settings.is_sportmonks_active():
-        _sportmonks_client = None
-        return None
-    _sportmonks_client = SportMonksClient(get_sportmonks_api_token())
-    return _sportmonks_client
+    with _client_lock:
+        if not settings.is_sportmonks_active():
+            _sportmonks_client = None
+            return None
+        if _sportmonks_client is None:
+            _sportmonks_client = SportMonksClient(get_sportmonks_api_token())
+        return _sportmonks_client
 
 
 def get_sportmonks_client() -> SportMonksClient:
@@ -32,3 +37,16 @@ def get_sportmonks_client() -> SportMonksClient:
             raise RuntimeError("SportMonks client is not initialized")
         return client
     return _sportmonks_client
+
+
+def close_sportmonks_client() -> None:
+    global _sportmonks_client
+    with _client_lock:
+        client, _sportmonks_client = _sportmonks_client, None
+    if client is not None:
+        client.close()
+
+
+def sportmonks_client_stats() -> Optional[Dict[str, Any]]:
+    client = _sportmonks_client
+    return client.stats() if client is not None else None
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# SportMonks zaehlt Requests pro Entity (Fixture, Season, ...) und Stunde und meldet den
+# Stand in jeder Antwort unter rate_limit {remaining, resets_in_seconds, requested_entity}.
+# Der Tracker merkt sich das pro Entity (und welcher Endpoint welche Entity kostet) und
+# teilt das Kontingent nach Prioritaet: Inplay darf es bis zum letzten Request nutzen,
+# Spielplan-Syncs nur oberhalb einer Reserve, Shadow-/Diagnose-Abrufe oberhalb einer
+# groesseren. Unterhalb der Reserve wird kurz gewartet, wenn der Reset bald kommt,
+# sonst abgelehnt (BudgetExhausted). Ohne bekannten Stand (erster Request, nach Reset)
+# geht alles durch.
+
+INPLAY = 0
+SCHEDULE = 1
+SHADOW = 2
+
+PRIORITY_NAMES = {INPLAY: "inplay", SCHEDULE: "schedule", SHADOW: "shadow"}
+
+RESERVES = {
+    INPLAY: 0,
+    SCHEDULE: int(os.getenv("SPORTMONKS_BUDGET_SCHEDULE_RESERVE", "300")),
+    SHADOW: int(os.getenv("SPORTMONKS_BUDGET_SHADOW_RESERVE", "1000")),
+}
+# so lange darf ein Request auf den Reset warten, bevor er abgelehnt wird (Shadow wartet nie)
+MAX_DELAY_SECONDS = {
+    INPLAY: float(os.getenv("SPORTMONKS_BUDGET_INPLAY_MAX_DELAY_SECONDS", "10")),
+    SCHEDULE: float(os.getenv("SPORTMONKS_BUDGET_SCHEDULE_MAX_DELAY_SECONDS", "60")),
+    SHADOW: 0.0,
+}
+
+_TAIL_BYTES = 1024
+
+
+class BudgetExhausted(RuntimeError):
+    def __init__(self, entity: str, priority: int, retry_after: float) -> None:
+        super().__init__(
+            f"SportMonks budget for {entity} reserved for higher priority "
+            f"({PRIORITY_NAMES.get(priority, priority)}), resets in {retry_after:.0f}s"
+        )
+        self.entity = entity
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+def parse_rate_limit(raw: bytes) -> Optional[Dict[str, Any]]:
+    """rate_limit-Objekt aus den Antwortbytes, ohne die (grosse) Antwort komplett zu parsen."""
+    start = raw.rfind(b'"rate_limit"', max(0, len(raw) - _TAIL_BYTES))
+    if start < 0:
+        start = raw.find(b'"rate_limit"')
+    if start < 0:
+        return None
+    begin = raw.find(b"{", start)
+    end = raw.find(b"}", begin)
+    if begin < 0 or end < 0:
+        return None
+    try:
+        rate_limit = json.loads(raw[begin:end + 1])
+    except ValueError:
+        return None
+    return rate_limit if isinstance(rate_limit, dict) else None
+
+
+class RequestBudget:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # entity -> {"remaining": int, "resets_at": monotonic}
+        self._entities: Dict[str, Dict[str, Any]] = {}
+        self._endpoint_entity: Dict[str, str] = {}
+        self.requests = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.delayed = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.shed = {name: 0 for name in PRIORITY_NAMES.values()}
+
+    def _state(self, endpoint: str, now: float) -> Optional[Dict[str, Any]]:
+        entity = self._endpoint_entity.get(endpoint)
+        state = self._entities.get(entity) if entity else None
+        if state is not None and now >= state["resets_at"]:
+            # Stunde vorbei: Stand unbekannt bis zur naechsten Antwort
+            self._entities.pop(entity, None)
+            return None
+        return state
+
+    def check(self, endpoint: str, priority: int) -> float:
+        """0 = Request darf raus (und wird vorgemerkt), sonst Wartezeit bis zum Reset; BudgetExhausted = ablehnen."""
+        name = PRIORITY_NAMES[priority]
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(endpoint, now)
+            if state is None or state["remaining"] > RESERVES[priority]:
+                if state is not None:
+                    # vormerken, damit parallele Requests die Reserve nicht gemeinsam unterlaufen
+                    state["remaining"] -= 1
+                self.requests[name] += 1
+                return 0.0
+            retry_after = max(0.0, state["resets_at"] - now)
+            if retry_after <= MAX_DELAY_SECONDS[priority]:
+                self.delayed[name] += 1
+                return retry_after
+            self.shed[name] += 1
+            raise BudgetExhausted(state["entity"], priority, retry_after)
+
+    async def acquire(self, endpoint: str, priority: int) -> None:
+        while True:
+            delay = self.check(endpoint, priority)
+            if delay <= 0:
+                return
+            # nach dem Reset ist der Stand unbekannt -> naechster check laesst durch
+            await asyncio.sleep(delay + 0.05)
+
+    def observe(self, endpoint: str, raw: bytes) -> None:
+        rate_limit = parse_rate_limit(raw)
+        if not rate_limit:
+            return
+        entity = rate_limit.get("requested_entity")
+        remaining = rate_limit.get("remaining")
+        resets_in = rate_limit.get("resets_in_seconds")
+        if not isinstance(entity, str) or not isinstance(remaining, int) or not isinstance(resets_in, (int, float)):
+            return
+        with self._lock:
+            self._endpoint_entity[endpoint] = entity
+            self._entities[entity] = {
+                "entity": entity,
+                "remaining": remaining,
+                "resets_at": time.monotonic() + float(resets_in),
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            entities = {
+                entity: {
+                    "remaining": state["remaining"],
+                    "resets_in_seconds": max(0, int(state["resets_at"] - now)),
+                }
+                for entity, state in sorted(self._entities.items())
+                if state["resets_at"] > now
+            }
+            return {
+                "entities": entities,
+                "endpoints": dict(sorted(self._endpoint_entity.items())),
+                "reserves": {PRIORITY_NAMES[p]: reserve for p, reserve in RESERVES.items()},
+                "requests": dict(self.requests),
+                "delayed": dict(self.delayed),
+                "shed": dict(self.shed),
+            }
+
+
+# ein Kontingent pro Prozess, gemeinsam fuer alle Clients
+sportmonks_budget = RequestBudget()
@@ -1,59 +1,444 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+import asyncio
+import importlib.util
+import json
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional
 
 import httpx
 
+from app.core.http_cache import HttpCache, cache_key, http_cache
+from app.core.sportmonks.budget import INPLAY, SCHEDULE, RequestBudget, sportmonks_budget
+
 SPORTMONKS_BASE_URL = "https://api.sportmonks.com/v3/football"
 
+# Ein httpx.AsyncClient (Keep-Alive-Pool) pro Prozess, betrieben auf einem eigenen
+# Event-Loop-Thread: synchroner Code (Services, CLI, Worker-Thread) ruft get() auf,
+# async Code aget(). Parallele Requests sind per Semaphore begrenzt.
+# HTTP/2 nur, wenn das optionale Paket h2 installiert ist (pip install "httpx[http2]").
+MAX_CONNECTIONS = int(os.getenv("SPORTMONKS_HTTP_MAX_CONNECTIONS", "10"))
+MAX_CONCURRENCY = int(os.getenv("SPORTMONKS_HTTP_MAX_CONCURRENCY", "4"))
+KEEPALIVE_SECONDS = float(os.getenv("SPORTMONKS_HTTP_KEEPALIVE_SECONDS", "60"))
+HTTP2 = os.getenv("SPORTMONKS_HTTP2", "1").strip().lower() in {"1", "true", "yes", "on"}
+TIMEOUT = httpx.Timeout(20.0)
+
+# Paginierte Endpunkte (/fixtures, /seasons, ...): Seite 1 liefert pagination.has_more,
+# danach bis zu PAGE_CONCURRENCY Folgeseiten gleichzeitig; Seiten gehen beim Eintreffen
+# an den Aufrufer. v3 nennt keine Gesamtzahl, daher wird hoechstens PAGE_CONCURRENCY-1
+# Seiten ueber das Ende hinaus angefragt (leer, has_more=false).
+PAGE_CONCURRENCY = int(os.getenv("SPORTMONKS_PAGE_CONCURRENCY", "3"))
+MAX_PAGES = int(os.getenv("SPORTMONKS_MAX_PAGES", "50"))
+RETRY_ATTEMPTS = max(1, int(os.getenv("SPORTMONKS_RETRY_ATTEMPTS", "4")))
+RETRY_BASE_SECONDS = float(os.getenv("SPORTMONKS_RETRY_BASE_SECONDS", "1"))
+RETRY_MAX_SECONDS = float(os.getenv("SPORTMONKS_RETRY_MAX_SECONDS", "60"))
+
+
+class Page(NamedTuple):
+    number: int
+    raw: bytes
+    payload: Dict[str, Any]
+    # aus dem Festplatten-Cache (app/core/http_cache.py) statt frisch geladen
+    cached: bool = False
+
+
+def has_more(payload: Any) -> bool:
+    pagination = payload.get("pagination") if isinstance(payload, dict) else None
+    return bool(isinstance(pagination, dict) and pagination.get("has_more"))
+
+
+def retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """Retry-After bzw. rate_limit.resets_in_seconds, sonst exponentiell mit Jitter."""
+    if response is not None:
+        header = response.headers.get("Retry-After")
+        if header and header.strip().isdigit():
+            return min(RETRY_MAX_SECONDS, float(header))
+        try:
+            resets_in = response.json().get("rate_limit", {}).get("resets_in_seconds")
+        except (ValueError, AttributeError):
+            resets_in = None
+        if isinstance(resets_in, (int, float)) and resets_in > 0:
+            return min(RETRY_MAX_SECONDS, float(resets_in))
+    delay = RETRY_BASE_SECONDS * (2 ** attempt)
+    return min(RETRY_MAX_SECONDS, delay + random.uniform(0, delay / 2))
+
+
+def _http2_available() -> bool:
+    return HTTP2 and importlib.util.find_spec("h2") is not None
+
 
 class SportMonksClient:
-    def __init__(self, api_token: str, base_url: str = SPORTMONKS_BASE_URL) -> None:
+    def __init__(
+        self,
+        api_token: str,
+        base_url: str = SPORTMONKS_BASE_URL,
+        max_connections: int = MAX_CONNECTIONS,
+        max_concurrency: int = MAX_CONCURRENCY,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        budget: RequestBudget = sportmonks_budget,
+        cache: HttpCache = http_cache,
+    ) -> None:
         self._api_token = api_token
-        self._client = httpx.Client(base_url=base_url.rstrip("/"), timeout=20.0)
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max(1, int(max_connections))
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.http2 = _http2_available()
+        self._transport = transport
+        # Stundenkontingent pro Entity, Prioritaeten siehe budget.py
+        self.budget = budget
+        self.cache = cache
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+        # Loop-Zeit, bis zu der nach einem 429 keine Requests rausgehen
+        self._paused_until = 0.0
+        self.rate_limit_pauses = 0
+        self.retries = 0
 
-    def get_team_schedule(self, team_id: int) -> Dict[str, Any]:
-        response = self._client.get(
-            f"/schedules/teams/{team_id}",
-            params={"api_token": self._api_token},
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="sportmonks-http", daemon=True)
+                thread.start()
+                asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    async def _open(self) -> None:
+        # im Client-Loop anlegen: Pool und Semaphore gehoeren zu diesem Loop
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=TIMEOUT,
+            http2=self.http2,
+            transport=self._transport,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=KEEPALIVE_SECONDS,
+            ),
         )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def _request(
+        self,
+        endpoint: str,
+        path: str,
+        params: Dict[str, Any],
+        timeout: Any,
+        priority: int,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        # vor der Semaphore: wartende Requests niedriger Prioritaet blockieren keinen Slot
+        await self.budget.acquire(endpoint, priority)
+        async with self._semaphore:
+            await self._rate_gate()
+            started = time.perf_counter()
+            try:
+                response = await self._client.get(
+                    path,
+                    params={"api_token": self._api_token, **params},
+                    timeout=timeout,
+                    headers=headers,
+                )
+            except httpx.HTTPError:
+                self._record(endpoint, started, 0, error=True)
+                raise
+        self._record(endpoint, started, len(response.content or b""), error=response.status_code >= 400)
+        self.budget.observe(endpoint, response.content or b"")
+        return response
+
+    async def _rate_gate(self) -> None:
+        wait = self._paused_until - asyncio.get_running_loop().time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _pause(self, seconds: float) -> None:
+        until = asyncio.get_running_loop().time() + seconds
+        if until > self._paused_until:
+            self._paused_until = until
+            self.rate_limit_pauses += 1
+
+    async def _fetch_page(
+        self,
+        endpoint: str,
+        path: str,
+        params: Dict[str, Any],
+        number: int,
+        priority: int,
+        cache_ttl: Optional[float] = None,
+    ) -> Page:
+        page_params = {**params, "page": number}
+        loop = asyncio.get_running_loop()
+        key = cached = None
+        if (cache_ttl or 0) > 0 and self.cache.enabled:
+            # Datei-I/O nicht im Client-Loop; Cache-Treffer kosten kein Budget
+            key = cache_key(self.base_url + path, page_params)
+            cached = await loop.run_in_executor(None, self.cache.lookup, key)
+            if cached is not None and cached.fresh:
+                return Page(number, cached.body, json.loads(cached.body), True)
+        validators = cached.validators() if cached is not None else None
+        for attempt in range(RETRY_ATTEMPTS):
+            last = attempt == RETRY_ATTEMPTS - 1
+            try:
+                response = await self._request(endpoint, path, page_params, TIMEOUT, priority, validators)
+            except httpx.TransportError:
+                if last:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(retry_delay(attempt))
+                continue
+            if response.status_code == 429 or response.status_code >= 500:
+                if last:
+                    break
+                self.retries += 1
+                delay = retry_delay(attempt, response)
+                if response.status_code == 429:
+                    # gilt fuer alle Requests dieses Clients, nicht nur diese Seite
+                    self._pause(delay)
+                else:
+                    await asyncio.sleep(delay)
+                continue
+            if response.status_code == 304 and cached is not None:
+                await loop.run_in_executor(None, self.cache.refresh, key, cache_ttl)
+                return Page(number, cached.body, json.loads(cached.body), True)
+            if response.status_code >= 400:
+                break
+            payload = json.loads(response.content)
+            if not isinstance(payload, dict):
+                payload = {"data": payload}
+            if key is not None:
+                await loop.run_in_executor(
+                    None,
+                    self.cache.store,
+                    key,
+                    self.base_url + path,
+                    page_params,
+                    response.content,
+                    cache_ttl,
+                    dict(response.headers),
+                )
+            return Page(number, response.content, payload)
+        raise RuntimeError(
+            f"SportMonks request failed with status {response.status_code}: {response.text[:300]}"
+        )
+
+    async def _paginate(
+        self,
+        endpoint: str,
+        path: str,
+        params: Dict[str, Any],
+        emit: Callable[[Page], None],
+        max_pages: int,
+        concurrency: int,
+        priority: int,
+        cache_ttl: Optional[float],
+    ) -> None:
+        first = await self._fetch_page(endpoint, path, params, 1, priority, cache_ttl)
+        emit(first)
+        done = not has_more(first.payload)
+        next_number = 2
+        pending: set = set()
+        try:
+            while True:
+                while not done and len(pending) < concurrency and next_number <= max_pages:
+                    pending.add(asyncio.ensure_future(self._fetch_page(endpoint, path, params, next_number, priority, cache_ttl)))
+                    next_number += 1
+                if not pending:
+                    return
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    page = task.result()
+                    if not has_more(page.payload):
+                        done = True
+                    if page.payload.get("data"):
+                        emit(page)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def iter_pages(
+        self,
+        endpoint: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        max_pages: int = MAX_PAGES,
+        concurrency: int = PAGE_CONCURRENCY,
+        priority: int = SCHEDULE,
+        cache_ttl: Optional[float] = None,
+    ) -> Iterator[Page]:
+        """Alle Seiten eines paginierten Endpunkts, in Ankunftsreihenfolge (nicht zwingend sortiert)."""
+        loop = self._ensure_loop()
+        pages: "queue.Queue[Any]" = queue.Queue()
+        finished = object()
+
+        async def run() -> None:
+            try:
+                await self._paginate(
+                    endpoint,
+                    path,
+                    params or {},
+                    pages.put,
+                    max(1, int(max_pages)),
+                    max(1, int(concurrency)),
+                    priority,
+                    cache_ttl,
+                )
+            except BaseException as exc:
+                pages.put(exc)
+                raise
+            pages.put(finished)
+
+        future = asyncio.run_coroutine_threadsafe(run(), loop)
+        try:
+            while True:
+                item = pages.get()
+                if item is finished:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            if not future.done():
+                future.cancel()
+
+    def iter_data(self, endpoint: str, path: str, params: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Iterator[Any]:
+        for page in self.iter_pages(endpoint, path, params, **kwargs):
+            data = page.payload.get("data")
+            if isinstance(data, list):
+                yield from data
+
+    def _record(self, endpoint: str, started: float, size: int, error: bool) -> None:
+        latency_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            item = self._endpoints.setdefault(endpoint, {
+                "requests": 0,
+                "errors": 0,
+                "bytes": 0,
+                "latency_ms_total": 0.0,
+                "latency_ms_max": 0.0,
+            })
+            item["requests"] += 1
+            item["errors"] += int(error)
+            item["bytes"] += size
+            item["latency_ms_total"] += latency_ms
+            item["latency_ms_max"] = max(item["latency_ms_max"], latency_ms)
+
+    def get(
+        self,
+        endpoint: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Any = TIMEOUT,
+        priority: int = SCHEDULE,
+    ) -> httpx.Response:
+        """Blockierend (aus beliebigen Threads, nicht aus dem Client-Loop selbst)."""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._request(endpoint, path, params or {}, timeout, priority), loop)
+        return future.result()
+
+    async def aget(
+        self,
+        endpoint: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Any = TIMEOUT,
+        priority: int = SCHEDULE,
+    ) -> httpx.Response:
+        """Aus einem anderen Event-Loop (z. B. FastAPI) awaitbar."""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._request(endpoint, path, params or {}, timeout, priority), loop)
+        return await asyncio.wrap_future(future)
+
+    def _get_raw(self, endpoint: str, path: str, params: Dict[str, Any], priority: int = SCHEDULE) -> bytes:
+        response = self.get(endpoint, path, params, priority=priority)
         if response.status_code >= 400:
             raise RuntimeError(
                 f"SportMonks request failed with status {response.status_code}"
             )
-        return response.json()
+        # Originalbytes; geparst wird beim Aufrufer genau einmal
+        return response.content
+
+    def get_team_schedule_raw(self, team_id: int) -> bytes:
+        return self._get_raw("schedules/teams", f"/schedules/teams/{team_id}", {})
+
+    def get_team_schedule(self, team_id: int) -> Dict[str, Any]:
+        return json.loads(self.get_team_schedule_raw(team_id))
+
+    def get_league_schedule_raw(self, league_id: int, season_id: int, include: str) -> bytes:
+        return self._get_raw("fixtures", "/fixtures", {
+            "season_id": season_id,
+            "include": include,
+            "league_id": league_id,
+        })
 
     def get_league_schedule(self, league_id: int, season_id: int, include: str) -> Dict[str, Any]:
-        path = "/fixtures"
+        return json.loads(self.get_league_schedule_raw(league_id, season_id, include))
+
+    def iter_league_schedule_pages(
+        self,
+        league_id: int,
+        season_id: int,
+        include: str,
+        select: Optional[str] = None,
+        cache_ttl: Optional[float] = None,
+    ) -> Iterator[Page]:
         params = {
-            "api_token": self._api_token,
             "season_id": season_id,
             "include": include,
             "league_id": league_id,
+            "per_page": 50,
+        }
+        if select:
+            params["select"] = select
+        return self.iter_pages("fixtures", "/fixtures", params, cache_ttl=cache_ttl)
+
+    def get_livescores_inplay_raw(self, include: str, select: Optional[str] = None) -> bytes:
+        params = {"include": include}
+        if select:
+            params["select"] = select
+        return self._get_raw("livescores/inplay", "/livescores/inplay", params, priority=INPLAY)
+
+    def get_livescores_inplay(self, include: str, select: Optional[str] = None) -> Dict[str, Any]:
+        return json.loads(self.get_livescores_inplay_raw(include, select))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            endpoints = {
+                name: {
+                    "requests": item["requests"],
+                    "errors": item["errors"],
+                    "bytes": item["bytes"],
+                    "latency_ms_avg": round(item["latency_ms_total"] / item["requests"], 1) if item["requests"] else None,
+                    "latency_ms_max": round(item["latency_ms_max"], 1),
+                }
+                for name, item in sorted(self._endpoints.items())
+            }
+        return {
+            "open": self._loop is not None,
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_concurrency": self.max_concurrency,
+            "retries": self.retries,
+            "rate_limit_pauses": self.rate_limit_pauses,
+            "endpoints": endpoints,
         }
-        response = self._client.get(
-            path,
-            params=params,
-        )
-        if response.status_code >= 400:
-            raise RuntimeError(
-                f"SportMonks request failed with status {response.status_code}"
-            )
-        return response.json()
-
-    def get_livescores_inplay(self, include: str) -> Dict[str, Any]:
-        response = self._client.get(
-            "/livescores/inplay",
-            params={
-                "api_token": self._api_token,
-                "include": include,
-            },
-        )
-        if response.status_code >= 400:
-            raise RuntimeError(
-                f"SportMonks request failed with status {response.status_code}"
-            )
-        return response.json()
 
     def close(self) -> None:
-        self._client.close()
+        with self._start_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5.0)
+        loop.close()
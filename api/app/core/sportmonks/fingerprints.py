@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.db import engine
+
+
+# Fingerprint des normalisierten Inplay-Zustands pro Fixture.
+# Der Poller schreibt nur Fixtures, deren Fingerprint sich geaendert hat; updated_at
+# gehoert bewusst nicht dazu. Nach einem Neustart wird der Stand aus
+# sportmonks_inplay_state rekonstruiert (kein eigener Speicher noetig).
+
+FINGERPRINT_FIELDS = (
+    "status",
+    "minute",
+    "period",
+    "score_home",
+    "score_away",
+    "starts_at",
+    "home_id",
+    "away_id",
+    "league_id",
+    "season_id",
+)
+
+_LOAD_SQL = text(f"""
+    select fixture_id, {", ".join(FINGERPRINT_FIELDS)}
+    from referee_ratings.sportmonks_inplay_state
+""")
+
+Fingerprint = Tuple[Any, ...]
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat()
+    return value
+
+
+def fingerprint(row: Dict[str, Any]) -> Fingerprint:
+    return tuple(_normalize(row.get(field)) for field in FINGERPRINT_FIELDS)
+
+
+class InplayFingerprints:
+    def __init__(self) -> None:
+        self._known: Optional[Dict[int, Fingerprint]] = None
+        self._lock = threading.Lock()
+
+    def _ensure(self) -> Dict[int, Fingerprint]:
+        with self._lock:
+            if self._known is None:
+                with engine.connect() as conn:
+                    rows = conn.execute(_LOAD_SQL).mappings().all()
+                self._known = {int(row["fixture_id"]): fingerprint(row) for row in rows}
+            return self._known
+
+    def split(self, rows: Iterable[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """Trennt geaenderte Zeilen von unveraenderten; liefert (changed, unchanged_count)."""
+        known = self._ensure()
+        changed = []
+        unchanged = 0
+        for row in rows:
+            if known.get(int(row["fixture_id"])) == fingerprint(row):
+                unchanged += 1
+            else:
+                changed.append(row)
+        return changed, unchanged
+
+    def remember(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Erst nach erfolgreichem Schreiben aufrufen, sonst gehen Aenderungen verloren."""
+        known = self._ensure()
+        with self._lock:
+            for row in rows:
+                known[int(row["fixture_id"])] = fingerprint(row)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._known = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._known or {})
+
+
+inplay_fingerprints = InplayFingerprints()
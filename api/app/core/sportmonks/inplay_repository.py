@@ -7,6 +7,25 @@ from typing import Any, Dict, Iterable, List, Optional, Tuple
 from sqlalchemy import text
 
 from app.db import engine
+from app.core.bulk import bulk_upsert
+from app.core.sportmonks.raw_archive import pack_payload
+from app.core.sportmonks.raw_partitions import check_partition_for
+
+
+INPLAY_STATE_COLUMNS = (
+    "fixture_id",
+    "updated_at",
+    "status",
+    "minute",
+    "period",
+    "score_home",
+    "score_away",
+    "starts_at",
+    "home_id",
+    "away_id",
+    "league_id",
+    "season_id",
+)
 
 
 def _parse_datetime(value: Any) -> Optional[datetime]:
@@ -160,119 +179,161 @@ def _extract_scores(fixture: Dict[str, Any]) -> Tuple[Optional[int], Optional[in
     return None, None
 
 
+_SUMMARY_ENSURE_SQL = text("""
+    insert into referee_ratings.sportmonks_inplay_raw_summary (stream)
+    values (:stream)
+    on conflict (stream) do nothing
+""")
+
+_SUMMARY_LOCK_SQL = text("""
+    select last_raw_id, last_raw_fetched_at, last_content_sha256
+    from referee_ratings.sportmonks_inplay_raw_summary
+    where stream = :stream
+    for update
+""")
+
+_RAW_SEEN_AGAIN_SQL = text("""
+    update referee_ratings.sportmonks_inplay_raw
+    set last_seen_at = :fetched_at,
+        seen_count = seen_count + 1
+    where id = :id and fetched_at = :raw_fetched_at
+""")
+
+_RAW_INSERT_SQL = text("""
+    insert into referee_ratings.sportmonks_inplay_raw
+      (fetched_at, last_seen_at, fixture_id, request_params,
+       payload_gz, payload_sha256, content_sha256, payload_bytes)
+    values
+      (:fetched_at, :fetched_at, :fixture_id, CAST(:request_params AS jsonb),
+       :payload_gz, :payload_sha256, :content_sha256, :payload_bytes)
+    returning id
+""")
+
+_SUMMARY_UPDATE_SQL = text("""
+    update referee_ratings.sportmonks_inplay_raw_summary
+    set last_fetched_at = :fetched_at,
+        last_raw_id = :id,
+        last_raw_fetched_at = :raw_fetched_at,
+        last_content_sha256 = :content_sha256,
+        total_polls = total_polls + 1,
+        stored_payloads = stored_payloads + :stored,
+        updated_at = now()
+    where stream = :stream
+""")
+
+
 def insert_inplay_raw(
     payload: Any,
     request_params: Optional[Dict[str, Any]],
     fetched_at: Optional[datetime] = None,
     fixture_id: Optional[int] = None,
 ) -> int:
+    """
+    payload sind idealerweise die Originalbytes der Response (siehe raw_archive).
+    Ist der Inhalt identisch mit dem letzten Payload desselben Streams, wird nur
+    dessen last_seen_at/seen_count fortgeschrieben statt eine neue Zeile anzulegen.
+    """
     fetched_at = fetched_at or datetime.now(timezone.utc)
-    sql = text("""
-        insert into referee_ratings.sportmonks_inplay_raw
-          (fetched_at, fixture_id, request_params, payload)
-        values
-          (:fetched_at, :fixture_id, CAST(:request_params AS jsonb), CAST(:payload AS jsonb))
-        returning id
-    """)
-    params = {
-        "fetched_at": fetched_at,
-        "fixture_id": fixture_id,
-        "request_params": json.dumps(request_params or {}),
-        "payload": json.dumps(payload),
-    }
+    packed = pack_payload(payload)
+    stream = "inplay" if fixture_id is None else f"fixture:{fixture_id}"
     with engine.begin() as conn:
-        row = conn.execute(sql, params).first()
-        return int(row[0]) if row else 0
+        check_partition_for(conn, fetched_at)
+        conn.execute(_SUMMARY_ENSURE_SQL, {"stream": stream})
+        last = conn.execute(_SUMMARY_LOCK_SQL, {"stream": stream}).mappings().first()
+
+        if last and last["last_raw_id"] and last["last_content_sha256"] == packed["content_sha256"]:
+            seen = conn.execute(_RAW_SEEN_AGAIN_SQL, {
+                "fetched_at": fetched_at,
+                "id": last["last_raw_id"],
+                "raw_fetched_at": last["last_raw_fetched_at"],
+            })
+            if seen.rowcount:
+                conn.execute(_SUMMARY_UPDATE_SQL, {
+                    "stream": stream,
+                    "fetched_at": fetched_at,
+                    "id": last["last_raw_id"],
+                    "raw_fetched_at": last["last_raw_fetched_at"],
+                    "content_sha256": packed["content_sha256"],
+                    "stored": 0,
+                })
+                return int(last["last_raw_id"])
+
+        row = conn.execute(_RAW_INSERT_SQL, {
+            "fetched_at": fetched_at,
+            "fixture_id": fixture_id,
+            "request_params": json.dumps(request_params or {}),
+            **packed,
+        }).first()
+        raw_id = int(row[0]) if row else 0
+        conn.execute(_SUMMARY_UPDATE_SQL, {
+            "stream": stream,
+            "fetched_at": fetched_at,
+            "id": raw_id,
+            "raw_fetched_at": fetched_at,
+            "content_sha256": packed["content_sha256"],
+            "stored": 1,
+        })
+        return raw_id
+
+
+def build_inplay_state_rows(
+    payload: Any,
+    fetched_at: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    fetched_at = fetched_at or datetime.now(timezone.utc)
+    rows = []
+    for fixture in _extract_fixtures(payload):
+        fixture_id = _get_int(fixture.get("id"))
+        if fixture_id is None:
+            continue
+        home_id, away_id = _extract_team_ids(fixture)
+        score_home, score_away = _extract_scores(fixture)
+        rows.append({
+            "fixture_id": fixture_id,
+            "updated_at": fetched_at,
+            "status": _extract_status(fixture),
+            "minute": _extract_minute(fixture),
+            "period": _extract_period(fixture),
+            "score_home": score_home,
+            "score_away": score_away,
+            "starts_at": _extract_starts_at(fixture),
+            "home_id": home_id,
+            "away_id": away_id,
+            "league_id": _get_int(fixture.get("league_id")),
+            "season_id": _get_int(fixture.get("season_id")),
+        })
+    return rows
+
+
+def write_inplay_state_rows(rows: List[Dict[str, Any]]) -> Dict[str, int]:
+    if not rows:
+        return {"inserted": 0, "updated": 0}
+    with engine.begin() as conn:
+        return bulk_upsert(
+            conn,
+            "referee_ratings.sportmonks_inplay_state",
+            INPLAY_STATE_COLUMNS,
+            rows,
+            conflict=("fixture_id",),
+        )
 
 
 def upsert_inplay_state(
     payload: Any,
     fetched_at: Optional[datetime] = None,
 ) -> Dict[str, int]:
-    fetched_at = fetched_at or datetime.now(timezone.utc)
     fixtures = _extract_fixtures(payload)
     if not fixtures:
         return {"processed": 0, "inserted": 0, "updated": 0}
-
-    sql = text("""
-        insert into referee_ratings.sportmonks_inplay_state (
-            fixture_id,
-            updated_at,
-            status,
-            minute,
-            period,
-            score_home,
-            score_away,
-            starts_at,
-            home_id,
-            away_id,
-            league_id,
-            season_id
-        ) values (
-            :fixture_id,
-            :updated_at,
-            :status,
-            :minute,
-            :period,
-            :score_home,
-            :score_away,
-            :starts_at,
-            :home_id,
-            :away_id,
-            :league_id,
-            :season_id
-        )
-        on conflict (fixture_id) do update set
-            updated_at = excluded.updated_at,
-            status = excluded.status,
-            minute = excluded.minute,
-            period = excluded.period,
-            score_home = excluded.score_home,
-            score_away = excluded.score_away,
-            starts_at = excluded.starts_at,
-            home_id = excluded.home_id,
-            away_id = excluded.away_id,
-            league_id = excluded.league_id,
-            season_id = excluded.season_id
-        returning (xmax = 0) as inserted
-    """)
-
-    inserted = 0
-    updated = 0
-    with engine.begin() as conn:
-        for fixture in fixtures:
-            fixture_id = _get_int(fixture.get("id"))
-            if fixture_id is None:
-                continue
-            home_id, away_id = _extract_team_ids(fixture)
-            score_home, score_away = _extract_scores(fixture)
-            payload_row = {
-                "fixture_id": fixture_id,
-                "updated_at": fetched_at,
-                "status": _extract_status(fixture),
-                "minute": _extract_minute(fixture),
-                "period": _extract_period(fixture),
-                "score_home": score_home,
-                "score_away": score_away,
-                "starts_at": _extract_starts_at(fixture),
-                "home_id": home_id,
-                "away_id": away_id,
-                "league_id": _get_int(fixture.get("league_id")),
-                "season_id": _get_int(fixture.get("season_id")),
-            }
-            row = conn.execute(sql, payload_row).mappings().first()
-            if row and row.get("inserted"):
-                inserted += 1
-            else:
-                updated += 1
-
-    return {"processed": len(fixtures), "inserted": inserted, "updated": updated}
+    counts = write_inplay_state_rows(build_inplay_state_rows(payload, fetched_at))
+    return {"processed": len(fixtures), **counts}
 
 
 def get_inplay_snapshot() -> Dict[str, Any]:
+    # last_fetched_at aus der Summary-Tabelle (eine Zeile pro Stream) statt max() ueber das Archiv
     sql = text("""
         select
-          (select max(fetched_at) from referee_ratings.sportmonks_inplay_raw) as last_fetched_at,
+          (select max(last_fetched_at) from referee_ratings.sportmonks_inplay_raw_summary) as last_fetched_at,
           (select count(*) from referee_ratings.sportmonks_inplay_state) as fixtures
     """)
     with engine.connect() as conn:
@@ -83,6 +83,16 @@ def get_league_mapping_by_provider_ids(
     return None
 
 
+def is_tracked_league(provider_league_id: int | None) -> bool:
+    if not provider_league_id:
+        return False
+    return any(
+        mapping.provider_league_id == provider_league_id
+        for seasons in _MAPPINGS.values()
+        for mapping in seasons.values()
+    )
+
+
 def resolve_provider_filters(
     league_code: Optional[str],
     season_key: Optional[str],
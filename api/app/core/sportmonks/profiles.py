@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# Benannte include/select-Profile pro Verbraucher: jede SportMonks-Anfrage holt nur die
+# Entities und Felder, die der Verbraucher liest (weniger Bytes, schnellere Polls).
+# include-Syntax wie bei SportMonks v3: "relation:feld1,feld2;andere.relation".
+# id und Fremdschluessel der Haupt-Entity liefert die API immer mit; meta (Pivot, z. B.
+# participants.meta.location) haengt an der Relation und laesst sich nicht abwaehlen.
+
+
+class IncludeProfile(NamedTuple):
+    name: str
+    include: str
+    select: Optional[str]
+    description: str
+
+    def params(self) -> Dict[str, str]:
+        params = {"include": self.include}
+        if self.select:
+            params["select"] = self.select
+        return params
+
+
+# alles, was poll_inplay_and_persist bis zur Einfuehrung der Profile geholt hat
+INPLAY_FULL = IncludeProfile(
+    "inplay-full",
+    "participants;scores;periods;events;league.country;round",
+    None,
+    "Bisheriger Inplay-Abruf, Referenz fuer den Vergleich",
+)
+
+# build_inplay_state_rows/map_fixture_to_match: ids, Zustand, Minute, Spielstand, Teams
+INPLAY_STATE = IncludeProfile(
+    "inplay-state",
+    "participants:name;scores:participant_id,score,description;periods:minutes,ticking,description",
+    "name,starting_at,starting_at_timestamp,state_id,league_id,season_id",
+    "Inplay-Polling -> sportmonks_inplay_state und matches",
+)
+
+# fuer Tor-/Karten-Szenen: zusaetzlich die Events, ohne Liga-/Runden-Stammdaten
+EVENTS = IncludeProfile(
+    "events",
+    "participants:name;scores:participant_id,score,description;periods:minutes,ticking,description;"
+    "events:type_id,participant_id,minute,extra_minute,player_name,related_player_name,result",
+    "name,starting_at,starting_at_timestamp,state_id,league_id,season_id",
+    "Inplay mit Events (Szenen aus Toren/Karten)",
+)
+
+# upsert_schedule_fixtures: Anstoss, Teams, Status, Venue
+SCHEDULE = IncludeProfile(
+    "schedule",
+    "participants:name",
+    "name,starting_at,starting_at_timestamp,state_id,league_id,season_id,round_id,venue_id",
+    "Spielplan-Sync -> sportmonks_schedule_fixture",
+)
+
+# Shadow-Diagnose: breit, aber ohne Scores/Perioden
+SHADOW = IncludeProfile(
+    "shadow",
+    "participants;events;league;season",
+    None,
+    "Shadow-Abrufe (sportmonks-shadow-inplay)",
+)
+
+PROFILES: Dict[str, IncludeProfile] = {
+    profile.name: profile for profile in (INPLAY_FULL, INPLAY_STATE, EVENTS, SCHEDULE, SHADOW)
+}
+
+
+def get_profile(name: str) -> IncludeProfile:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown SportMonks include profile: {name}") from None
+
+
+# Verbraucher -> Profil; per ENV zurueck auf inplay-full schaltbar (z. B. fuer Event-Auswertungen)
+INPLAY_PROFILE = get_profile(os.getenv("SPORTMONKS_INPLAY_PROFILE", INPLAY_STATE.name))
+SCHEDULE_PROFILE = get_profile(os.getenv("SPORTMONKS_SCHEDULE_PROFILE", SCHEDULE.name))
+
+
+def parse_include(include: str) -> Dict[str, Any]:
+    """'a:x,y;b.c' -> {"a": {"fields": {"x","y"}, "children": {}}, "b": {"fields": None, "children": {"c": ...}}}"""
+    tree: Dict[str, Any] = {}
+    for part in include.split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        path, _, fields = part.partition(":")
+        node = {"children": tree}
+        for name in path.split("."):
+            node = node["children"].setdefault(name.strip(), {"fields": None, "children": {}})
+        if fields:
+            node["fields"] = {field.strip() for field in fields.split(",") if field.strip()}
+    return tree
+
+
+def _is_relation(value: Any) -> bool:
+    # eingebettete Entities haben eine id; JSON-Attribute (score, meta) nicht
+    if isinstance(value, dict):
+        return "id" in value or isinstance(value.get("data"), (list, dict))
+    return isinstance(value, list) and any(isinstance(item, dict) and "id" in item for item in value)
+
+
+def _trim_entity(entity: Dict[str, Any], fields: Optional[set], children: Dict[str, Any]) -> Dict[str, Any]:
+    trimmed = {}
+    for key, value in entity.items():
+        if key in children:
+            node = children[key]
+            trimmed[key] = _trim_value(value, node["fields"], node["children"])
+        elif key == "meta":
+            trimmed[key] = value
+        elif not _is_relation(value) and (fields is None or key == "id" or key.endswith("_id") or key in fields):
+            trimmed[key] = value
+    return trimmed
+
+
+def _trim_value(value: Any, fields: Optional[set], children: Dict[str, Any]) -> Any:
+    if isinstance(value, dict):
+        if isinstance(value.get("data"), (list, dict)) and len(value) == 1:
+            return {"data": _trim_value(value["data"], fields, children)}
+        return _trim_entity(value, fields, children)
+    if isinstance(value, list):
+        return [_trim_value(item, fields, children) for item in value]
+    return value
+
+
+def apply_profile(payload: Any, profile: IncludeProfile) -> Any:
+    """
+    Simuliert die Antwort fuer ein Profil aus einem aufgezeichneten (breiteren) Payload.
+    Naeherung: Relationen, die nicht aufgezeichnet wurden, fehlen auch im Ergebnis.
+    """
+    fields = {field.strip() for field in profile.select.split(",")} if profile.select else None
+    children = parse_include(profile.include)
+    if isinstance(payload, dict) and "data" in payload:
+        return {**payload, "data": _trim_value(payload["data"], fields, children)}
+    return _trim_value(payload, fields, children)
+
+
+def payload_bytes(payload: Any) -> int:
+    # kompakt wie die API-Antwort
+    return len(json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+
+def compare_profiles(payload: Any, names: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    recorded = payload_bytes(payload)
+    rows = []
+    for name in names or list(PROFILES):
+        size = payload_bytes(apply_profile(payload, get_profile(name)))
+        rows.append({
+            "profile": name,
+            "bytes": size,
+            "recorded_bytes": recorded,
+            "saved_pct": round(100.0 * (recorded - size) / recorded, 1) if recorded else 0.0,
+        })
+    return rows
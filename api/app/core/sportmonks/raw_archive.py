@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import re
+from typing import Any, Dict, Optional
+
+
+# Rohpayloads werden als gzip-Bytes (payload_gz) mit SHA-256 archiviert,
+# statt das bereits geparste JSON erneut zu serialisieren.
+COMPRESS_LEVEL = 6
+
+# Flache Metadaten-Objekte, die sich bei jedem Request aendern (Quota-Zaehler).
+# Fuer den Dedup-Hash (content_sha256) werden sie ausgeblendet.
+_VOLATILE_RE = re.compile(rb'"rate_limit"\s*:\s*\{[^{}]*\}')
+
+
+def to_bytes(payload: Any) -> bytes:
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        return bytes(payload)
+    # Fallback fuer Aufrufer, die noch ein geparstes Objekt uebergeben
+    return json.dumps(payload).encode("utf-8")
+
+
+def content_sha256(raw: bytes) -> str:
+    return hashlib.sha256(_VOLATILE_RE.sub(b'"rate_limit":{}', raw)).hexdigest()
+
+
+def pack_payload(payload: Any) -> Dict[str, Any]:
+    raw = to_bytes(payload)
+    return {
+        "payload_gz": gzip.compress(raw, compresslevel=COMPRESS_LEVEL),
+        "payload_sha256": hashlib.sha256(raw).hexdigest(),
+        "content_sha256": content_sha256(raw),
+        "payload_bytes": len(raw),
+    }
+
+
+def unpack_payload(payload_gz: Optional[bytes], payload: Any = None) -> Any:
+    """Liest ein archiviertes Payload (neue gz-Zeilen oder alte JSONB-Zeilen)."""
+    if payload_gz is not None:
+        return json.loads(gzip.decompress(bytes(payload_gz)))
+    return payload
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# Tagespartitionen fuer referee_ratings.sportmonks_inplay_raw (UTC-Tage) plus
+# Retention: alte Partitionen werden in sportmonks_inplay_raw_daily aufsummiert
+# und danach gedroppt. Solange die Migration nicht eingespielt ist (Tabelle nicht
+# partitioniert), sind alle Funktionen hier No-Ops bzw. loeschen nur Zeilen.
+
+SCHEMA = "referee_ratings"
+RAW_TABLE = "sportmonks_inplay_raw"
+LEGACY_TABLE = "sportmonks_inplay_raw_legacy"
+DEFAULT_PARTITION = f"{RAW_TABLE}_default"
+_PARTITION_RE = re.compile(rf"^{RAW_TABLE}_p(\d{{8}})$")
+
+_ROLLUP_SQL = """
+    insert into referee_ratings.sportmonks_inplay_raw_daily as d
+      (day, polls, stored_payloads, payload_bytes, first_fetched_at, last_seen_at)
+    select
+      (fetched_at at time zone 'UTC')::date as day,
+      sum(seen_count),
+      count(*),
+      sum(coalesce(payload_bytes, pg_column_size(payload), 0)),
+      min(fetched_at),
+      max(coalesce(last_seen_at, fetched_at))
+    from referee_ratings.{table}
+    {where}
+    group by 1
+    on conflict (day) do update set
+      polls = d.polls + excluded.polls,
+      stored_payloads = d.stored_payloads + excluded.stored_payloads,
+      payload_bytes = d.payload_bytes + excluded.payload_bytes,
+      first_fetched_at = least(d.first_fetched_at, excluded.first_fetched_at),
+      last_seen_at = greatest(d.last_seen_at, excluded.last_seen_at)
+"""
+
+_ensured_days: set = set()
+_ensured_lock = threading.Lock()
+_partitioned: Optional[bool] = None
+
+
+def partition_name(day: date) -> str:
+    return f"{RAW_TABLE}_p{day:%Y%m%d}"
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def is_partitioned(conn) -> bool:
+    global _partitioned
+    if _partitioned is None:
+        row = conn.execute(text("""
+            select 1
+            from pg_partitioned_table p
+            join pg_class c on c.oid = p.partrelid
+            join pg_namespace n on n.oid = c.relnamespace
+            where n.nspname = :schema and c.relname = :table
+        """), {"schema": SCHEMA, "table": RAW_TABLE}).first()
+        _partitioned = bool(row)
+    return _partitioned
+
+
+def _create_partition(conn, day: date) -> None:
+    start = _day_start(day)
+    end = start + timedelta(days=1)
+    conn.execute(text(f"""
+        create table if not exists {SCHEMA}.{partition_name(day)}
+        partition of {SCHEMA}.{RAW_TABLE}
+        for values from ('{start.isoformat()}') to ('{end.isoformat()}')
+    """))
+
+
+def ensure_partitions(conn, start: date, days_ahead: int = 2) -> List[str]:
+    """Legt Tagespartitionen start..start+days_ahead an (idempotent)."""
+    if not is_partitioned(conn):
+        return []
+    created = []
+    for offset in range(max(0, days_ahead) + 1):
+        day = start + timedelta(days=offset)
+        _create_partition(conn, day)
+        created.append(partition_name(day))
+    with _ensured_lock:
+        _ensured_days.update(start + timedelta(days=o) for o in range(max(0, days_ahead) + 1))
+    return created
+
+
+def check_partition_for(conn, ts: datetime) -> None:
+    """
+    Schreibpfad: legt nichts an (CREATE ... PARTITION OF nimmt ACCESS EXCLUSIVE auf die
+    Tabelle und prueft die Default-Partition). Fehlt die Tagespartition, landen die Zeilen
+    in der Default-Partition; einmal pro Prozess und Tag loggen. Angelegt wird nur ueber
+    `inplay-raw maintain` (Cron).
+    """
+    day = ts.astimezone(timezone.utc).date()
+    with _ensured_lock:
+        if day in _ensured_days:
+            return
+    if is_partitioned(conn):
+        exists = conn.execute(
+            text("select to_regclass(:name)"),
+            {"name": f"{SCHEMA}.{partition_name(day)}"},
+        ).scalar()
+        if not exists:
+            logger.warning(
+                "inplay raw partition %s missing, rows go to %s; run inplay-raw maintain",
+                partition_name(day),
+                DEFAULT_PARTITION,
+            )
+    with _ensured_lock:
+        _ensured_days.add(day)
+
+
+def list_day_partitions(conn) -> List[Tuple[str, date]]:
+    rows = conn.execute(text("""
+        select c.relname
+        from pg_inherits i
+        join pg_class c on c.oid = i.inhrelid
+        join pg_class p on p.oid = i.inhparent
+        join pg_namespace n on n.oid = p.relnamespace
+        where n.nspname = :schema and p.relname = :table
+    """), {"schema": SCHEMA, "table": RAW_TABLE}).all()
+    result = []
+    for (name,) in rows:
+        match = _PARTITION_RE.match(name)
+        if match:
+            result.append((name, datetime.strptime(match.group(1), "%Y%m%d").date()))
+    return sorted(result, key=lambda item: item[1])
+
+
+def _table_exists(conn, table: str) -> bool:
+    row = conn.execute(
+        text("select to_regclass(:name)"),
+        {"name": f"{SCHEMA}.{table}"},
+    ).first()
+    return bool(row and row[0])
+
+
+def prune_inplay_raw(
+    conn,
+    keep_days: int,
+    now: Optional[datetime] = None,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Summiert alles vor dem Cutoff in sportmonks_inplay_raw_daily auf und entfernt es:
+    Tagespartitionen werden gedroppt, Default-Partition und Legacy-Tabelle per DELETE geleert.
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff_day = now.astimezone(timezone.utc).date() - timedelta(days=max(0, keep_days))
+    cutoff = _day_start(cutoff_day)
+    result: Dict[str, Any] = {"cutoff": cutoff, "dropped": [], "deleted_rows": 0}
+
+    if is_partitioned(conn):
+        for name, day in list_day_partitions(conn):
+            if day >= cutoff_day:
+                continue
+            result["dropped"].append(name)
+            if dry_run:
+                continue
+            conn.execute(text(_ROLLUP_SQL.format(table=name, where="")))
+            conn.execute(text(f"drop table if exists {SCHEMA}.{name}"))
+        row_tables = [DEFAULT_PARTITION]
+    else:
+        row_tables = [RAW_TABLE]
+    if _table_exists(conn, LEGACY_TABLE):
+        row_tables.append(LEGACY_TABLE)
+
+    for table in row_tables:
+        if not _table_exists(conn, table):
+            continue
+        where = "where fetched_at < :cutoff"
+        if dry_run:
+            count = conn.execute(
+                text(f"select count(*) from {SCHEMA}.{table} {where}"),
+                {"cutoff": cutoff},
+            ).scalar()
+            result["deleted_rows"] += int(count or 0)
+            continue
+        conn.execute(text(_ROLLUP_SQL.format(table=table, where=where)), {"cutoff": cutoff})
+        deleted = conn.execute(text(f"delete from {SCHEMA}.{table} {where}"), {"cutoff": cutoff})
+        result["deleted_rows"] += int(deleted.rowcount or 0)
+    return result
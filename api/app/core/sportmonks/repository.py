@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Any, Dict, Iterable, Optional, Tuple
 
 from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
 
 from app.db import engine
+from app.core.bulk import bulk_upsert
+from app.core.etag import ALL, MATCHES, bump_version
+from app.core.schema import schema_registry
 from app.core.sportmonks.mapper import map_fixture_to_match
 
 
@@ -33,26 +38,9 @@ OPTIONAL_COLUMNS = {
 }
 
 
-def _column_exists(conn, schema: str, table: str, column: str) -> bool:
-    row = conn.execute(
-        text(
-            """
-            select 1
-            from information_schema.columns
-            where table_schema = :schema
-              and table_name = :table
-              and column_name = :column
-            limit 1
-            """
-        ),
-        {"schema": schema, "table": table, "column": column},
-    ).first()
-    return bool(row)
-
-
 def _available_columns(conn) -> set[str]:
     columns = REQUIRED_COLUMNS | OPTIONAL_COLUMNS
-    return {col for col in columns if _column_exists(conn, "referee_ratings", "matches", col)}
+    return set(schema_registry.columns("referee_ratings", "matches", conn) & columns)
 
 
 def _build_upsert_sql(columns: Iterable[str]) -> str:
@@ -68,55 +56,84 @@ def _build_upsert_sql(columns: Iterable[str]) -> str:
     """
 
 
+@lru_cache(maxsize=16)
+def _compiled_upsert(columns: Tuple[str, ...]) -> TextClause:
+    return text(_build_upsert_sql(columns))
+
+
+def _upsert_columns(conn) -> Tuple[str, ...]:
+    columns = _available_columns(conn)
+    missing = REQUIRED_COLUMNS - columns
+    if missing:
+        missing_list = ", ".join(sorted(missing))
+        raise RuntimeError(
+            f"Missing required columns in referee_ratings.matches: {missing_list}"
+        )
+    return tuple(sorted(columns))
+
+
 def _coerce_str(value: Any) -> Any:
     if value is None:
         return None
     return str(value)
 
 
+def _bulk_columns(conn, payloads: Iterable[Dict[str, Any]]) -> Tuple[str, ...]:
+    # Nur Spalten schreiben, die es gibt und die der Payload auch liefert
+    # (sonst wuerden z. B. last_polled_at/last_event_id mit NULL ueberschrieben)
+    available = set(_upsert_columns(conn))
+    keys = set()
+    for payload in payloads:
+        keys.update(payload.keys())
+    return tuple(sorted(available & keys))
+
+
+def _bulk_upsert_matches(conn, payloads: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    payloads = list(payloads)
+    counts = bulk_upsert(
+        conn,
+        "referee_ratings.matches",
+        _bulk_columns(conn, payloads),
+        payloads,
+        conflict=("external_provider", "external_match_id"),
+        skip_unchanged=True,
+    )
+    # nur echte Aenderungen invalidieren den /matches-ETag (der Worker upsertet bei jedem Poll)
+    if counts["inserted"] or counts["updated"]:
+        bump_version(conn, MATCHES, ALL)
+    return counts
+
+
 def upsert_matches(matches: Iterable[Dict[str, Any]]) -> int:
     matches = list(matches)
     if not matches:
         return 0
 
-    inserted = 0
+    payloads = []
+    for match in matches:
+        if match.get("external_match_id") is None:
+            raise RuntimeError("external_match_id is required for SportMonks matches")
+        payload = {
+            "external_provider": "sportmonks",
+            "external_match_id": _coerce_str(match.get("external_match_id")),
+            "league": _coerce_str(match.get("league_id")),
+            "season": _coerce_str(match.get("season_id")),
+            "match_date": match.get("kickoff"),
+            "team_home": _coerce_str(match.get("home_team_name") or match.get("home_team_id")),
+            "team_away": _coerce_str(match.get("away_team_name") or match.get("away_team_id")),
+            "matchday_number": match.get("matchday_number"),
+            "matchday_name": match.get("matchday_name"),
+            "matchday_name_en": match.get("matchday_name_en"),
+            "status": match.get("status"),
+        }
+        if any(payload.get(k) is None for k in REQUIRED_COLUMNS):
+            raise RuntimeError("Missing required fields for SportMonks match upsert")
+        payloads.append(payload)
+
     with engine.begin() as conn:
-        columns = _available_columns(conn)
-        missing = REQUIRED_COLUMNS - columns
-        if missing:
-            missing_list = ", ".join(sorted(missing))
-            raise RuntimeError(
-                f"Missing required columns in referee_ratings.matches: {missing_list}"
-            )
-
-        columns = [col for col in columns if col in REQUIRED_COLUMNS | OPTIONAL_COLUMNS]
-        sql = text(_build_upsert_sql(columns))
-
-        for match in matches:
-            if match.get("external_match_id") is None:
-                raise RuntimeError("external_match_id is required for SportMonks matches")
-            payload = {
-                "external_provider": "sportmonks",
-                "external_match_id": _coerce_str(match.get("external_match_id")),
-                "league": _coerce_str(match.get("league_id")),
-                "season": _coerce_str(match.get("season_id")),
-                "match_date": match.get("kickoff"),
-                "team_home": _coerce_str(match.get("home_team_name") or match.get("home_team_id")),
-                "team_away": _coerce_str(match.get("away_team_name") or match.get("away_team_id")),
-                "matchday_number": match.get("matchday_number"),
-                "matchday_name": match.get("matchday_name"),
-                "matchday_name_en": match.get("matchday_name_en"),
-                "status": match.get("status"),
-            }
-            # Remove keys not in available columns
-            payload = {k: v for k, v in payload.items() if k in columns}
-            if any(payload.get(k) is None for k in REQUIRED_COLUMNS):
-                raise RuntimeError("Missing required fields for SportMonks match upsert")
-            result = conn.execute(sql, payload)
-            if result.rowcount:
-                inserted += 1
+        counts = _bulk_upsert_matches(conn, payloads)
 
-    return inserted
+    return counts["inserted"] + counts["updated"]
 
 
 def upsert_schedule_matches(matches: Iterable[Dict[str, Any]]) -> Dict[str, int]:
@@ -124,57 +141,41 @@ def upsert_schedule_matches(matches: Iterable[Dict[str, Any]]) -> Dict[str, int]
     if not matches:
         return {"processed": 0, "inserted": 0, "updated": 0, "skipped": 0}
 
-    inserted = 0
-    updated = 0
     skipped = 0
-    with engine.begin() as conn:
-        columns = _available_columns(conn)
-        missing = REQUIRED_COLUMNS - columns
-        if missing:
-            missing_list = ", ".join(sorted(missing))
-            raise RuntimeError(
-                f"Missing required columns in referee_ratings.matches: {missing_list}"
-            )
-
-        columns = [col for col in columns if col in REQUIRED_COLUMNS | OPTIONAL_COLUMNS]
-        sql = text(_build_upsert_sql(columns).rstrip() + " returning (xmax = 0) as inserted")
-
-        for match in matches:
-            if match.get("external_match_id") is None:
-                skipped += 1
-                continue
-            payload = {
-                "external_provider": "sportmonks",
-                "external_match_id": _coerce_str(match.get("external_match_id")),
-                "league": _coerce_str(match.get("league")),
-                "season": _coerce_str(match.get("season")),
-                "match_date": match.get("match_date"),
-                "team_home": _coerce_str(match.get("team_home")),
-                "team_away": _coerce_str(match.get("team_away")),
-                "matchday_number": match.get("matchday_number"),
-                "matchday_name": match.get("matchday_name"),
-                "matchday_name_en": match.get("matchday_name_en"),
-                "status": match.get("status"),
-                "provider_league_id": match.get("provider_league_id"),
-                "provider_season_id": match.get("provider_season_id"),
-                "provider_stage_id": match.get("provider_stage_id"),
-                "provider_round_id": match.get("provider_round_id"),
-            }
-            payload = {k: v for k, v in payload.items() if k in columns}
-            if any(payload.get(k) is None for k in REQUIRED_COLUMNS):
-                skipped += 1
-                continue
+    payloads = []
+    for match in matches:
+        if match.get("external_match_id") is None:
+            skipped += 1
+            continue
+        payload = {
+            "external_provider": "sportmonks",
+            "external_match_id": _coerce_str(match.get("external_match_id")),
+            "league": _coerce_str(match.get("league")),
+            "season": _coerce_str(match.get("season")),
+            "match_date": match.get("match_date"),
+            "team_home": _coerce_str(match.get("team_home")),
+            "team_away": _coerce_str(match.get("team_away")),
+            "matchday_number": match.get("matchday_number"),
+            "matchday_name": match.get("matchday_name"),
+            "matchday_name_en": match.get("matchday_name_en"),
+            "status": match.get("status"),
+            "provider_league_id": match.get("provider_league_id"),
+            "provider_season_id": match.get("provider_season_id"),
+            "provider_stage_id": match.get("provider_stage_id"),
+            "provider_round_id": match.get("provider_round_id"),
+        }
+        if any(payload.get(k) is None for k in REQUIRED_COLUMNS):
+            skipped += 1
+            continue
+        payloads.append(payload)
 
-            row = conn.execute(sql, payload).mappings().first()
-            if row and row.get("inserted"):
-                inserted += 1
-            else:
-                updated += 1
+    with engine.begin() as conn:
+        counts = _bulk_upsert_matches(conn, payloads)
 
     return {
         "processed": len(matches),
-        "inserted": inserted,
-        "updated": updated,
+        "inserted": counts["inserted"],
+        "updated": counts["updated"],
         "skipped": skipped,
     }
 
@@ -185,16 +186,7 @@ def upsert_match_from_sportmonks_fixture(fixture: Dict[str, Any]) -> Optional[Di
         return None
 
     with engine.begin() as conn:
-        columns = _available_columns(conn)
-        missing = REQUIRED_COLUMNS - columns
-        if missing:
-            missing_list = ", ".join(sorted(missing))
-            raise RuntimeError(
-                f"Missing required columns in referee_ratings.matches: {missing_list}"
-            )
-
-        columns = [col for col in columns if col in REQUIRED_COLUMNS | OPTIONAL_COLUMNS]
-        sql = text(_build_upsert_sql(columns))
+        columns = _upsert_columns(conn)
         payload = {
             "external_provider": "sportmonks",
             "external_match_id": _coerce_str(match.get("external_match_id")),
@@ -212,7 +204,7 @@ def upsert_match_from_sportmonks_fixture(fixture: Dict[str, Any]) -> Optional[Di
         if any(payload.get(k) is None for k in REQUIRED_COLUMNS):
             raise RuntimeError("Missing required fields for SportMonks match upsert")
 
-        conn.execute(sql, payload)
+        conn.execute(_compiled_upsert(tuple(sorted(payload))), payload)
         row = conn.execute(
             text("""
                 select match_id, external_match_id, last_event_id
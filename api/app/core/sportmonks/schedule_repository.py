@@ -7,6 +7,25 @@ from typing import Any, Dict, Iterable, List, Optional, Sequence
 from sqlalchemy import text
 
 from app.db import engine
+from app.core.bulk import bulk_upsert
+from app.core.etag import ALL, MATCHES, bump_version
+from app.core.pagination import Cursor, keyset_clause
+from app.core.sportmonks.raw_archive import pack_payload
+
+
+SCHEDULE_FIXTURE_COLUMNS = (
+    "fixture_id",
+    "starts_at",
+    "home_id",
+    "away_id",
+    "league_id",
+    "season_id",
+    "status",
+    "venue_id",
+    "score_home",
+    "score_away",
+    "updated_at",
+)
 
 
 def _parse_datetime(value: Any) -> Optional[datetime]:
@@ -108,18 +127,19 @@ def insert_schedule_raw(
     request_params: Optional[Dict[str, Any]],
     fetched_at: Optional[datetime] = None,
 ) -> int:
+    """payload sind idealerweise die Originalbytes der Response (siehe raw_archive)."""
     fetched_at = fetched_at or datetime.now(timezone.utc)
     sql = text("""
         insert into referee_ratings.sportmonks_schedule_raw
-          (fetched_at, request_params, payload)
+          (fetched_at, request_params, payload_gz, payload_sha256, payload_bytes)
         values
-          (:fetched_at, CAST(:request_params AS jsonb), CAST(:payload AS jsonb))
+          (:fetched_at, CAST(:request_params AS jsonb), :payload_gz, :payload_sha256, :payload_bytes)
         returning id
     """)
     params = {
         "fetched_at": fetched_at,
         "request_params": json.dumps(request_params or {}),
-        "payload": json.dumps(payload),
+        **pack_payload(payload),
     }
     with engine.begin() as conn:
         row = conn.execute(sql, params).first()
@@ -135,78 +155,43 @@ def upsert_schedule_fixtures(
     if not fixtures:
         return {"processed": 0, "inserted": 0, "updated": 0}
 
-    sql = text("""
-        insert into referee_ratings.sportmonks_schedule_fixture (
-            fixture_id,
-            starts_at,
-            home_id,
-            away_id,
-            league_id,
-            season_id,
-            status,
-            venue_id,
-            score_home,
-            score_away,
-            updated_at
-        ) values (
-            :fixture_id,
-            :starts_at,
-            :home_id,
-            :away_id,
-            :league_id,
-            :season_id,
-            :status,
-            :venue_id,
-            :score_home,
-            :score_away,
-            :updated_at
-        )
-        on conflict (fixture_id) do update set
-            starts_at = excluded.starts_at,
-            home_id = excluded.home_id,
-            away_id = excluded.away_id,
-            league_id = excluded.league_id,
-            season_id = excluded.season_id,
-            status = excluded.status,
-            venue_id = excluded.venue_id,
-            score_home = excluded.score_home,
-            score_away = excluded.score_away,
-            updated_at = excluded.updated_at
-        returning (xmax = 0) as inserted
-    """)
+    rows = []
+    for fixture in fixtures:
+        fixture_id = _get_int(fixture.get("id"))
+        if fixture_id is None:
+            continue
+        home_id, away_id = _extract_team_ids(fixture)
+        venue_id = _get_int(fixture.get("venue_id"))
+        if venue_id is None and isinstance(fixture.get("venue"), dict):
+            venue_id = _get_int(fixture["venue"].get("id"))
+
+        rows.append({
+            "fixture_id": fixture_id,
+            "starts_at": _extract_starts_at(fixture),
+            "home_id": home_id,
+            "away_id": away_id,
+            "league_id": _get_int(fixture.get("league_id")),
+            "season_id": _get_int(fixture.get("season_id")),
+            "status": _extract_status(fixture),
+            "venue_id": venue_id,
+            "score_home": None,
+            "score_away": None,
+            "updated_at": fetched_at,
+        })
 
-    inserted = 0
-    updated = 0
     with engine.begin() as conn:
-        for fixture in fixtures:
-            fixture_id = _get_int(fixture.get("id"))
-            if fixture_id is None:
-                continue
-            home_id, away_id = _extract_team_ids(fixture)
-            venue_id = _get_int(fixture.get("venue_id"))
-            if venue_id is None and isinstance(fixture.get("venue"), dict):
-                venue_id = _get_int(fixture["venue"].get("id"))
-
-            payload_row = {
-                "fixture_id": fixture_id,
-                "starts_at": _extract_starts_at(fixture),
-                "home_id": home_id,
-                "away_id": away_id,
-                "league_id": _get_int(fixture.get("league_id")),
-                "season_id": _get_int(fixture.get("season_id")),
-                "status": _extract_status(fixture),
-                "venue_id": venue_id,
-                "score_home": None,
-                "score_away": None,
-                "updated_at": fetched_at,
-            }
-            row = conn.execute(sql, payload_row).mappings().first()
-            if row and row.get("inserted"):
-                inserted += 1
-            else:
-                updated += 1
-
-    return {"processed": len(fixtures), "inserted": inserted, "updated": updated}
+        counts = bulk_upsert(
+            conn,
+            "referee_ratings.sportmonks_schedule_fixture",
+            SCHEDULE_FIXTURE_COLUMNS,
+            rows,
+            conflict=("fixture_id",),
+        )
+        if rows:
+            # /matches liest im SportMonks-Modus aus sportmonks_schedule_fixture
+            bump_version(conn, MATCHES, ALL)
+
+    return {"processed": len(fixtures), **counts}
 
 
 def list_schedule_fixtures(
@@ -214,9 +199,14 @@ def list_schedule_fixtures(
     offset: int,
     league_ids: Optional[Sequence[int]] = None,
     season_ids: Optional[Sequence[int]] = None,
+    cursor: Optional[Cursor] = None,
 ) -> List[Dict[str, Any]]:
     clauses = []
     params: Dict[str, Any] = {"limit": limit, "offset": offset}
+    keyset, keyset_params = keyset_clause(cursor, "starts_at", "fixture_id", id_type="bigint", nullable=True)
+    if keyset:
+        clauses.append(keyset)
+        params.update(keyset_params, offset=0)
     if league_ids:
         clauses.append("league_id = any(:league_ids)")
         params["league_ids"] = list(league_ids)
@@ -236,7 +226,7 @@ def list_schedule_fixtures(
     """
     if clauses:
         sql += " where " + " and ".join(clauses)
-    sql += " order by starts_at desc nulls last limit :limit offset :offset"
+    sql += " order by starts_at desc nulls last, fixture_id desc limit :limit offset :offset"
 
     with engine.connect() as conn:
         rows = conn.execute(text(sql), params).mappings().all()
@@ -1,26 +1,35 @@
 from __future__ import annotations
 
+import json
 import logging
+import os
 from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 from app.core import settings
+from app.core.jobs import INPLAY_POLL, JobLease, JobRun, job_run, schedule_sync_job
 from app.core.sportmonks.client import SportMonksClient
 from app.core.sportmonks.mapper import map_fixture_to_match
-from app.core.sportmonks.league_mapping import get_league_mapping
+from app.core.sportmonks.profiles import INPLAY_PROFILE, SCHEDULE_PROFILE
+from app.core.sportmonks.league_mapping import get_league_mapping, is_tracked_league
 from app.core.sportmonks.repository import upsert_matches, upsert_schedule_matches
 from app.core.sportmonks.schedule_repository import (
     insert_schedule_raw,
     upsert_schedule_fixtures,
 )
 from app.core.sportmonks.inplay_repository import (
+    build_inplay_state_rows,
     insert_inplay_raw,
-    upsert_inplay_state,
+    write_inplay_state_rows,
 )
-from app.core.sportmonks import get_sportmonks_api_token
+from app.core.sportmonks.fingerprints import inplay_fingerprints
+from app.core.sportmonks import get_sportmonks_client
 
 logger = logging.getLogger("uvicorn.error")
 
+# Spielplan-Seiten kurz auf Platte cachen (Wiederholungslaeufe, mehrere Ligen/Hosts); 0 = aus
+SCHEDULE_CACHE_TTL_SECONDS = float(os.getenv("SPORTMONKS_SCHEDULE_CACHE_TTL_SECONDS", "900"))
+
 
 def _extract_fixtures(payload: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
     data = payload.get("data")
@@ -115,89 +124,146 @@ def sync_team_schedule(team_id: int) -> int:
     if not settings.SPORTMONKS_ENABLED:
         raise RuntimeError("SPORTMONKS_ENABLED is false")
 
-    client = SportMonksClient(get_sportmonks_api_token())
-    try:
-        payload = client.get_team_schedule(team_id)
-        fixtures = _extract_fixtures(payload)
-        mapped = []
-        for item in fixtures:
-            match = map_fixture_to_match(item)
-            if match is None:
-                fixture_id = item.get("id") if isinstance(item, dict) else None
-                logger.warning(
-                    "Skipping SportMonks fixture without required fields (fixture_id=%s)",
-                    fixture_id,
-                )
-                continue
-            mapped.append(match)
-        return upsert_matches(mapped)
-    finally:
-        client.close()
+    payload = get_sportmonks_client().get_team_schedule(team_id)
+    fixtures = _extract_fixtures(payload)
+    mapped = []
+    for item in fixtures:
+        match = map_fixture_to_match(item)
+        if match is None:
+            fixture_id = item.get("id") if isinstance(item, dict) else None
+            logger.warning(
+                "Skipping SportMonks fixture without required fields (fixture_id=%s)",
+                fixture_id,
+            )
+            continue
+        mapped.append(match)
+    return upsert_matches(mapped)
 
 
 def sync_league_schedule(league_code: str, season_key: str) -> Dict[str, int]:
     if not settings.SPORTMONKS_ENABLED:
         raise RuntimeError("SPORTMONKS_ENABLED is false")
+    # ein Lauf pro Liga/Saison gleichzeitig (Cron-Ueberlappung, mehrere Hosts)
+    with job_run(schedule_sync_job(league_code, season_key)) as run:
+        run.result = _sync_league_schedule(league_code, season_key, run)
+        return run.result
+
 
+def _sync_league_schedule(league_code: str, season_key: str, run: Optional[JobRun] = None) -> Dict[str, int]:
     mapping = get_league_mapping(league_code, season_key)
-    client = SportMonksClient(get_sportmonks_api_token())
-    try:
-        fetched_at = datetime.now(timezone.utc)
-        payload = client.get_league_schedule(
-            mapping.provider_league_id,
-            mapping.provider_season_id,
-            include="participants",
-        )
-        request_params = {
-            "league_id": mapping.provider_league_id,
-            "season_id": mapping.provider_season_id,
-            "include": "participants",
-        }
-        insert_schedule_raw(payload, request_params, fetched_at=fetched_at)
-        result = upsert_schedule_fixtures(payload, fetched_at=fetched_at)
-        logger.info(
-            "sportmonks schedule fetched league=%s season=%s fixtures=%s fetched_at=%s",
-            league_code,
-            season_key,
-            result.get("processed"),
-            fetched_at.isoformat(),
-        )
-        return result
-    finally:
-        client.close()
-
-
-def poll_inplay_and_persist() -> int:
+    fetched_at = datetime.now(timezone.utc)
+    request_params = {
+        "league_id": mapping.provider_league_id,
+        "season_id": mapping.provider_season_id,
+        "profile": SCHEDULE_PROFILE.name,
+        **SCHEDULE_PROFILE.params(),
+    }
+    result = {"processed": 0, "inserted": 0, "updated": 0}
+    pages = 0
+    # Seiten kommen parallel geladen an; jede wird archiviert und sofort geschrieben
+    for page in get_sportmonks_client().iter_league_schedule_pages(
+        mapping.provider_league_id,
+        mapping.provider_season_id,
+        cache_ttl=SCHEDULE_CACHE_TTL_SECONDS,
+        **SCHEDULE_PROFILE.params(),
+    ):
+        # Lock verloren -> ein anderer Lauf kann schon schreiben; keine weitere Seite
+        if run is not None:
+            run.check()
+        if not page.cached:
+            # Cache-Treffer sind bereits archiviert
+            insert_schedule_raw(page.raw, {**request_params, "page": page.number}, fetched_at=fetched_at)
+        counts = upsert_schedule_fixtures(page.payload, fetched_at=fetched_at)
+        for key in result:
+            result[key] += counts.get(key, 0)
+        pages += 1
+    logger.info(
+        "sportmonks schedule fetched league=%s season=%s fixtures=%s pages=%s fetched_at=%s",
+        league_code,
+        season_key,
+        result.get("processed"),
+        pages,
+        fetched_at.isoformat(),
+    )
+    return result
+
+
+def poll_inplay_and_persist(
+    client: Optional[SportMonksClient] = None,
+    lease: Optional[JobLease] = None,
+) -> Dict[str, int]:
+    """
+    Ein Inplay-Poll. lease: vom Aufrufer dauerhaft gehaltener INPLAY_POLL-Lease (Worker);
+    dann kein eigener Lock/job_runs-Eintrag pro Poll.
+    """
     if not settings.SPORTMONKS_ENABLED:
         raise RuntimeError("SPORTMONKS_ENABLED is false")
+    if lease is not None:
+        if lease.job_key != INPLAY_POLL:
+            raise ValueError(f"lease {lease.job_key} does not cover {INPLAY_POLL}")
+        lease.check()
+        return _poll_inplay_and_persist(client, lease.check)
+    # JobAlreadyRunning, wenn gerade ein anderer Prozess/Host pollt
+    with job_run(INPLAY_POLL) as run:
+        run.result = _poll_inplay_and_persist(client, run.check)
+        return run.result
 
-    client = SportMonksClient(get_sportmonks_api_token())
-    try:
-        fetched_at = datetime.now(timezone.utc)
-        include = "participants;scores;periods;events;league.country;round"
-        payload = client.get_livescores_inplay(include=include)
-        insert_inplay_raw(
-            payload,
-            {"include": include},
-            fetched_at=fetched_at,
-        )
-        state_result = upsert_inplay_state(payload, fetched_at=fetched_at)
-        fixtures = _extract_fixtures(payload)
-        mapped = []
-        for item in fixtures:
-            match = map_fixture_to_match(item)
-            if match is None:
-                continue
-            mapped.append(match)
-
-        # vorerst nur Matches upserten (Events spter)
+
+def _poll_inplay_and_persist(
+    client: Optional[SportMonksClient] = None,
+    check_lease: Optional[Callable[[], None]] = None,
+) -> Dict[str, int]:
+    # Worker/Tests koennen einen eigenen Client uebergeben, sonst der geteilte Prozess-Client
+    client = client or get_sportmonks_client()
+    fetched_at = datetime.now(timezone.utc)
+    # nur die Felder, die Zustand/Matches brauchen (profiles.py)
+    raw = client.get_livescores_inplay_raw(**INPLAY_PROFILE.params())
+    insert_inplay_raw(
+        raw,
+        {"profile": INPLAY_PROFILE.name, **INPLAY_PROFILE.params()},
+        fetched_at=fetched_at,
+    )
+    # Einmal parsen, nur fuer die Normalisierung; Rohbytes sind archiviert
+    payload = json.loads(raw)
+    del raw
+    # Nur Fixtures schreiben, deren normalisierter Zustand sich geaendert hat
+    rows = build_inplay_state_rows(payload, fetched_at=fetched_at)
+    changed, unchanged = inplay_fingerprints.split(rows)
+    # zwischen den Schreibschritten: nach Lock-Verlust nichts mehr schreiben
+    if check_lease is not None:
+        check_lease()
+    write_inplay_state_rows(changed)
+    changed_ids = {str(row["fixture_id"]) for row in changed}
+
+    fixtures = _extract_fixtures(payload)
+    mapped = []
+    for item in fixtures:
+        match = map_fixture_to_match(item)
+        if match is None:
+            continue
+        if str(match.get("external_match_id")) not in changed_ids:
+            continue
+        mapped.append(match)
+
+    # vorerst nur Matches upserten (Events spter)
+    if check_lease is not None:
+        check_lease()
+    if mapped:
         upsert_matches(mapped)
-        logger.info(
-            "sportmonks inplay fetched fixtures=%s stored=%s fetched_at=%s",
-            len(mapped),
-            state_result.get("processed"),
-            fetched_at.isoformat(),
-        )
-        return len(mapped)
-    finally:
-        client.close()
+    inplay_fingerprints.remember(changed)
+    logger.info(
+        "sportmonks inplay fetched fixtures=%s changed=%s unchanged=%s matches=%s fetched_at=%s",
+        len(rows),
+        len(changed),
+        unchanged,
+        len(mapped),
+        fetched_at.isoformat(),
+    )
+    return {
+        "fixtures": len(rows),
+        # nur Spiele unserer Ligen halten den Worker im Live-Modus
+        "tracked": sum(1 for row in rows if is_tracked_league(row["league_id"])),
+        "changed": len(changed),
+        "unchanged": unchanged,
+        "matches_upserted": len(mapped),
+    }
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+from app.db import engine
+from app.core.jobs import INPLAY_POLL, JobLease, JobLeaseLost
+from app.core.sportmonks import get_sportmonks_client
+from app.core.sportmonks.client import SportMonksClient
+from app.core.sportmonks.service import poll_inplay_and_persist
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# Langlaufender Inplay-Poller (ersetzt den Cron-Aufruf von poll-inplay).
+# Live-Fenster kommen aus sportmonks_schedule_fixture.starts_at: waehrend eines
+# Fensters wird schnell gepollt, sonst bis kurz vor den naechsten Anstoss geschlafen.
+
+LIVE_INTERVAL_SECONDS = float(os.getenv("WORKER_LIVE_INTERVAL_SECONDS", "15"))
+IDLE_MAX_SLEEP_SECONDS = float(os.getenv("WORKER_IDLE_MAX_SLEEP_SECONDS", "1800"))
+ERROR_BACKOFF_SECONDS = float(os.getenv("WORKER_ERROR_BACKOFF_SECONDS", "60"))
+# Mehrere Hosts: nur der Inhaber des Leader-Locks pollt, die anderen warten so lange
+STANDBY_RETRY_SECONDS = float(os.getenv("WORKER_STANDBY_RETRY_SECONDS", "30"))
+# Fenster um den Anstoss: etwas vorher beginnen, nachher Verlaengerung/Nachspielzeit abdecken
+WINDOW_LEAD = timedelta(minutes=int(os.getenv("WORKER_WINDOW_LEAD_MINUTES", "5")))
+WINDOW_TAIL = timedelta(minutes=int(os.getenv("WORKER_WINDOW_TAIL_MINUTES", "150")))
+
+_WINDOWS_SQL = text("""
+    select
+      count(*) filter (
+        where starts_at <= :now + cast(:lead as interval)
+          and starts_at >= :now - cast(:tail as interval)
+      ) as live_fixtures,
+      min(starts_at) filter (where starts_at > :now) as next_kickoff
+    from referee_ratings.sportmonks_schedule_fixture
+    where starts_at >= :now - cast(:tail as interval)
+""")
+
+_STATUS_SQL = text("""
+    insert into referee_ratings.ingest_worker_status (
+        worker, host, mode, live_fixtures, next_kickoff, next_poll_at,
+        last_poll_at, last_success_at, last_latency_ms, last_fixtures, last_changed,
+        last_error, updated_at
+    ) values (
+        :worker, :host, :mode, :live_fixtures, :next_kickoff, :next_poll_at,
+        :last_poll_at, :last_success_at, :last_latency_ms, :last_fixtures, :last_changed,
+        :last_error, now()
+    )
+    on conflict (worker) do update set
+        host = excluded.host,
+        mode = excluded.mode,
+        live_fixtures = excluded.live_fixtures,
+        next_kickoff = excluded.next_kickoff,
+        next_poll_at = excluded.next_poll_at,
+        last_poll_at = excluded.last_poll_at,
+        last_success_at = excluded.last_success_at,
+        last_latency_ms = excluded.last_latency_ms,
+        last_fixtures = excluded.last_fixtures,
+        last_changed = excluded.last_changed,
+        last_error = excluded.last_error,
+        updated_at = now()
+""")
+
+
+@dataclass
+class PollPlan:
+    mode: str  # "live" | "idle"
+    delay_seconds: float
+
+
+def plan_next_poll(
+    now: datetime,
+    live_fixtures: int,
+    next_kickoff: Optional[datetime],
+    last_tracked: int = 0,
+    live_interval: float = LIVE_INTERVAL_SECONDS,
+    idle_max_sleep: float = IDLE_MAX_SLEEP_SECONDS,
+) -> PollPlan:
+    # Solange der letzte Poll noch Live-Spiele unserer Ligen geliefert hat, weiter schnell
+    # pollen (auch wenn das Fenster laut Spielplan schon vorbei ist). Fremde Ligen zaehlen nicht.
+    if live_fixtures > 0 or last_tracked > 0:
+        return PollPlan("live", live_interval)
+    if next_kickoff is None:
+        return PollPlan("idle", idle_max_sleep)
+    wake = (next_kickoff - WINDOW_LEAD - now).total_seconds()
+    # Spielplan kann sich aendern -> spaetestens nach idle_max_sleep neu lesen
+    return PollPlan("idle", min(max(wake, live_interval), idle_max_sleep))
+
+
+def read_live_windows(now: datetime) -> Dict[str, Any]:
+    with engine.connect() as conn:
+        row = conn.execute(_WINDOWS_SQL, {
+            "now": now,
+            "lead": f"{int(WINDOW_LEAD.total_seconds())} seconds",
+            "tail": f"{int(WINDOW_TAIL.total_seconds())} seconds",
+        }).mappings().first()
+    return {
+        "live_fixtures": int(row["live_fixtures"] or 0) if row else 0,
+        "next_kickoff": row["next_kickoff"] if row else None,
+    }
+
+
+def get_worker_status() -> list:
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            select
+              *,
+              extract(epoch from (now() - last_success_at))::float as lag_seconds
+            from referee_ratings.ingest_worker_status
+            order by worker
+        """)).mappings().all()
+    return [dict(row) for row in rows]
+
+
+class InplayWorker:
+    def __init__(self, name: str = "inplay", client: Optional[SportMonksClient] = None) -> None:
+        self.name = name
+        self.host = socket.gethostname()
+        # geteilter Prozess-Client (= ein Connection-Pool) fuer die ganze Laufzeit
+        self.client = client or get_sportmonks_client()
+        self._stop = threading.Event()
+        # Leader-Wahl per Advisory-Lock (app/core/jobs.py) auf den Inplay-Poll selbst: der Leader
+        # haelt ihn fuer die ganze Laufzeit (ein job_runs-Eintrag, ein Heartbeat-Thread), manuelle
+        # poll-inplay-Laeufe bekommen solange JobAlreadyRunning
+        self.lease = JobLease(INPLAY_POLL)
+        # Live-Fixtures aus getrackten Ligen im letzten Poll (last_fixtures zaehlt alle)
+        self.last_tracked = 0
+        self.status: Dict[str, Any] = {
+            "worker": name,
+            "host": self.host,
+            "mode": "starting",
+            "live_fixtures": 0,
+            "next_kickoff": None,
+            "next_poll_at": None,
+            "last_poll_at": None,
+            "last_success_at": None,
+            "last_latency_ms": None,
+            "last_fixtures": 0,
+            "last_changed": None,
+            "last_error": None,
+        }
+
+    def stop(self, *_args: Any) -> None:
+        self._stop.set()
+
+    def _write_status(self) -> None:
+        try:
+            with engine.begin() as conn:
+                conn.execute(_STATUS_SQL, self.status)
+        except Exception:
+            logger.exception("ingest worker status write failed worker=%s", self.name)
+
+    def poll_once(self) -> Dict[str, int]:
+        started = time.monotonic()
+        self.status["last_poll_at"] = datetime.now(timezone.utc)
+        try:
+            result = poll_inplay_and_persist(client=self.client, lease=self.lease)
+        except Exception as exc:
+            self.status["last_error"] = str(exc)[:500]
+            raise
+        self.status["last_latency_ms"] = int((time.monotonic() - started) * 1000)
+        self.status["last_success_at"] = datetime.now(timezone.utc)
+        self.status["last_fixtures"] = result["fixtures"]
+        self.last_tracked = result.get("tracked", 0)
+        self.status["last_changed"] = result["changed"]
+        self.status["last_error"] = None
+        return result
+
+    def step(self) -> float:
+        """Ein Durchlauf: ggf. pollen, Status schreiben, Wartezeit bis zum naechsten Lauf liefern."""
+        now = datetime.now(timezone.utc)
+        windows = read_live_windows(now)
+        plan = plan_next_poll(now, windows["live_fixtures"], windows["next_kickoff"], self.last_tracked)
+        if plan.mode == "live":
+            try:
+                self.poll_once()
+            except JobLeaseLost:
+                # Leader-Lock weg; _lead() raeumt im naechsten Durchlauf auf
+                logger.warning("ingest worker poll aborted, lease lost worker=%s", self.name)
+            except Exception:
+                logger.exception("ingest worker poll failed worker=%s", self.name)
+                plan = PollPlan("live", max(plan.delay_seconds, ERROR_BACKOFF_SECONDS))
+            else:
+                # Mit dem frischen Ergebnis neu planen (letzte Spiele koennen gerade geendet haben)
+                plan = plan_next_poll(
+                    now, windows["live_fixtures"], windows["next_kickoff"], self.last_tracked
+                )
+        delay = plan.delay_seconds
+        self.status.update({
+            "mode": plan.mode,
+            "live_fixtures": windows["live_fixtures"],
+            "next_kickoff": windows["next_kickoff"],
+            "next_poll_at": datetime.now(timezone.utc) + timedelta(seconds=delay),
+        })
+        if self.lease.held:
+            self._write_status()
+        return delay
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info("ingest worker started worker=%s host=%s", self.name, self.host)
+        try:
+            while not self._stop.is_set():
+                if not self._lead():
+                    self._stop.wait(STANDBY_RETRY_SECONDS)
+                    continue
+                try:
+                    delay = self.step()
+                except Exception:
+                    logger.exception("ingest worker step failed worker=%s", self.name)
+                    delay = ERROR_BACKOFF_SECONDS
+                logger.info(
+                    "ingest worker mode=%s live_fixtures=%s latency_ms=%s sleep=%.0fs",
+                    self.status["mode"],
+                    self.status["live_fixtures"],
+                    self.status["last_latency_ms"],
+                    delay,
+                )
+                self._stop.wait(delay)
+        finally:
+            if self.lease.held:
+                # Status-Zeile gehoert dem Leader; Standby-Hosts ueberschreiben sie nicht
+                self.status["mode"] = "stopped"
+                self.status["next_poll_at"] = None
+                self._write_status()
+            self.lease.release(result={"last_success_at": self.status["last_success_at"]})
+            logger.info("ingest worker stopped worker=%s", self.name)
+
+    def _lead(self) -> bool:
+        """Leader-Lock halten bzw. holen; False = anderer Host ist Leader (Standby)."""
+        if self.lease.held:
+            return True
+        if self.lease.lost:
+            self.lease.release("lost")
+            logger.warning("ingest worker lost leadership worker=%s", self.name)
+        try:
+            acquired = self.lease.acquire()
+        except Exception:
+            logger.exception("ingest worker leader lock failed worker=%s", self.name)
+            return False
+        if acquired:
+            logger.info("ingest worker is leader worker=%s host=%s", self.name, self.host)
+        else:
+            logger.info("ingest worker standby, leader elsewhere worker=%s host=%s", self.name, self.host)
+        return acquired
@@ -1,9 +1,8 @@
 from fastapi import Header, HTTPException
-from sqlalchemy import text
 from uuid import UUID
 
 from app.core.security import decode_token
-from app.db import engine
+from app.core.user_cache import get_user_status
 
 def require_user(authorization: str = Header(default="")) -> str:
     """
@@ -32,12 +31,7 @@ def require_user(authorization: str = Header(default="")) -> str:
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    with engine.begin() as conn:
-        row = conn.execute(
-            text("SELECT user_id, is_active FROM mv_users WHERE user_id = :uid"),
-            {"uid": str(uid)},
-        ).mappings().first()
-
+    row = get_user_status(str(uid))
     if not row:
         raise HTTPException(status_code=401, detail="User not found")
     if not row.get("is_active", False):
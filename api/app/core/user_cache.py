@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+from app.core import invalidation
+from app.core.cache import TTLCache
+from app.core.invalidation import invalidation_bus
+from app.db import engine
+
+
+# Status der eingeloggten User (aktiv/admin/verifiziert), damit require_user nicht
+# bei jedem Request mv_users liest. Schreiber auf diese Spalten rufen
+# invalidate_user_status(); andere Worker erfahren es ueber den Cache-Bus
+# (app/core/invalidation.py), ohne Bus begrenzt die TTL die Verzoegerung.
+user_status_cache = TTLCache(
+    "user_status",
+    maxsize=int(os.getenv("USER_STATUS_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("USER_STATUS_CACHE_TTL_SECONDS", "30")),
+)
+
+_USER_STATUS_SQL = text("""
+    SELECT is_active, is_admin, email_verified
+    FROM mv_users
+    WHERE user_id = :uid
+""")
+
+
+def get_user_status(user_id: str) -> Optional[Dict[str, Any]]:
+    """Liefert {is_active, is_admin, email_verified} oder None, wenn der User fehlt."""
+    key = str(user_id)
+    cached = user_status_cache.get(key)
+    if cached is not None:
+        return cached
+    with engine.connect() as conn:
+        row = conn.execute(_USER_STATUS_SQL, {"uid": key}).mappings().first()
+    if not row:
+        # Unbekannte User nicht cachen, sonst greift ein spaeteres Anlegen erst nach TTL
+        return None
+    status = {
+        "is_active": bool(row.get("is_active")),
+        "is_admin": row.get("is_admin") is True,
+        "email_verified": bool(row.get("email_verified")),
+    }
+    user_status_cache.set(key, status)
+    return status
+
+
+def _evict_user_status(user_id: Optional[str]) -> None:
+    if user_id is None:
+        user_status_cache.clear()
+        return
+    user_status_cache.pop(str(user_id))
+
+
+def invalidate_user_status(user_id: Optional[str] = None) -> None:
+    _evict_user_status(user_id)
+    invalidation_bus.broadcast(invalidation.USER_STATUS, user_id)
+
+
+invalidation.register(invalidation.USER_STATUS, _evict_user_status)
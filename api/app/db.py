@@ -159,14 +159,35 @@ def init_db():
             "ON referee_ratings.sportmonks_schedule_fixture(away_id);"
         ))
 
+        # Neu-Installationen: direkt nach Tagen partitioniert (Bestand: Migration
+        # 20261017_sportmonks_inplay_raw_partitioned.sql)
         conn.execute(text("""
         CREATE TABLE IF NOT EXISTS referee_ratings.sportmonks_inplay_raw (
-            id BIGSERIAL PRIMARY KEY,
+            id BIGSERIAL,
             fetched_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            last_seen_at TIMESTAMPTZ NULL,
+            seen_count INTEGER NOT NULL DEFAULT 1,
             fixture_id BIGINT NULL,
             request_params JSONB NOT NULL DEFAULT '{}'::jsonb,
-            payload JSONB NOT NULL
-        );
+            payload JSONB NULL,
+            payload_gz BYTEA NULL,
+            payload_sha256 TEXT NULL,
+            content_sha256 TEXT NULL,
+            payload_bytes INTEGER NULL,
+            PRIMARY KEY (id, fetched_at)
+        ) PARTITION BY RANGE (fetched_at);
+        """))
+        conn.execute(text("""
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM pg_partitioned_table
+                WHERE partrelid = 'referee_ratings.sportmonks_inplay_raw'::regclass
+            ) THEN
+                CREATE TABLE IF NOT EXISTS referee_ratings.sportmonks_inplay_raw_default
+                    PARTITION OF referee_ratings.sportmonks_inplay_raw DEFAULT;
+            END IF;
+        END $$;
         """))
 
         conn.execute(text("""
@@ -190,3 +211,106 @@ def init_db():
             "CREATE INDEX IF NOT EXISTS ix_sm_inplay_state_updated_at "
             "ON referee_ratings.sportmonks_inplay_state(updated_at);"
         ))
+
+        # Rohpayloads als gzip-Bytes (siehe app/core/sportmonks/raw_archive.py)
+        for raw_table in ("sportmonks_schedule_raw", "sportmonks_inplay_raw"):
+            conn.execute(text(f"""
+            ALTER TABLE referee_ratings.{raw_table}
+                ADD COLUMN IF NOT EXISTS payload_gz BYTEA NULL,
+                ADD COLUMN IF NOT EXISTS payload_sha256 TEXT NULL,
+                ADD COLUMN IF NOT EXISTS payload_bytes INTEGER NULL,
+                ALTER COLUMN payload DROP NOT NULL;
+            """))
+
+        conn.execute(text("""
+        ALTER TABLE referee_ratings.sportmonks_inplay_raw
+            ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMPTZ NULL,
+            ADD COLUMN IF NOT EXISTS seen_count INTEGER NOT NULL DEFAULT 1,
+            ADD COLUMN IF NOT EXISTS content_sha256 TEXT NULL;
+        """))
+
+        conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS referee_ratings.sportmonks_inplay_raw_summary (
+            stream TEXT PRIMARY KEY,
+            last_fetched_at TIMESTAMPTZ NULL,
+            last_raw_id BIGINT NULL,
+            last_raw_fetched_at TIMESTAMPTZ NULL,
+            last_content_sha256 TEXT NULL,
+            total_polls BIGINT NOT NULL DEFAULT 0,
+            stored_payloads BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        """))
+
+        conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS referee_ratings.sportmonks_inplay_raw_daily (
+            day DATE PRIMARY KEY,
+            polls BIGINT NOT NULL DEFAULT 0,
+            stored_payloads BIGINT NOT NULL DEFAULT 0,
+            payload_bytes BIGINT NOT NULL DEFAULT 0,
+            first_fetched_at TIMESTAMPTZ NULL,
+            last_seen_at TIMESTAMPTZ NULL
+        );
+        """))
+
+        conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS referee_ratings.ingest_worker_status (
+            worker TEXT PRIMARY KEY,
+            host TEXT NULL,
+            mode TEXT NOT NULL,
+            live_fixtures INTEGER NOT NULL DEFAULT 0,
+            next_kickoff TIMESTAMPTZ NULL,
+            next_poll_at TIMESTAMPTZ NULL,
+            last_poll_at TIMESTAMPTZ NULL,
+            last_success_at TIMESTAMPTZ NULL,
+            last_latency_ms INTEGER NULL,
+            last_fixtures INTEGER NOT NULL DEFAULT 0,
+            last_changed INTEGER NULL,
+            last_error TEXT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        """))
+
+        conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS referee_ratings.resource_versions (
+            resource TEXT NOT NULL,
+            resource_id TEXT NOT NULL,
+            version BIGINT NOT NULL DEFAULT 1,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (resource, resource_id)
+        );
+        """))
+
+        conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS referee_ratings.resource_snapshots (
+            resource TEXT NOT NULL,
+            resource_id TEXT NOT NULL,
+            content_sha256 TEXT NOT NULL,
+            body BYTEA NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (resource, resource_id)
+        );
+        """))
+        conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS resource_snapshots_content_sha256_idx
+            ON referee_ratings.resource_snapshots (content_sha256);
+        """))
+
+        conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS referee_ratings.job_runs (
+            run_id BIGSERIAL PRIMARY KEY,
+            job_key TEXT NOT NULL,
+            holder TEXT,
+            status TEXT NOT NULL,
+            started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            heartbeat_at TIMESTAMPTZ,
+            finished_at TIMESTAMPTZ,
+            duration_ms INTEGER,
+            result JSONB,
+            error TEXT
+        );
+        """))
+        conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS job_runs_job_key_started_at_idx
+            ON referee_ratings.job_runs (job_key, started_at DESC);
+        """))
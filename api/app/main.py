@@ -26,11 +26,17 @@ from app.api.v1.admin_matches import router as admin_matches_router
 from app.api.v1.admin_sportmonks import router as admin_sportmonks_router
 from app.api.v1.matches import router as matches_router
 from app.api.v1.me import router as me_router
+from app.api.v1.snapshots import router as snapshots_router
 from app.api.v1.admin_dev import router as admin_dev_router
 from app.core.application import app
 from app.core import settings
-from app.core.sportmonks import init_sportmonks_client
+from app.core.sportmonks import close_sportmonks_client, init_sportmonks_client
 from app.core.deps import require_openapi_dev_token
+from app.core.invalidation import invalidation_bus
+from app.core.rating_queue import rating_queue
+from app.core.rating_users import ensure_rating_user
+from app.core.schema import schema_registry
+from app.core.user_cache import invalidate_user_status
 
 
 @app.on_event("startup")
@@ -38,8 +44,23 @@ def on_startup():
     settings.validate_settings()
     if callable(init_db):
         init_db()
+        # init_db zieht ggf. Spalten nach, daher erst danach introspektieren
+        schema_registry.refresh()
     if settings.SPORTMONKS_ENABLED:
         init_sportmonks_client()
+    if settings.CACHE_BUS_ENABLED:
+        invalidation_bus.start()
+    if settings.RATING_QUEUE_ENABLED:
+        rating_queue.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # angenommene, noch nicht geschriebene Bewertungen wegschreiben
+    rating_queue.stop()
+    # nach der Queue: deren letzte Invalidierungen noch verschicken
+    invalidation_bus.stop()
+    close_sportmonks_client()
 
 
 @app.get("/db/ping")
@@ -89,6 +110,10 @@ def verify_link(token: str, request: Request):
                     email_verify_expires_at = NULL
                 WHERE user_id = :uid
             """), {"uid": str(row["user_id"])})
+            # Ab jetzt darf der User bewerten: Spiegel in referee_ratings.users anlegen
+            ensure_rating_user(conn, str(row["user_id"]))
+
+    invalidate_user_status(str(row["user_id"]))
 
     # Browser → HTML
     accept = (request.headers.get("accept") or "").lower()
@@ -144,6 +169,7 @@ app.include_router(matches_router)
 app.include_router(scenes_router)
 app.include_router(ratings_router)
 app.include_router(me_router)
+app.include_router(snapshots_router)
 app.include_router(admin_router)
 app.include_router(admin_scenes_router)
 app.include_router(admin_users_router)
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
 from uuid import UUID
 from datetime import datetime
-from typing import Literal, Optional
+from typing import List, Literal, Optional
 
 LeagueCode = Literal["BL1", "BL2"]
 
@@ -20,3 +20,28 @@ class MatchCreate(MatchBase):
 
 class MatchOut(MatchBase):
     match_id: UUID
+    # nur gesetzt bei GET /matches?include_vote_count=true
+    vote_count: Optional[int] = None
+
+class MatchSceneStatsOut(BaseModel):
+    scene_id: UUID
+    minute: Optional[int] = None
+    stoppage_time: Optional[int] = None
+    scene_type: str
+    rating_count: int
+    avg_decision: Optional[float] = None
+    avg_confidence: Optional[float] = None
+
+class MatchStatsOut(BaseModel):
+    match_id: UUID
+    rating_count: int
+    rated_scene_count: int
+    avg_decision: Optional[float] = None
+    avg_confidence: Optional[float] = None
+    decision_dist: dict
+    confidence_dist: dict
+    channel_dist: dict
+    time_type_dist: dict
+    rule_knowledge_dist: dict
+    scenes: List[MatchSceneStatsOut]
+    computed_at: datetime
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Literal
+from typing import Literal, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, Field
@@ -30,6 +30,35 @@ class RatingOut(BaseModel):
     rating_time_type: RatingTimeType
     fav_team: str | None
     created_at: datetime
+    # Queue-Modus: angenommen (202), aber noch nicht geschrieben
+    pending: bool = False
+
+
+# POST /ratings/batch (Offline-Replay der Mobile-Clients)
+RATING_BATCH_MAX = 50
+
+
+class RatingBatchItem(RatingCreate):
+    # vom Client erzeugt (z. B. UUID), eindeutig pro Nutzer
+    idempotency_key: str = Field(min_length=8, max_length=128)
+
+
+class RatingBatchIn(BaseModel):
+    items: list[RatingBatchItem] = Field(min_length=1, max_length=RATING_BATCH_MAX)
+
+
+class RatingBatchResultOut(BaseModel):
+    idempotency_key: str
+    scene_id: UUID
+    status: int
+    outcome: str
+    detail: Optional[str] = None
+    rating: Optional[RatingOut] = None
+    replayed: bool = False
+
+
+class RatingBatchOut(BaseModel):
+    results: list[RatingBatchResultOut]
 
 
 class SceneAggregateOut(BaseModel):
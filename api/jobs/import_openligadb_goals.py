@@ -13,6 +13,8 @@ if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
 from app.db import engine
+from app.core.etag import MATCH_SCENES, bump_version
+from app.core.jobs import JobAlreadyRunning, job_run
 
 BASE_URL = os.getenv("OPENLIGADB_BASE_URL", "https://api.openligadb.de").rstrip("/")
 LEAGUES = ("BL1", "BL2")
@@ -244,10 +246,11 @@ def insert_goal_scene(conn, match_id, goal, dry_run, description_column, include
         "created_by": IMPORT_CREATED_BY,
     }
     conn.execute(sql, params)
+    bump_version(conn, MATCH_SCENES, match_id)
     return "inserted"
 
 
-def import_goals(league, season, group, dry_run):
+def import_goals(league, season, group, dry_run, run=None):
     matches = fetch_matches(league, season, group)
     checked_matches = 0
     goals_found = 0
@@ -261,6 +264,9 @@ def import_goals(league, season, group, dry_run):
         include_legacy = column_exists(conn, "referee_ratings", "scenes", "description")
         description_column = "description" if include_legacy else "description_de"
         for item in matches:
+            # Lock verloren -> Abbruch, die Transaktion wird zurueckgerollt
+            if run is not None:
+                run.check()
             checked_matches += 1
             kickoff = parse_match_datetime(item)
             team_home = extract_team_name(get_field(item, "team1", "Team1"))
@@ -317,15 +323,20 @@ def main():
 
     try:
         leagues = parse_leagues(args.league) or list(LEAGUES)
-        for league in leagues:
-            log(f"Start import league={league} season={args.season} group={args.group} dry_run={args.dry_run}")
-            stats = import_goals(league, args.season, args.group, args.dry_run)
-            log(
-                f"[{league}] Done "
-                f"matches={stats['matches']} goals={stats['goals']} inserted={stats['inserted']} "
-                f"skipped_exists={stats['skipped_exists']} skipped_missing_id={stats['skipped_missing_id']} "
-                f"skipped_no_match={stats['skipped_no_match']} dry_run={stats['dry_run']}"
-            )
+        with job_run("openligadb:goals") as run:
+            run.result = {}
+            for league in leagues:
+                log(f"Start import league={league} season={args.season} group={args.group} dry_run={args.dry_run}")
+                stats = import_goals(league, args.season, args.group, args.dry_run, run=run)
+                run.result[league] = stats
+                log(
+                    f"[{league}] Done "
+                    f"matches={stats['matches']} goals={stats['goals']} inserted={stats['inserted']} "
+                    f"skipped_exists={stats['skipped_exists']} skipped_missing_id={stats['skipped_missing_id']} "
+                    f"skipped_no_match={stats['skipped_no_match']} dry_run={stats['dry_run']}"
+                )
+    except JobAlreadyRunning:
+        log("Skipped: openligadb:goals already running")
     except requests.RequestException as exc:
         log(f"ERROR OpenLigaDB request failed: {exc}")
         raise SystemExit(1)
@@ -10,6 +10,8 @@ if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
 from app.db import engine
+from app.core.etag import MATCH_SCENES, bump_version
+from app.core.snapshots import refresh_match_snapshot
 
 IMPORT_RELEASE_IMMEDIATELY = os.getenv("IMPORT_RELEASE_IMMEDIATELY", "true").lower() in ("1", "true", "yes", "y")
 IMPORT_LOG = os.getenv("IMPORT_LOG")
@@ -134,6 +136,9 @@ def main():
                 inserted += 1
                 continue
             insert_scene(conn, match_id, use_legacy)
+            bump_version(conn, MATCH_SCENES, match_id)
+            # neue offene Szene: eingefrorene Match-Statistik verwerfen
+            refresh_match_snapshot(conn, str(match_id))
             inserted += 1
 
     log(f"Done matches={total} inserted={inserted} skipped={skipped} dry_run={args.dry_run}")
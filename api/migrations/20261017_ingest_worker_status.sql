@@ -0,0 +1,17 @@
+-- Status of the long-running ingest worker (matchvote worker)
+
+CREATE TABLE IF NOT EXISTS referee_ratings.ingest_worker_status (
+    worker TEXT PRIMARY KEY,
+    host TEXT NULL,
+    mode TEXT NOT NULL,
+    live_fixtures INTEGER NOT NULL DEFAULT 0,
+    next_kickoff TIMESTAMPTZ NULL,
+    next_poll_at TIMESTAMPTZ NULL,
+    last_poll_at TIMESTAMPTZ NULL,
+    last_success_at TIMESTAMPTZ NULL,
+    last_latency_ms INTEGER NULL,
+    last_fixtures INTEGER NOT NULL DEFAULT 0,
+    last_changed INTEGER NULL,
+    last_error TEXT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,20 @@
+-- Log of exclusive job runs (pollers, schedule sync, OpenLigaDB imports).
+-- Mutual exclusion itself uses session-level pg_try_advisory_lock per job key;
+-- this table only records who ran what, when, and how it ended. See app/core/jobs.py.
+-- Rows older than JOB_RUNS_KEEP_DAYS are pruned when the same job starts again.
+
+CREATE TABLE IF NOT EXISTS referee_ratings.job_runs (
+    run_id BIGSERIAL PRIMARY KEY,
+    job_key TEXT NOT NULL,
+    holder TEXT,
+    status TEXT NOT NULL,
+    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    heartbeat_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    duration_ms INTEGER,
+    result JSONB,
+    error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS job_runs_job_key_started_at_idx
+    ON referee_ratings.job_runs (job_key, started_at DESC);
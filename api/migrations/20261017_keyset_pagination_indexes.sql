@@ -0,0 +1,23 @@
+-- Composite indexes for keyset (cursor) pagination: "order by <sort> desc [nulls last], <id> desc".
+-- CONCURRENTLY: must not run inside a transaction block.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_matches_match_date_id
+    ON referee_ratings.matches(match_date DESC, match_id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_scenes_created_at_id
+    ON referee_ratings.scenes(created_at DESC NULLS LAST, scene_id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_scenes_match_created_at_id
+    ON referee_ratings.scenes(match_id, created_at DESC NULLS LAST, scene_id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ratings_created_at_id
+    ON referee_ratings.ratings(created_at DESC, rating_id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ratings_scene_created_at_id
+    ON referee_ratings.ratings(scene_id, created_at DESC, rating_id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_mv_users_created_at_id
+    ON public.mv_users(created_at DESC, user_id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sm_schedule_fixture_starts_at_id
+    ON referee_ratings.sportmonks_schedule_fixture(starts_at DESC NULLS LAST, fixture_id DESC);
@@ -0,0 +1,14 @@
+-- Idempotency keys for POST /ratings/batch (offline replay from mobile clients).
+-- One row per (user, client key); response holds the per-item result returned on replay.
+
+CREATE TABLE IF NOT EXISTS referee_ratings.rating_idempotency_keys (
+    user_id UUID NOT NULL,
+    idempotency_key TEXT NOT NULL,
+    scene_id UUID NOT NULL,
+    status INTEGER NOT NULL,
+    outcome TEXT NOT NULL,
+    rating_id UUID NULL,
+    response JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (user_id, idempotency_key)
+);
@@ -0,0 +1,34 @@
+-- Single-statement rating submission (POST /ratings)
+
+-- ON CONFLICT (scene_id, user_id) needs a unique index on exactly these columns.
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_class t ON t.oid = i.indrelid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        WHERE n.nspname = 'referee_ratings'
+          AND t.relname = 'ratings'
+          AND i.indisunique
+          AND (
+            SELECT array_agg(a.attname::text ORDER BY a.attname)
+            FROM pg_attribute a
+            WHERE a.attrelid = t.oid AND a.attnum = ANY(i.indkey)
+          ) = ARRAY['scene_id', 'user_id']
+    ) THEN
+        CREATE UNIQUE INDEX ux_ratings_scene_user
+            ON referee_ratings.ratings(scene_id, user_id);
+    END IF;
+END $$;
+
+-- referee_ratings.users is now mirrored at email verification instead of on every rating.
+-- Backfill all accounts that are already verified.
+INSERT INTO referee_ratings.users (user_id, email_hash, password_hash)
+SELECT
+    m.user_id,
+    encode(digest(lower(trim(m.email)), 'sha256'), 'hex'),
+    m.password_hash
+FROM mv_users m
+WHERE m.email_verified
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,8 @@
+-- GET /ratings/me?match_id=|scene_ids=: all ratings of one user for a set of scenes.
+-- Covering index -> index-only scan, the heap is not touched (PostgreSQL 11+).
+-- CONCURRENTLY: must not run inside a transaction block.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ratings_user_scene
+    ON referee_ratings.ratings(user_id, scene_id)
+    INCLUDE (rating_id, decision_score, confidence_score, perception_channel,
+             rule_knowledge, rating_time_type, fav_team, created_at);
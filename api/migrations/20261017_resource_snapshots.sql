@@ -0,0 +1,16 @@
+-- Frozen JSON responses for data that can no longer change:
+-- scene_aggregate (id = scene_id) once the scene is locked, match_stats (id = match_id)
+-- once all non-goal scenes of the match are locked. Dropped on unlock; see app/core/snapshots.py.
+-- GET /snapshots/{content_sha256} serves the bytes with Cache-Control: immutable.
+
+CREATE TABLE IF NOT EXISTS referee_ratings.resource_snapshots (
+    resource TEXT NOT NULL,
+    resource_id TEXT NOT NULL,
+    content_sha256 TEXT NOT NULL,
+    body BYTEA NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (resource, resource_id)
+);
+
+CREATE INDEX IF NOT EXISTS resource_snapshots_content_sha256_idx
+    ON referee_ratings.resource_snapshots (content_sha256);
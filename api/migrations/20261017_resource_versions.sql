@@ -0,0 +1,11 @@
+-- Per-resource version counters for strong ETags / conditional GET (If-None-Match -> 304).
+-- resource: match_scenes (id = match_id), scene_ratings (id = scene_id), matches (id = 'all').
+-- Writers bump the version in the same transaction; see app/core/etag.py.
+
+CREATE TABLE IF NOT EXISTS referee_ratings.resource_versions (
+    resource TEXT NOT NULL,
+    resource_id TEXT NOT NULL,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (resource, resource_id)
+);
@@ -0,0 +1,17 @@
+-- Incrementally maintained per-scene rating aggregates
+
+CREATE TABLE IF NOT EXISTS referee_ratings.scene_rating_aggregates (
+    scene_id UUID PRIMARY KEY REFERENCES referee_ratings.scenes(scene_id) ON DELETE CASCADE,
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    decision_sum BIGINT NOT NULL DEFAULT 0,
+    confidence_sum BIGINT NOT NULL DEFAULT 0,
+    decision_dist JSONB NOT NULL DEFAULT '{}'::jsonb,
+    confidence_dist JSONB NOT NULL DEFAULT '{}'::jsonb,
+    channel_dist JSONB NOT NULL DEFAULT '{}'::jsonb,
+    time_type_dist JSONB NOT NULL DEFAULT '{}'::jsonb,
+    rule_knowledge_dist JSONB NOT NULL DEFAULT '{}'::jsonb,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Backfill: python -m app.cli.matchvote aggregates rebuild
+-- Check:    python -m app.cli.matchvote aggregates check
@@ -0,0 +1,4 @@
+-- Supports per-match lookups (vote counts, match stats)
+
+CREATE INDEX IF NOT EXISTS ix_scenes_match_id
+    ON referee_ratings.scenes(match_id);
@@ -0,0 +1,69 @@
+-- Day-partitioned inplay raw archive, consecutive duplicates folded by content hash,
+-- summary rows for the admin snapshot and a daily rollup for retention.
+-- Requires 20261017_sportmonks_raw_payload_gz.sql.
+
+BEGIN;
+
+-- Existing (unpartitioned) table is kept as legacy archive; retention rolls it up and prunes it.
+ALTER TABLE referee_ratings.sportmonks_inplay_raw RENAME TO sportmonks_inplay_raw_legacy;
+ALTER INDEX referee_ratings.sportmonks_inplay_raw_pkey RENAME TO sportmonks_inplay_raw_legacy_pkey;
+ALTER TABLE referee_ratings.sportmonks_inplay_raw_legacy
+    ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMPTZ NULL,
+    ADD COLUMN IF NOT EXISTS seen_count INTEGER NOT NULL DEFAULT 1,
+    ADD COLUMN IF NOT EXISTS content_sha256 TEXT NULL;
+
+CREATE TABLE referee_ratings.sportmonks_inplay_raw (
+    -- same sequence as the legacy table, ids stay unique across both
+    id BIGINT NOT NULL DEFAULT nextval('referee_ratings.sportmonks_inplay_raw_id_seq'),
+    fetched_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_seen_at TIMESTAMPTZ NULL,
+    seen_count INTEGER NOT NULL DEFAULT 1,
+    fixture_id BIGINT NULL,
+    request_params JSONB NOT NULL DEFAULT '{}'::jsonb,
+    payload JSONB NULL,
+    payload_gz BYTEA NULL,
+    payload_sha256 TEXT NULL,
+    content_sha256 TEXT NULL,
+    payload_bytes INTEGER NULL,
+    PRIMARY KEY (id, fetched_at)
+) PARTITION BY RANGE (fetched_at);
+
+ALTER SEQUENCE referee_ratings.sportmonks_inplay_raw_id_seq
+    OWNED BY referee_ratings.sportmonks_inplay_raw.id;
+
+-- Catch-all; daily partitions (sportmonks_inplay_raw_pYYYYMMDD) are created by the writer
+-- and by `python -m app.cli.matchvote inplay-raw maintain`.
+CREATE TABLE referee_ratings.sportmonks_inplay_raw_default
+    PARTITION OF referee_ratings.sportmonks_inplay_raw DEFAULT;
+
+CREATE INDEX IF NOT EXISTS ix_sm_inplay_raw_fetched_at
+    ON referee_ratings.sportmonks_inplay_raw(fetched_at);
+
+CREATE TABLE IF NOT EXISTS referee_ratings.sportmonks_inplay_raw_summary (
+    stream TEXT PRIMARY KEY,
+    last_fetched_at TIMESTAMPTZ NULL,
+    last_raw_id BIGINT NULL,
+    last_raw_fetched_at TIMESTAMPTZ NULL,
+    last_content_sha256 TEXT NULL,
+    total_polls BIGINT NOT NULL DEFAULT 0,
+    stored_payloads BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS referee_ratings.sportmonks_inplay_raw_daily (
+    day DATE PRIMARY KEY,
+    polls BIGINT NOT NULL DEFAULT 0,
+    stored_payloads BIGINT NOT NULL DEFAULT 0,
+    payload_bytes BIGINT NOT NULL DEFAULT 0,
+    first_fetched_at TIMESTAMPTZ NULL,
+    last_seen_at TIMESTAMPTZ NULL
+);
+
+INSERT INTO referee_ratings.sportmonks_inplay_raw_summary
+    (stream, last_fetched_at, total_polls, stored_payloads)
+SELECT 'inplay', max(fetched_at), count(*), count(*)
+FROM referee_ratings.sportmonks_inplay_raw_legacy
+WHERE fixture_id IS NULL
+ON CONFLICT (stream) DO NOTHING;
+
+COMMIT;
@@ -0,0 +1,15 @@
+-- Raw SportMonks payloads as gzip bytes + SHA-256 (instead of re-serialized JSONB)
+
+ALTER TABLE referee_ratings.sportmonks_schedule_raw
+    ADD COLUMN IF NOT EXISTS payload_gz BYTEA NULL,
+    ADD COLUMN IF NOT EXISTS payload_sha256 TEXT NULL,
+    ADD COLUMN IF NOT EXISTS payload_bytes INTEGER NULL,
+    ALTER COLUMN payload DROP NOT NULL;
+
+ALTER TABLE referee_ratings.sportmonks_inplay_raw
+    ADD COLUMN IF NOT EXISTS payload_gz BYTEA NULL,
+    ADD COLUMN IF NOT EXISTS payload_sha256 TEXT NULL,
+    ADD COLUMN IF NOT EXISTS payload_bytes INTEGER NULL,
+    ALTER COLUMN payload DROP NOT NULL;
+
+-- Old rows keep their JSONB payload; new rows only fill payload_gz.
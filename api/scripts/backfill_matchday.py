@@ -15,9 +15,13 @@ if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
 from app.db import engine
+from app.core.etag import ALL, MATCHES, bump_version
+from app.core.http_cache import http_cache, urlopen_cached
 
 BASE_URL = os.getenv("OPENLIGADB_BASE_URL", "https://api.openligadb.de").rstrip("/")
 LEAGUES = ("BL1", "BL2")
+# Ligen-/Saisonliste aendert sich selten; auf Platte cachen (ETag-Revalidierung), 0 = aus
+LEAGUES_CACHE_TTL_SECONDS = float(os.getenv("OPENLIGADB_LEAGUES_CACHE_TTL_SECONDS", "86400"))
 REQUEST_TIMEOUT = 30
 
 
@@ -46,6 +50,12 @@ def fetch_json(path):
     return json.loads(raw)
 
 
+def fetch_json_cached(path, ttl):
+    url = f"{BASE_URL}{path}"
+    raw = urlopen_cached(http_cache, url, ttl, headers={"User-Agent": "MatchVoteBackfill/1.0"}, timeout=REQUEST_TIMEOUT)
+    return json.loads(raw.decode("utf-8"))
+
+
 def season_sort_key(value):
     if not value:
         return 0
@@ -54,7 +64,7 @@ def season_sort_key(value):
 
 
 def latest_season_for(league_shortcut):
-    leagues = fetch_json("/getavailableleagues")
+    leagues = fetch_json_cached("/getavailableleagues", LEAGUES_CACHE_TTL_SECONDS)
     target = league_shortcut.lower()
     candidates = [
         l for l in leagues
@@ -208,6 +218,8 @@ def update_matchday(conn, match_id, matchday_number, matchday_name, matchday_nam
         "matchday_name": matchday_name,
         "matchday_name_en": matchday_name_en,
     })
+    if result.rowcount:
+        bump_version(conn, MATCHES, ALL)
     return result.rowcount
 
 
@@ -216,7 +228,10 @@ def main():
     parser.add_argument("--league", choices=LEAGUES, help="Limit sync to a single league")
     parser.add_argument("--season", help="Override season (applies to all selected leagues)")
     parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk HTTP cache")
     args = parser.parse_args()
+    if args.no_cache:
+        http_cache.enabled = False
 
     leagues = (args.league,) if args.league else LEAGUES
     total_updated = 0
@@ -267,6 +282,8 @@ def main():
         total_missing += missing
 
     log(f"Total updated: {total_updated} missing matches: {total_missing}")
+    stats = http_cache.stats()
+    log(f"HTTP cache hits={stats['hits']} misses={stats['misses']} revalidated={stats['revalidated']}")
 
 
 if __name__ == "__main__":
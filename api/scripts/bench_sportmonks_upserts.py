@@ -0,0 +1,147 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app.db import engine
+from app.core.bulk import DEFAULT_CHUNK_SIZE, bulk_upsert
+from app.core.sportmonks.schedule_repository import SCHEDULE_FIXTURE_COLUMNS
+
+# Vergleicht den alten Loop aus upsert_schedule_fixtures (ein Statement und Round Trip
+# pro Fixture, Statement unveraendert uebernommen) mit dem Bulk-Pfad.
+# Schreibt nur in eine TEMP-Tabelle, echte Daten bleiben unberuehrt.
+
+BENCH_TABLE = "bench_schedule_fixture"
+DEFAULT_SIZES = (10, 300, 3000)
+
+
+def make_rows(count, fetched_at):
+    kickoff = fetched_at.replace(hour=15, minute=30, second=0, microsecond=0)
+    return [
+        {
+            "fixture_id": 19_000_000 + i,
+            "starts_at": kickoff + timedelta(days=i // 9),
+            "home_id": 1000 + (i % 18),
+            "away_id": 2000 + (i % 18),
+            "league_id": 82,
+            "season_id": 23744,
+            "status": "1",
+            "venue_id": 300 + (i % 18),
+            "score_home": None,
+            "score_away": None,
+            "updated_at": fetched_at,
+        }
+        for i in range(count)
+    ]
+
+
+# upsert_schedule_fixtures vor dem Bulk-Umbau, nur mit der Bench-Tabelle als Ziel
+LOOP_UPSERT_SQL = text(f"""
+    insert into {BENCH_TABLE} (
+        fixture_id,
+        starts_at,
+        home_id,
+        away_id,
+        league_id,
+        season_id,
+        status,
+        venue_id,
+        score_home,
+        score_away,
+        updated_at
+    ) values (
+        :fixture_id,
+        :starts_at,
+        :home_id,
+        :away_id,
+        :league_id,
+        :season_id,
+        :status,
+        :venue_id,
+        :score_home,
+        :score_away,
+        :updated_at
+    )
+    on conflict (fixture_id) do update set
+        starts_at = excluded.starts_at,
+        home_id = excluded.home_id,
+        away_id = excluded.away_id,
+        league_id = excluded.league_id,
+        season_id = excluded.season_id,
+        status = excluded.status,
+        venue_id = excluded.venue_id,
+        score_home = excluded.score_home,
+        score_away = excluded.score_away,
+        updated_at = excluded.updated_at
+    returning (xmax = 0) as inserted
+""")
+
+
+def loop_upsert(conn, rows):
+    inserted = 0
+    updated = 0
+    for payload_row in rows:
+        row = conn.execute(LOOP_UPSERT_SQL, payload_row).mappings().first()
+        if row and row.get("inserted"):
+            inserted += 1
+        else:
+            updated += 1
+    return {"inserted": inserted, "updated": updated}
+
+
+def bulk(chunk_size):
+    def upsert(conn, rows):
+        return bulk_upsert(conn, BENCH_TABLE, SCHEDULE_FIXTURE_COLUMNS, rows, ("fixture_id",), chunk_size=chunk_size)
+    return upsert
+
+
+def run_once(conn, rows, upsert):
+    conn.execute(text(f"truncate {BENCH_TABLE}"))
+    started = time.perf_counter()
+    insert_counts = upsert(conn, rows)
+    insert_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    update_counts = upsert(conn, rows)
+    update_ms = (time.perf_counter() - started) * 1000
+    assert insert_counts["inserted"] == len(rows), insert_counts
+    assert update_counts["updated"] == len(rows), update_counts
+    return insert_ms, update_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SportMonks schedule upserts (loop vs bulk)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    fetched_at = datetime.now(timezone.utc)
+    with engine.connect() as conn:
+        conn.execute(text(f"""
+            create temp table if not exists {BENCH_TABLE}
+            (like referee_ratings.sportmonks_schedule_fixture including all)
+        """))
+        conn.commit()
+
+        print("fixtures  mode  insert_ms  update_ms")
+        for size in args.sizes:
+            rows = make_rows(size, fetched_at)
+            for mode, upsert in (("loop", loop_upsert), ("bulk", bulk(args.chunk_size))):
+                best = None
+                for _ in range(max(1, args.repeat)):
+                    timings = run_once(conn, rows, upsert)
+                    conn.commit()
+                    if best is None or sum(timings) < sum(best):
+                        best = timings
+                print(f"{size:>8}  {mode:<4}  {best[0]:>9.1f}  {best[1]:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,9 +15,14 @@ if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
 from app.db import engine
+from app.core.etag import ALL, MATCHES, bump_version
+from app.core.http_cache import http_cache, urlopen_cached
+from app.core.jobs import JobAlreadyRunning, job_run
 
 BASE_URL = os.getenv("OPENLIGADB_BASE_URL", "https://api.openligadb.de").rstrip("/")
 LEAGUES = ("BL1", "BL2")
+# Ligen-/Saisonliste aendert sich selten; auf Platte cachen (ETag-Revalidierung), 0 = aus
+LEAGUES_CACHE_TTL_SECONDS = float(os.getenv("OPENLIGADB_LEAGUES_CACHE_TTL_SECONDS", "86400"))
 
 
 def log(msg):
@@ -45,6 +50,12 @@ def fetch_json(path):
     return json.loads(raw)
 
 
+def fetch_json_cached(path, ttl):
+    url = f"{BASE_URL}{path}"
+    raw = urlopen_cached(http_cache, url, ttl, headers={"User-Agent": "MatchVoteSync/1.0"}, timeout=30)
+    return json.loads(raw.decode("utf-8"))
+
+
 def season_sort_key(value):
     if not value:
         return 0
@@ -53,7 +64,7 @@ def season_sort_key(value):
 
 
 def latest_season_for(league_shortcut):
-    leagues = fetch_json("/getavailableleagues")
+    leagues = fetch_json_cached("/getavailableleagues", LEAGUES_CACHE_TTL_SECONDS)
     target = league_shortcut.lower()
     candidates = [
         l for l in leagues
@@ -169,6 +180,8 @@ def insert_match(conn, payload, include_matchday):
             )
         """)
     result = conn.execute(sql, payload)
+    if result.rowcount:
+        bump_version(conn, MATCHES, ALL)
     return 1 if result.rowcount else 0
 
 
@@ -194,7 +207,7 @@ def season_exists(conn, league, season_value):
     return row is not None
 
 
-def sync_league(league, season_override=None, force=False):
+def sync_league(league, season_override=None, force=False, run=None):
     season = season_override or latest_season_for(league)
     if not season:
         log(f"[{league}] No season found.")
@@ -216,6 +229,9 @@ def sync_league(league, season_override=None, force=False):
             and column_exists(conn, "referee_ratings", "matches", "matchday_name_en")
         )
         for item in matches:
+            # Lock verloren -> Abbruch, die Transaktion wird zurueckgerollt
+            if run is not None:
+                run.check()
             match_date = parse_match_datetime(item)
             team_home = extract_team_name(get_field(item, "team1", "Team1"))
             team_away = extract_team_name(get_field(item, "team2", "Team2"))
@@ -248,14 +264,26 @@ def main():
     parser.add_argument("--league", choices=LEAGUES, help="Limit sync to a single league")
     parser.add_argument("--season", help="Override season (applies to all selected leagues)")
     parser.add_argument("--force", action="store_true", help="Sync even if season already exists")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk HTTP cache")
     args = parser.parse_args()
+    if args.no_cache:
+        http_cache.enabled = False
 
     leagues = (args.league,) if args.league else LEAGUES
     total = 0
-    for league in leagues:
-        total += sync_league(league, season_override=args.season, force=args.force)
+    try:
+        # nie zwei Syncs parallel (Cron + manueller Lauf, mehrere Hosts)
+        with job_run("openligadb:sync") as run:
+            for league in leagues:
+                total += sync_league(league, season_override=args.season, force=args.force, run=run)
+            run.result = {"leagues": list(leagues), "inserted": total}
+    except JobAlreadyRunning:
+        log("Skipped: openligadb:sync already running")
+        return
 
     log(f"Total inserted: {total}")
+    stats = http_cache.stats()
+    log(f"HTTP cache hits={stats['hits']} misses={stats['misses']} revalidated={stats['revalidated']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from app.core.aggregates import diff_aggregates
+
+
+def _aggregate(**overrides):
+    base = {
+        "rating_count": 2,
+        "avg_decision": 4.5,
+        "avg_confidence": 3.0,
+        "decision_dist": {"4": 1, "5": 1},
+        "confidence_dist": {"3": 2},
+        "channel_dist": {"TV": 1, "STADIUM": 1},
+        "time_type_dist": {"LIVE": 2},
+        "rule_knowledge_dist": {"HIGH": 2},
+    }
+    base.update(overrides)
+    return base
+
+
+def test_diff_aggregates_equal():
+    assert diff_aggregates(_aggregate(), _aggregate()) == []
+
+
+def test_diff_aggregates_ignores_zero_buckets_and_key_order():
+    stored = _aggregate(decision_dist={"5": 1, "4": 1, "1": 0})
+    assert diff_aggregates(stored, _aggregate()) == []
+
+
+def test_diff_aggregates_reports_fields():
+    stored = _aggregate(rating_count=3, channel_dist={"TV": 2, "STADIUM": 1})
+    assert diff_aggregates(stored, _aggregate()) == ["rating_count", "channel_dist"]
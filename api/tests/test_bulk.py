@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from app.core.bulk import bulk_upsert, dedupe_rows
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+
+class _Conn:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params):
+        self.statements.append((str(sql), params))
+        rows = len(params) // 2
+        return _Result([{"inserted": True}] * rows)
+
+
+def test_dedupe_keeps_last_row_per_key():
+    rows, duplicates = dedupe_rows(
+        [{"fixture_id": 1, "status": "NS"}, {"fixture_id": 2}, {"fixture_id": 1, "status": "LIVE"}],
+        ("fixture_id",),
+    )
+    assert duplicates == 1
+    assert [r["fixture_id"] for r in rows] == [1, 2]
+    assert rows[0]["status"] == "LIVE"
+
+
+def test_bulk_upsert_chunks_rows():
+    conn = _Conn()
+    rows = [{"fixture_id": i, "status": "NS"} for i in range(5)] + [{"fixture_id": 0, "status": "LIVE"}]
+    counts = bulk_upsert(conn, "t", ("fixture_id", "status"), rows, conflict=("fixture_id",), chunk_size=2)
+
+    assert len(conn.statements) == 3
+    assert counts == {"inserted": 5, "updated": 1}
+    sql, params = conn.statements[0]
+    assert "status = excluded.status" in sql
+    assert "fixture_id = excluded" not in sql
+    assert params == {"fixture_id_0": 0, "status_0": "LIVE", "fixture_id_1": 1, "status_1": "NS"}
+
+
+def test_bulk_upsert_skip_unchanged_counts_untouched_rows():
+    class _SkippingConn(_Conn):
+        def execute(self, sql, params):
+            self.statements.append((str(sql), params))
+            # nur die erste Zeile ist neu, der Rest unveraendert (kein RETURNING)
+            return _Result([{"inserted": True}])
+
+    conn = _SkippingConn()
+    rows = [{"fixture_id": i, "status": "NS"} for i in range(3)] + [{"fixture_id": 2, "status": "NS"}]
+    counts = bulk_upsert(conn, "t", ("fixture_id", "status"), rows, conflict=("fixture_id",), skip_unchanged=True)
+
+    assert counts == {"inserted": 1, "updated": 0, "unchanged": 3}
+    sql, _ = conn.statements[0]
+    assert "where (t.status) is distinct from (excluded.status)" in sql
@@ -6,6 +6,7 @@ from uuid import UUID
 from fastapi.testclient import TestClient
 
 import app.main as main
+from app.core import snapshots
 from app.core.user_auth import require_user
 
 
@@ -53,6 +54,9 @@ class _FakeEngine:
 
 def _build_client(monkeypatch):
     monkeypatch.setattr(main, "init_db", None)
+    # ohne eingefrorene Snapshots, sonst landen die Fake-Zeilen im Snapshot-Lookup
+    monkeypatch.setattr(snapshots, "engine", _FakeEngine([]))
+    snapshots.snapshot_cache.clear()
     main.app.dependency_overrides[require_user] = (
         lambda: "00000000-0000-0000-0000-000000000000"
     )
@@ -103,3 +107,318 @@ def test_accept_language_no_4xx(monkeypatch):
     client = _build_client(monkeypatch)
     response = client.get("/scenes", headers={"Accept-Language": "de,zz;q=0.1"})
     assert response.status_code < 400
+
+
+def test_scene_aggregate_response_shape_unchanged(monkeypatch):
+    from app.api.v1 import scenes as scenes_api
+
+    aggregate_row = {
+        "scene_id": UUID("00000000-0000-0000-0000-000000000001"),
+        "rating_count": 3,
+        "avg_decision": 4.0,
+        "avg_confidence": 3.0,
+        "decision_dist": {"3": 1, "4": 1, "5": 1},
+        "confidence_dist": {"3": 3},
+        "channel_dist": {"TV": 3},
+        "time_type_dist": {"LIVE": 3},
+        "rule_knowledge_dist": {"HIGH": 3},
+        "computed_at": datetime(2024, 10, 1, 18, 0, tzinfo=timezone.utc),
+    }
+    monkeypatch.setattr(scenes_api, "engine", _FakeEngine([aggregate_row]))
+
+    client = _build_client(monkeypatch)
+    response = client.get("/scenes/00000000-0000-0000-0000-000000000001/aggregate")
+    assert response.status_code == 200
+    assert set(response.json().keys()) == set(aggregate_row.keys())
+
+
+def test_scene_aggregate_unknown_scene_404(monkeypatch):
+    from app.api.v1 import scenes as scenes_api
+
+    monkeypatch.setattr(scenes_api, "engine", _FakeEngine([]))
+
+    client = _build_client(monkeypatch)
+    response = client.get("/scenes/00000000-0000-0000-0000-000000000001/aggregate")
+    assert response.status_code == 404
+
+
+def test_match_stats_merges_scene_aggregates(monkeypatch):
+    from app.core import match_stats
+
+    scene_rows = [
+        {
+            "scene_id": UUID("00000000-0000-0000-0000-000000000001"),
+            "minute": 12,
+            "stoppage_time": None,
+            "scene_type": "FOUL",
+            "rating_count": 2,
+            "decision_sum": 9,
+            "confidence_sum": 6,
+            "decision_dist": {"4": 1, "5": 1},
+            "confidence_dist": {"3": 2},
+            "channel_dist": {"TV": 2},
+            "time_type_dist": {"LIVE": 2},
+            "rule_knowledge_dist": {"HIGH": 2},
+        },
+        {
+            "scene_id": UUID("00000000-0000-0000-0000-000000000002"),
+            "minute": 40,
+            "stoppage_time": 2,
+            "scene_type": "PENALTY",
+            "rating_count": 0,
+            "decision_sum": 0,
+            "confidence_sum": 0,
+            "decision_dist": {},
+            "confidence_dist": {},
+            "channel_dist": {},
+            "time_type_dist": {},
+            "rule_knowledge_dist": {},
+        },
+    ]
+    monkeypatch.setattr(match_stats, "engine", _FakeEngine(scene_rows))
+    match_stats.invalidate_match_stats()
+
+    client = _build_client(monkeypatch)
+    response = client.get("/matches/00000000-0000-0000-0000-000000000000/stats")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["rating_count"] == 2
+    assert data["rated_scene_count"] == 1
+    assert data["avg_decision"] == 4.5
+    assert data["channel_dist"] == {"TV": 2}
+    assert [s["rating_count"] for s in data["scenes"]] == [2, 0]
+    assert data["scenes"][1]["avg_decision"] is None
+
+
+def test_match_vote_counts_batch(monkeypatch):
+    from app.api.v1 import matches as matches_api
+
+    first = "00000000-0000-0000-0000-000000000001"
+    second = "00000000-0000-0000-0000-000000000002"
+    monkeypatch.setattr(matches_api, "engine", _FakeEngine([{"match_id": first, "vote_count": 7}]))
+
+    client = _build_client(monkeypatch)
+    response = client.get(f"/matches/vote-counts?match_ids={first},{second}")
+    assert response.status_code == 200
+    assert response.json() == {first: 7, second: 0}
+
+    response = client.get("/matches/vote-counts?match_ids=not-a-uuid")
+    assert response.status_code == 400
+
+
+def _rating_payload():
+    return {
+        "scene_id": "00000000-0000-0000-0000-000000000001",
+        "decision_score": 4,
+        "confidence_score": 3,
+        "perception_channel": "TV",
+        "rule_knowledge": "HIGH",
+        "rating_time_type": "LIVE",
+    }
+
+
+def test_create_rating_maps_outcomes(monkeypatch):
+    from app.api.v1 import ratings as ratings_api
+
+    client = _build_client(monkeypatch)
+    for outcome, expected in (("scene_not_found", 404), ("locked", 409), ("duplicate", 409), ("fav_team_mismatch", 400)):
+        monkeypatch.setattr(ratings_api, "engine", _FakeEngine([{"outcome": outcome, "match_id": None}]))
+        response = client.post("/ratings", json=_rating_payload())
+        assert response.status_code == expected, outcome
+
+
+def test_create_rating_returns_created_row(monkeypatch):
+    from app.api.v1 import ratings as ratings_api
+
+    row = {
+        "outcome": "created",
+        "match_id": UUID("00000000-0000-0000-0000-000000000009"),
+        "rating_id": UUID("00000000-0000-0000-0000-000000000002"),
+        "scene_id": UUID("00000000-0000-0000-0000-000000000001"),
+        "user_id": UUID("00000000-0000-0000-0000-000000000000"),
+        "decision_score": 4,
+        "confidence_score": 3,
+        "perception_channel": "TV",
+        "rule_knowledge": "HIGH",
+        "rating_time_type": "LIVE",
+        "fav_team": None,
+        "created_at": datetime(2026, 10, 17, 15, 0, tzinfo=timezone.utc),
+    }
+    monkeypatch.setattr(ratings_api, "engine", _FakeEngine([row]))
+
+    client = _build_client(monkeypatch)
+    response = client.post("/ratings", json=_rating_payload())
+    assert response.status_code == 201
+    data = response.json()
+    assert data["rating_id"] == "00000000-0000-0000-0000-000000000002"
+    assert "outcome" not in data
+
+
+class _BatchEngine:
+    """Antwortet je nach Statement: gespeicherte Idempotenz-Schluessel bzw. Submit-Ergebnis."""
+
+    def __init__(self, stored, submit_row):
+        self.stored = stored
+        self.submit_row = submit_row
+        self.statements = []
+
+    def begin(self):
+        return self
+
+    def execute(self, sql, params=None):
+        sql = str(sql)
+        self.statements.append(sql)
+        if "from referee_ratings.rating_idempotency_keys" in sql:
+            return _FakeResult(self.stored)
+        if "with s as" in sql:
+            return _FakeResult([self.submit_row])
+        return _FakeResult([])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+def test_ratings_batch_replays_stored_keys(monkeypatch):
+    from app.api.v1 import ratings as ratings_api
+
+    stored = [{
+        "idempotency_key": "key-replayed",
+        "scene_id": "00000000-0000-0000-0000-000000000001",
+        "response": {"status": 201, "outcome": "created", "detail": None, "rating": None},
+    }]
+    fake = _BatchEngine(stored, {"outcome": "locked", "match_id": None})
+    monkeypatch.setattr(ratings_api, "engine", fake)
+
+    client = _build_client(monkeypatch)
+    items = [
+        dict(_rating_payload(), idempotency_key="key-replayed"),
+        dict(_rating_payload(), idempotency_key="key-new-0001", scene_id="00000000-0000-0000-0000-000000000003"),
+    ]
+    response = client.post("/ratings/batch", json={"items": items})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0]["replayed"] is True and results[0]["status"] == 201
+    assert results[1]["status"] == 409 and results[1]["outcome"] == "locked"
+    # locked haengt vom Szenen-Zustand ab -> nicht speichern, ein spaeterer Retry darf gelingen
+    inserts = [sql for sql in fake.statements if "insert into referee_ratings.rating_idempotency_keys" in sql]
+    assert inserts == []
+
+    fake.submit_row = {"outcome": "fav_team_mismatch", "match_id": None}
+    fake.statements.clear()
+    results = client.post("/ratings/batch", json={"items": items}).json()["results"]
+    assert results[1]["status"] == 400
+    # nur der neue Schluessel wird gespeichert
+    inserts = [sql for sql in fake.statements if "insert into referee_ratings.rating_idempotency_keys" in sql]
+    assert len(inserts) == 1 and ":idempotency_key_1" not in inserts[0]
+
+
+def test_ratings_batch_rejects_duplicate_keys(monkeypatch):
+    client = _build_client(monkeypatch)
+    items = [dict(_rating_payload(), idempotency_key="same-key-1")] * 2
+    assert client.post("/ratings/batch", json={"items": items}).status_code == 400
+
+
+def test_my_ratings_by_match(monkeypatch):
+    from app.api.v1 import ratings as ratings_api
+
+    row = {
+        "rating_id": UUID("00000000-0000-0000-0000-000000000002"),
+        "scene_id": UUID("00000000-0000-0000-0000-000000000001"),
+        "user_id": UUID("00000000-0000-0000-0000-000000000000"),
+        "decision_score": 4,
+        "confidence_score": 3,
+        "perception_channel": "TV",
+        "rule_knowledge": "HIGH",
+        "rating_time_type": "LIVE",
+        "fav_team": None,
+        "created_at": datetime(2026, 10, 17, 15, 0, tzinfo=timezone.utc),
+    }
+    monkeypatch.setattr(ratings_api, "engine", _FakeEngine([row]))
+
+    client = _build_client(monkeypatch)
+    response = client.get("/ratings/me", params={"match_id": "00000000-0000-0000-0000-000000000009"})
+    assert response.status_code == 200
+    assert [r["scene_id"] for r in response.json()] == ["00000000-0000-0000-0000-000000000001"]
+
+    assert client.get("/ratings/me").status_code == 400
+    assert client.get("/ratings/me", params={"scene_ids": "not-a-uuid"}).status_code == 400
+
+
+def test_scene_aggregate_not_modified(monkeypatch):
+    from app.api.v1 import scenes as scenes_api
+    from app.core.etag import SCENE_RATINGS, make_etag
+
+    scene_id = "00000000-0000-0000-0000-000000000001"
+    # _FakeResult.scalar() liefert 1 -> Version 1
+    monkeypatch.setattr(scenes_api, "engine", _FakeEngine([]))
+    client = _build_client(monkeypatch)
+
+    response = client.get(f"/scenes/{scene_id}/aggregate", headers={"If-None-Match": make_etag(SCENE_RATINGS, scene_id, 1)})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == make_etag(SCENE_RATINGS, scene_id, 1)
+
+
+def test_locked_scene_aggregate_served_from_snapshot(monkeypatch):
+    body = snapshots.serialize({"scene_id": "00000000-0000-0000-0000-000000000001", "rating_count": 3})
+    client = _build_client(monkeypatch)
+    content_sha256 = "a" * 64
+    monkeypatch.setattr(snapshots, "engine", _FakeEngine([{"content_sha256": content_sha256, "body": body}]))
+
+    response = client.get("/scenes/00000000-0000-0000-0000-000000000001/aggregate")
+    assert response.status_code == 200
+    assert response.content == body
+    assert response.headers["ETag"] == f'"{content_sha256}"'
+    assert response.headers["Content-Location"] == f"/api/snapshots/{content_sha256}"
+
+    response = client.get(
+        "/scenes/00000000-0000-0000-0000-000000000001/aggregate",
+        headers={"If-None-Match": f'"{content_sha256}"'},
+    )
+    assert response.status_code == 304
+
+
+def test_snapshot_by_hash_is_immutable(monkeypatch):
+    from app.api.v1 import snapshots as snapshots_api
+
+    monkeypatch.setattr(snapshots_api, "engine", _FakeEngine([(b'{"a":1}',)]))
+    client = _build_client(monkeypatch)
+
+    response = client.get(f"/snapshots/{'b' * 64}")
+    assert response.status_code == 200
+    assert response.content == b'{"a":1}'
+    assert "immutable" in response.headers["Cache-Control"]
+
+    assert client.get("/snapshots/not-a-hash").status_code == 404
+
+
+def test_snapshot_by_hash_revalidates_against_its_own_hash(monkeypatch):
+    from app.api.v1 import snapshots as snapshots_api
+
+    content_sha256 = "b" * 64
+    monkeypatch.setattr(snapshots_api, "engine", _FakeEngine([(b'{"a":1}',)]))
+    client = _build_client(monkeypatch)
+
+    assert client.get(f"/snapshots/{content_sha256}", headers={"If-None-Match": f'"{content_sha256}"'}).status_code == 304
+    assert client.get(f"/snapshots/{content_sha256}", headers={"If-None-Match": '"other"'}).status_code == 200
+
+    monkeypatch.setattr(snapshots_api, "engine", _FakeEngine([]))
+    assert client.get(f"/snapshots/{content_sha256}", headers={"If-None-Match": f'"{content_sha256}"'}).status_code == 404
+
+
+def test_match_stream_requires_bearer_token(monkeypatch):
+    client = _build_client(monkeypatch)
+    main.app.dependency_overrides.pop(require_user)
+    response = client.get("/matches/00000000-0000-0000-0000-000000000000/stream")
+    assert response.status_code == 401
+
+
+def test_match_stream_rejects_when_full(monkeypatch):
+    from app.api.v1 import matches as matches_api
+
+    monkeypatch.setattr(matches_api.match_events, "accepting", lambda: False)
+    client = _build_client(monkeypatch)
+    response = client.get("/matches/00000000-0000-0000-0000-000000000000/stream")
+    assert response.status_code == 503
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from fastapi import Response
+
+from app.core import etag
+
+
+def test_make_etag_is_strong_and_varies():
+    base = etag.make_etag(etag.MATCH_SCENES, "m1", 3)
+    assert base == '"match_scenes-m1-3"'
+    assert etag.make_etag(etag.MATCH_SCENES, "m1", 4) != base
+    de = etag.make_etag(etag.MATCH_SCENES, "m1", 3, "de", 50, 0, None)
+    en = etag.make_etag(etag.MATCH_SCENES, "m1", 3, "en", 50, 0, None)
+    assert de != en and de.startswith('"match_scenes-m1-3-')
+
+
+def test_etag_matches_header_forms():
+    tag = '"scene_ratings-s1-2"'
+    assert etag.etag_matches(tag, tag)
+    assert etag.etag_matches(f'"other", W/{tag}', tag)
+    assert etag.etag_matches("*", tag)
+    assert not etag.etag_matches('"scene_ratings-s1-1"', tag)
+    assert not etag.etag_matches(None, tag)
+
+
+def test_conditional_response():
+    tag = '"matches-all-7"'
+    response = Response()
+    assert etag.conditional_response(response, tag, '"matches-all-6"') is None
+    assert response.headers["ETag"] == tag
+
+    not_modified = etag.conditional_response(Response(), tag, tag)
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == tag
+
+
+def test_bump_versions_dedupes_ids():
+    class _Conn:
+        params = None
+
+        def execute(self, sql, params):
+            self.params = params
+
+    conn = _Conn()
+    etag.bump_versions(conn, etag.SCENE_RATINGS, ["b", "a", "b", None])
+    assert conn.params == {"resource": etag.SCENE_RATINGS, "ids": ["a", "b"]}
+
+    conn = _Conn()
+    etag.bump_versions(conn, etag.SCENE_RATINGS, [])
+    assert conn.params is None
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from app.core import events, invalidation
+
+
+def _drain(queue):
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+
+def test_publish_without_subscribers_is_noop():
+    hub = events.MatchEventHub()
+    hub.publish("m1", events.SCENE_RELEASED, {"scene_id": "s1"})
+    assert hub.stats()["published"] == 0
+
+
+def test_slow_client_gets_resync_instead_of_blocking():
+    hub = events.MatchEventHub(buffer_size=2)
+
+    async def scenario():
+        queue = hub.subscribe("m1")
+        other = hub.subscribe("m2")
+        for i in range(3):
+            hub.publish("m1", events.SCENE_RELEASED, {"scene_id": f"s{i}"})
+        await asyncio.sleep(0)
+        return _drain(queue), _drain(other)
+
+    received, other = asyncio.run(scenario())
+    assert received == [events.encode_event(events.RESYNC, {})]
+    assert other == []
+    assert hub.stats()["resyncs"] == 1
+
+
+def test_aggregate_updates_are_coalesced(monkeypatch):
+    loads = []
+
+    def fake_load(scene_ids):
+        loads.append(sorted(scene_ids))
+        return [{"scene_id": scene_id, "rating_count": 1} for scene_id in sorted(scene_ids)]
+
+    monkeypatch.setattr(events, "_load_aggregates", fake_load)
+    hub = events.MatchEventHub(aggregate_interval=0.01)
+
+    async def scenario():
+        queue = hub.subscribe("m1")
+        hub.aggregate_changed("m1", ["a"])
+        hub.aggregate_changed("m1", ["b", "a"])
+        await asyncio.sleep(0.1)
+        return _drain(queue)
+
+    received = asyncio.run(scenario())
+    assert loads == [["a", "b"]]
+    assert received == [
+        events.encode_event(events.AGGREGATE_UPDATED, {"scene_id": "a", "rating_count": 1}),
+        events.encode_event(events.AGGREGATE_UPDATED, {"scene_id": "b", "rating_count": 1}),
+    ]
+
+
+def test_stream_unsubscribes_on_close():
+    hub = events.MatchEventHub(max_streams=1)
+
+    async def scenario():
+        stream = hub.stream("m1")
+        first = await stream.__anext__()
+        assert hub.stats()["streams"] == 1
+        assert not hub.accepting()
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(scenario()).startswith(b"retry: ")
+    assert hub.stats()["streams"] == 0
+    assert hub.stats()["rejected"] == 1
+    assert hub.accepting()
+
+
+def test_publish_goes_to_other_workers_over_the_bus(monkeypatch):
+    sent = []
+    monkeypatch.setattr(events.invalidation_bus, "broadcast", lambda kind, key=None: sent.append((kind, key)))
+    hub = events.MatchEventHub()
+    hub.publish("m1", events.SCENE_LOCKED, {"scene_id": "s1"})
+    hub.aggregate_changed("m1", ["b", "a"])
+    assert [kind for kind, _ in sent] == [invalidation.MATCH_EVENT, invalidation.MATCH_AGGREGATES]
+
+
+def test_bus_events_reach_local_streams_and_reconnect_resyncs(monkeypatch):
+    hub = events.MatchEventHub()
+    monkeypatch.setattr(events, "match_events", hub)
+
+    async def scenario():
+        queue = hub.subscribe("m1")
+        invalidation.evict_local(invalidation.MATCH_EVENT, '{"m":"m1","e":"scene_locked","d":{"scene_id":"s1"}}')
+        await asyncio.sleep(0)
+        received = _drain(queue)
+        # Bus-Verbindung war weg: Events koennen fehlen
+        invalidation.evict_local(invalidation.MATCH_EVENT, None)
+        await asyncio.sleep(0)
+        return received, _drain(queue)
+
+    received, after_reconnect = asyncio.run(scenario())
+    assert received == [events.encode_event(events.SCENE_LOCKED, {"scene_id": "s1"})]
+    assert after_reconnect == [events.encode_event(events.RESYNC, {})]
+
+
+def test_bus_keeps_event_order_within_one_drain(monkeypatch):
+    bus = invalidation.InvalidationBus()
+    monkeypatch.setattr(invalidation.InvalidationBus, "running", property(lambda self: True))
+    monkeypatch.setattr(events, "invalidation_bus", bus)
+    hub = events.MatchEventHub()
+    for event in (events.SCENE_RELEASED, events.SCENE_UNRELEASED, events.SCENE_RELEASED, events.SCENE_LOCKED):
+        hub.publish("m1", event, {"scene_id": "s1"})
+    bus.broadcast(invalidation.MATCH_STATS, "m1")
+    bus.broadcast(invalidation.MATCH_STATS, "m1")
+
+    keys = bus._take_outbox()
+    # fehlgeschlagenes Senden stellt alles unveraendert zurueck
+    bus._requeue(keys)
+    assert bus._take_outbox() == keys
+    decoded = []
+    for payload in invalidation.encode_payloads("other", keys):
+        decoded.extend(invalidation.decode_payload(payload)[1])
+    assert decoded.count((invalidation.MATCH_STATS, "m1")) == 1
+    published = [json.loads(key)["e"] for kind, key in decoded if kind == invalidation.MATCH_EVENT]
+    assert published == [events.SCENE_RELEASED, events.SCENE_UNRELEASED, events.SCENE_RELEASED, events.SCENE_LOCKED]
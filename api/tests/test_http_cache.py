@@ -0,0 +1,168 @@
+import json
+import os
+import time
+
+import httpx
+
+from app.core.http_cache import HttpCache, cache_key
+from app.core.sportmonks.budget import RequestBudget
+from app.core.sportmonks.client import SportMonksClient
+
+
+def _expire(cache, key):
+    path = os.path.join(cache.directory, "entries", f"{key}.json")
+    with open(path) as handle:
+        entry = json.load(handle)
+    entry["expires_at"] = time.time() - 1
+    with open(path, "w") as handle:
+        json.dump(entry, handle)
+
+
+def test_store_and_fresh_hit(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    key = cache_key("https://x/seasons", {"page": 1})
+    assert cache.lookup(key) is None
+    cache.store(key, "https://x/seasons", {"page": 1}, b'{"data": []}', ttl=60)
+
+    cached = cache.lookup(key)
+    assert cached.fresh is True
+    assert cached.body == b'{"data": []}'
+    assert (cache.hits, cache.misses, cache.stores) == (1, 1, 1)
+
+
+def test_key_ignores_api_token_and_token_is_not_stored(tmp_path):
+    assert cache_key("https://x/a", {"page": 1, "api_token": "one"}) == cache_key("https://x/a", {"page": 1, "api_token": "two"})
+    assert cache_key("https://x/a", {"page": 1}) != cache_key("https://x/a", {"page": 2})
+
+    cache = HttpCache(str(tmp_path))
+    key = cache_key("https://x/a", {"api_token": "secret"})
+    cache.store(key, "https://x/a", {"api_token": "secret"}, b"{}", ttl=60)
+    for root, _, files in os.walk(tmp_path):
+        for name in files:
+            with open(os.path.join(root, name), "rb") as handle:
+                assert b"secret" not in handle.read()
+
+
+def test_identical_bodies_are_stored_once(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    for page in (1, 2):
+        cache.store(cache_key("https://x/a", {"page": page}), "https://x/a", {"page": page}, b"same", ttl=60)
+    bodies = [name for _, _, files in os.walk(tmp_path / "bodies") for name in files]
+    assert len(bodies) == 1
+
+
+def test_expired_entry_with_etag_is_revalidated(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    calls = []
+
+    def request(headers):
+        calls.append(headers)
+        if len(calls) == 1:
+            return 200, b"leagues", {"ETag": '"v1"'}
+        return 304, b"", {}
+
+    assert cache.fetch("https://o/getavailableleagues", None, 60, request) == (200, b"leagues", False)
+    _expire(cache, cache_key("https://o/getavailableleagues"))
+    assert cache.fetch("https://o/getavailableleagues", None, 60, request) == (200, b"leagues", True)
+    assert calls[1] == {"If-None-Match": '"v1"'}
+    assert (cache.misses, cache.revalidated) == (2, 1)
+
+    # 304 hat die Ablaufzeit verlaengert -> naechster Abruf ohne Request
+    assert cache.fetch("https://o/getavailableleagues", None, 60, request) == (200, b"leagues", True)
+    assert len(calls) == 2
+
+
+def test_expired_entry_without_validators_is_a_miss(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    key = cache_key("https://x/a")
+    cache.store(key, "https://x/a", None, b"old", ttl=60)
+    _expire(cache, key)
+    assert cache.lookup(key) is None
+    assert cache.fetch("https://x/a", None, 60, lambda headers: (200, b"new", {})) == (200, b"new", False)
+    assert cache.lookup(key).body == b"new"
+
+
+def test_stale_entries_count_one_miss_with_or_without_validators(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    for url, headers in (("https://x/plain", {}), ("https://x/etag", {"ETag": '"v1"'})):
+        cache.fetch(url, None, 60, lambda validators: (200, b"old", headers))
+        _expire(cache, cache_key(url))
+    misses = cache.misses
+    cache.fetch("https://x/plain", None, 60, lambda validators: (200, b"new", {}))
+    assert cache.misses == misses + 1
+    cache.fetch("https://x/etag", None, 60, lambda validators: (200, b"new", {"ETag": '"v2"'}))
+    assert cache.misses == misses + 2
+
+
+def test_zero_ttl_bypasses_cache(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    calls = []
+
+    def request(headers):
+        calls.append(headers)
+        return 200, b"body", {"ETag": '"v1"'}
+
+    assert cache.fetch("https://x/a", None, 0, request) == (200, b"body", False)
+    assert cache.fetch("https://x/a", None, 0, request) == (200, b"body", False)
+    assert calls == [{}, {}]
+    assert cache.stats()["misses"] == cache.stats()["stores"] == 0
+    assert not os.path.exists(tmp_path / "entries")
+
+
+def test_disabled_cache_always_requests(tmp_path):
+    cache = HttpCache(str(tmp_path), enabled=False)
+    calls = []
+
+    def request(headers):
+        calls.append(headers)
+        return 200, b"body", {}
+
+    cache.fetch("https://x/a", None, 60, request)
+    cache.fetch("https://x/a", None, 60, request)
+    assert calls == [{}, {}]
+    assert not os.path.exists(tmp_path / "entries")
+
+
+def test_prune_removes_expired_entries_and_orphaned_bodies(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    old = cache_key("https://x/old")
+    cache.store(old, "https://x/old", None, b"old", ttl=60)
+    cache.store(cache_key("https://x/new"), "https://x/new", None, b"new", ttl=60)
+    _expire(cache, old)
+
+    assert cache.prune(keep_seconds=3600) == {"entries": 0, "bodies": 0}
+    assert cache.prune(keep_seconds=0) == {"entries": 1, "bodies": 1}
+    assert cache.lookup(cache_key("https://x/new")).body == b"new"
+
+
+def test_client_serves_cached_pages_without_requests_or_budget(tmp_path):
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        page = int(request.url.params.get("page", 1))
+        body = {
+            "data": [{"id": page}] if page <= 2 else [],
+            "pagination": {"has_more": page < 2},
+            "rate_limit": {"remaining": 2900, "resets_in_seconds": 3600, "requested_entity": "Season"},
+        }
+        return httpx.Response(200, content=json.dumps(body).encode(), headers={"ETag": f'"p{page}"'})
+
+    budget = RequestBudget()
+    client = SportMonksClient(
+        "token", transport=httpx.MockTransport(handler), budget=budget, cache=HttpCache(str(tmp_path))
+    )
+    try:
+        first = sorted(client.iter_pages("seasons", "/seasons", {"per_page": 50}, cache_ttl=60))
+        requested = len(seen)
+        spent = budget.stats()["requests"]["schedule"]
+        second = sorted(client.iter_pages("seasons", "/seasons", {"per_page": 50}, cache_ttl=60))
+    finally:
+        client.close()
+
+    assert [p.payload["data"][0]["id"] for p in first] == [1, 2]
+    assert not any(p.cached for p in first)
+    assert [p.payload for p in second] == [p.payload for p in first]
+    assert all(p.cached for p in second)
+    assert len(seen) == requested
+    assert budget.stats()["requests"]["schedule"] == spent
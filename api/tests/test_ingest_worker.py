@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from app.core.jobs import INPLAY_POLL
+from app.core.sportmonks import worker
+from app.core.sportmonks.worker import WINDOW_LEAD, plan_next_poll
+
+
+NOW = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+
+def test_live_window_polls_fast():
+    plan = plan_next_poll(NOW, live_fixtures=3, next_kickoff=None, live_interval=15, idle_max_sleep=1800)
+    assert plan.mode == "live"
+    assert plan.delay_seconds == 15
+
+
+def test_keeps_polling_while_last_poll_had_tracked_fixtures():
+    plan = plan_next_poll(NOW, live_fixtures=0, next_kickoff=None, last_tracked=1, live_interval=15)
+    assert plan.mode == "live"
+
+
+def test_untracked_live_fixtures_do_not_keep_worker_live(monkeypatch):
+    def poll(client=None, lease=None):
+        # 5 laufende Spiele, keins aus einer getrackten Liga
+        return {"fixtures": 5, "tracked": 0, "changed": 0}
+
+    monkeypatch.setattr(worker, "poll_inplay_and_persist", poll)
+    monkeypatch.setattr(worker, "read_live_windows", lambda now: {"live_fixtures": 1, "next_kickoff": None})
+    inplay = worker.InplayWorker(client=object())
+    inplay.step()
+    assert inplay.status["last_fixtures"] == 5
+    assert inplay.last_tracked == 0
+
+    monkeypatch.setattr(worker, "read_live_windows", lambda now: {"live_fixtures": 0, "next_kickoff": None})
+    inplay.step()
+    assert inplay.status["mode"] == "idle"
+
+
+def test_idle_sleeps_until_shortly_before_kickoff():
+    kickoff = NOW + timedelta(minutes=20)
+    plan = plan_next_poll(NOW, live_fixtures=0, next_kickoff=kickoff, live_interval=15, idle_max_sleep=1800)
+    assert plan.mode == "idle"
+    assert plan.delay_seconds == (kickoff - WINDOW_LEAD - NOW).total_seconds()
+
+
+def test_idle_sleep_is_capped():
+    plan = plan_next_poll(NOW, 0, NOW + timedelta(days=3), live_interval=15, idle_max_sleep=1800)
+    assert plan.delay_seconds == 1800
+    plan = plan_next_poll(NOW, 0, None, live_interval=15, idle_max_sleep=1800)
+    assert plan.delay_seconds == 1800
+
+
+def test_worker_polls_under_its_own_inplay_lease(monkeypatch):
+    calls = []
+
+    def poll(client=None, lease=None):
+        calls.append(lease)
+        return {"fixtures": 2, "changed": 1}
+
+    monkeypatch.setattr(worker, "poll_inplay_and_persist", poll)
+    inplay = worker.InplayWorker(client=object())
+    inplay.poll_once()
+    assert inplay.lease.job_key == INPLAY_POLL
+    assert calls == [inplay.lease]
+
+
+def test_only_mapped_leagues_are_tracked():
+    from app.core.sportmonks.league_mapping import is_tracked_league
+
+    assert is_tracked_league(82)
+    assert not is_tracked_league(501)
+    assert not is_tracked_league(None)
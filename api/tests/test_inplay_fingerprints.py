@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from app.core.sportmonks import fingerprints
+from app.core.sportmonks.fingerprints import InplayFingerprints
+
+
+class _Engine:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def connect(self):
+        rows = self.rows
+
+        class _Conn:
+            def execute(self, *args, **kwargs):
+                return self
+
+            def mappings(self):
+                return self
+
+            def all(self):
+                return rows
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, exc_type, exc, tb):
+                return False
+
+        return _Conn()
+
+
+def _row(fixture_id, minute, starts_at):
+    return {
+        "fixture_id": fixture_id,
+        "updated_at": datetime.now(timezone.utc),
+        "status": "2",
+        "minute": minute,
+        "period": "1",
+        "score_home": 0,
+        "score_away": 1,
+        "starts_at": starts_at,
+        "home_id": 10,
+        "away_id": 20,
+        "league_id": 82,
+        "season_id": 23744,
+    }
+
+
+def test_split_rebuilds_from_state_and_skips_unchanged(monkeypatch):
+    kickoff = datetime(2026, 10, 17, 13, 30, tzinfo=timezone.utc)
+    stored = _row(1, 30, kickoff.astimezone(timezone(timedelta(hours=2))))
+    monkeypatch.setattr(fingerprints, "engine", _Engine([stored]))
+    store = InplayFingerprints()
+
+    changed, unchanged = store.split([_row(1, 30, kickoff), _row(2, 5, kickoff)])
+    assert unchanged == 1
+    assert [r["fixture_id"] for r in changed] == [2]
+
+    changed, unchanged = store.split([_row(2, 5, kickoff)])
+    assert len(changed) == 1 and unchanged == 0
+
+    store.remember(changed)
+    changed, unchanged = store.split([_row(1, 31, kickoff), _row(2, 5, kickoff)])
+    assert [r["fixture_id"] for r in changed] == [1]
+    assert unchanged == 1
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import json
+
+from app.core import invalidation
+from app.core.match_stats import match_stats_cache
+from app.core.snapshots import SCENE_AGGREGATE, snapshot_cache
+from app.core.user_cache import user_status_cache
+
+
+def test_payloads_stay_below_notify_limit():
+    keys = [(invalidation.MATCH_STATS, f"{i:036d}") for i in range(600)]
+    payloads = invalidation.encode_payloads("w1", keys)
+    assert len(payloads) > 1
+    assert all(len(p.encode("utf-8")) < 8000 for p in payloads)
+    decoded = []
+    for payload in payloads:
+        origin, items = invalidation.decode_payload(payload)
+        assert origin == "w1"
+        decoded.extend(items)
+    assert decoded == keys
+
+
+def test_foreign_payload_evicts_local_caches():
+    bus = invalidation.InvalidationBus()
+    user_status_cache.set("u1", {"is_active": True})
+    match_stats_cache.set("m1", {"rating_count": 1})
+    match_stats_cache.set("m2", {"rating_count": 2})
+    snapshot_cache.set((SCENE_AGGREGATE, "s1"), {"content_sha256": "x", "body": b"{}"})
+
+    payload = json.dumps({"o": "other", "k": [
+        [invalidation.USER_STATUS, "u1"],
+        [invalidation.MATCH_STATS, None],
+        [invalidation.SNAPSHOT, f"{SCENE_AGGREGATE}:s1"],
+        ["unknown", "x"],
+    ]})
+    bus.handle_payload(payload)
+
+    assert user_status_cache.get("u1") is None
+    assert match_stats_cache.get("m1") is None and match_stats_cache.get("m2") is None
+    assert snapshot_cache.get((SCENE_AGGREGATE, "s1")) is None
+    assert bus.stats()["received"] == 4
+
+
+def test_own_payload_is_ignored_and_broadcast_needs_running_bus():
+    bus = invalidation.InvalidationBus()
+    user_status_cache.set("u2", {"is_active": True})
+    bus.handle_payload(json.dumps({"o": bus.origin, "k": [[invalidation.USER_STATUS, "u2"]]}))
+    assert user_status_cache.get("u2") == {"is_active": True}
+
+    bus.broadcast(invalidation.USER_STATUS, "u2")
+    assert bus.stats()["pending"] == 0
@@ -0,0 +1,78 @@
+import pytest
+
+from app.core import jobs
+from app.core.jobs import JobAlreadyRunning, JobLease, JobLeaseLost, job_run, lock_id
+
+
+def test_lock_id_is_stable_signed_bigint():
+    assert lock_id("sportmonks:inplay") == lock_id("sportmonks:inplay")
+    assert lock_id("sportmonks:inplay") != lock_id("openligadb:sync")
+    assert -(2 ** 63) <= lock_id("sportmonks:inplay") < 2 ** 63
+
+
+def test_schedule_job_key_per_league_and_season():
+    assert jobs.schedule_sync_job("BL1", "2025_26") == "sportmonks:schedule:BL1:2025_26"
+
+
+def test_job_run_raises_when_lock_is_held_elsewhere(monkeypatch):
+    monkeypatch.setattr(JobLease, "acquire", lambda self: False)
+    with pytest.raises(JobAlreadyRunning) as excinfo:
+        with job_run("sportmonks:inplay"):
+            pytest.fail("body must not run")
+    assert excinfo.value.job_key == "sportmonks:inplay"
+
+
+def test_job_run_records_result_and_errors(monkeypatch):
+    released = []
+    monkeypatch.setattr(JobLease, "acquire", lambda self: True)
+    monkeypatch.setattr(
+        JobLease,
+        "release",
+        lambda self, status="ok", result=None, error=None: released.append((status, result, error)),
+    )
+
+    with job_run("openligadb:sync") as run:
+        run.result = {"inserted": 3}
+    assert released[-1] == ("ok", {"inserted": 3}, None)
+
+    with pytest.raises(ValueError):
+        with job_run("openligadb:sync"):
+            raise ValueError("boom")
+    assert released[-1] == ("error", None, "ValueError: boom")
+
+
+def _fake_acquire(self):
+    self._conn = object()
+    return True
+
+
+def test_lost_lease_aborts_between_batches(monkeypatch):
+    released = []
+    monkeypatch.setattr(JobLease, "acquire", _fake_acquire)
+    monkeypatch.setattr(
+        JobLease,
+        "release",
+        lambda self, status="ok", result=None, error=None: released.append((status, error)),
+    )
+    written = []
+
+    with pytest.raises(JobLeaseLost):
+        with job_run("openligadb:goals") as run:
+            for batch in range(3):
+                run.check()
+                written.append(batch)
+                run.lease.lost = batch == 0
+    assert written == [0]
+    assert released[-1][0] == "error"
+    assert "JobLeaseLost" in released[-1][1]
+
+
+def test_inplay_poll_rejects_lease_that_was_never_acquired(monkeypatch):
+    from app.core import settings
+    from app.core.jobs import INPLAY_POLL
+    from app.core.sportmonks import service
+
+    monkeypatch.setattr(settings, "SPORTMONKS_ENABLED", True)
+    monkeypatch.setattr(service, "_poll_inplay_and_persist", lambda *args: pytest.fail("must not poll"))
+    with pytest.raises(JobLeaseLost):
+        service.poll_inplay_and_persist(client=object(), lease=JobLease(INPLAY_POLL))
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app.core import pagination
+
+
+def test_cursor_roundtrip_is_bound_to_list():
+    ts = datetime(2026, 10, 17, 15, 30, 0, 123456, tzinfo=timezone.utc)
+    token = pagination.encode_cursor("scenes", ts, "00000000-0000-0000-0000-000000000001")
+    assert "=" not in token
+    assert pagination.decode_cursor("scenes", token) == (ts.isoformat(), "00000000-0000-0000-0000-000000000001")
+    with pytest.raises(ValueError):
+        pagination.decode_cursor("matches", token)
+    with pytest.raises(HTTPException):
+        pagination.parse_cursor("scenes", "not-a-cursor")
+    assert pagination.parse_cursor("scenes", None) is None
+
+
+def test_keyset_clause_variants():
+    assert pagination.keyset_clause(None, "created_at", "scene_id") == (None, {})
+
+    clause, params = pagination.keyset_clause(("2026-10-17T15:30:00+00:00", "abc"), "created_at", "rating_id")
+    assert clause == "(created_at, rating_id) < (cast(:cursor_sort as timestamptz), cast(:cursor_id as uuid))"
+    assert params == {"cursor_sort": "2026-10-17T15:30:00+00:00", "cursor_id": "abc"}
+
+    clause, _ = pagination.keyset_clause(("2026-10-17T15:30:00+00:00", "7"), "starts_at", "fixture_id", id_type="bigint", nullable=True)
+    assert clause.endswith("or starts_at is null)")
+
+    clause, _ = pagination.keyset_clause((None, "7"), "starts_at", "fixture_id", id_type="bigint", nullable=True)
+    assert clause == "(starts_at is null and fixture_id < cast(:cursor_id as bigint))"
+
+
+def test_next_cursor_only_for_full_pages():
+    rows = [{"created_at": None, "scene_id": "a"}, {"created_at": None, "scene_id": "b"}]
+    response = Response()
+    assert pagination.set_next_cursor(response, "scenes", rows, 3, "created_at", "scene_id") is None
+    token = pagination.set_next_cursor(response, "scenes", rows, 2, "created_at", "scene_id")
+    assert response.headers[pagination.NEXT_CURSOR_HEADER] == token
+    assert pagination.decode_cursor("scenes", token) == (None, "b")
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+from contextlib import nullcontext
+
+from app.core import aggregates, rating_queue as rq
+
+
+SCENE = "00000000-0000-0000-0000-0000000000aa"
+USER = "00000000-0000-0000-0000-000000000001"
+
+_STATE = {
+    "scene_id": SCENE,
+    "match_id": "00000000-0000-0000-0000-0000000000bb",
+    "is_released": True,
+    "is_locked": False,
+    "team_home": "FCB",
+    "team_away": "BVB",
+}
+
+
+def _params(user_id=USER, **overrides):
+    params = {
+        "scene_id": SCENE,
+        "user_id": user_id,
+        "decision_score": 4,
+        "confidence_score": 3,
+        "perception_channel": "TV",
+        "rule_knowledge": "HIGH",
+        "rating_time_type": "LIVE",
+        "fav_team": None,
+    }
+    params.update(overrides)
+    return params
+
+
+def _queue(monkeypatch, state=_STATE, existing=(), **kwargs):
+    monkeypatch.setattr(rq, "get_scene_state", lambda scene_id: state)
+    queue = rq.RatingQueue(**kwargs)
+    monkeypatch.setattr(queue, "_load_scene_users", lambda scene_id: set(existing))
+    return queue
+
+
+def test_check_scene_state_rules():
+    assert rq.check_scene_state(None, None) == "scene_not_found"
+    assert rq.check_scene_state(dict(_STATE, is_released=False), None) == "not_released"
+    assert rq.check_scene_state(dict(_STATE, is_locked=True), None) == "locked"
+    assert rq.check_scene_state(_STATE, "S04") == "fav_team_mismatch"
+    assert rq.check_scene_state(_STATE, "BVB") is None
+
+
+def test_submit_dedupes_per_scene_and_user(monkeypatch):
+    queue = _queue(monkeypatch, existing={"00000000-0000-0000-0000-000000000009"})
+
+    outcome, rating, result = queue.submit(_params())
+    assert outcome == "queued"
+    assert rating["rating_id"] and rating["created_at"]
+    assert not result.done()
+    assert queue.pending(SCENE, USER)["rating_id"] == rating["rating_id"]
+    assert queue.pending(SCENE, USER)["pending"] is True
+
+    assert queue.submit(_params())[0] == "duplicate"
+    assert queue.submit(_params(user_id="00000000-0000-0000-0000-000000000009"))[0] == "duplicate"
+    assert queue.stats()["depth"] == 1
+    assert queue.stats()["duplicates"] == 2
+
+
+def test_submit_reports_full_queue(monkeypatch):
+    queue = _queue(monkeypatch, max_depth=1)
+    assert queue.submit(_params())[0] == "queued"
+    assert queue.submit(_params(user_id="00000000-0000-0000-0000-000000000002"))[0] == "queue_full"
+
+
+def test_submit_rejects_locked_scene(monkeypatch):
+    queue = _queue(monkeypatch, state=dict(_STATE, is_locked=True))
+    assert queue.submit(_params()) == ("locked", None, None)
+    assert queue.stats()["depth"] == 0
+
+
+def test_next_batch_respects_max_rows(monkeypatch):
+    queue = _queue(monkeypatch, max_rows=2, flush_interval_ms=0)
+    for i in range(3):
+        queue.submit(_params(user_id=f"00000000-0000-0000-0000-00000000001{i}"))
+    assert len(queue._next_batch()) == 2
+    assert len(queue._next_batch()) == 1
+
+
+def test_dropped_batch_reports_error_and_frees_user(monkeypatch):
+    queue = _queue(monkeypatch)
+    _, rating, result = queue.submit(_params())
+    queue._resolve([rating], {})
+    assert result.result(timeout=0) == "error"
+    assert queue.pending(SCENE, USER) is None
+    assert queue.submit(_params())[0] == "queued"
+
+
+def test_written_rating_blocks_further_submits(monkeypatch):
+    queue = _queue(monkeypatch)
+    _, rating, result = queue.submit(_params())
+    queue._resolve([rating], {rating["rating_id"]: "created"})
+    assert result.result(timeout=0) == "created"
+    assert queue.submit(_params())[0] == "duplicate"
+
+
+def test_failed_batch_insert_falls_back_to_single_rows(monkeypatch):
+    queue = _queue(monkeypatch)
+    ratings = [
+        queue.submit(_params(user_id=f"00000000-0000-0000-0000-00000000002{i}"))[1]
+        for i in range(3)
+    ]
+    bad, dup = ratings[1]["rating_id"], ratings[2]["rating_id"]
+
+    def insert_ratings(conn, rows):
+        if any(row["rating_id"] == bad for row in rows):
+            raise RuntimeError("fk violation")
+        return {row["rating_id"] for row in rows if row["rating_id"] != dup}
+
+    class _Conn:
+        def begin_nested(self):
+            return nullcontext()
+
+    monkeypatch.setattr(rq, "insert_ratings", insert_ratings)
+    outcomes = queue._insert(_Conn(), ratings)
+    assert outcomes == {ratings[0]["rating_id"]: "created", dup: "duplicate"}
+
+
+def test_apply_ratings_sums_per_scene():
+    class _Conn:
+        def execute(self, sql, params):
+            self.sql = str(sql)
+            self.params = params
+
+    conn = _Conn()
+    other = "00000000-0000-0000-0000-0000000000cc"
+    rows = [_params(), _params(decision_score=2), _params(scene_id=other)]
+    assert aggregates.apply_ratings(conn, rows) == 2
+
+    index = 0 if conn.params["scene_id_0"] == SCENE else 1
+    assert conn.params[f"rating_count_{index}"] == 2
+    assert conn.params[f"decision_sum_{index}"] == 6
+    assert json.loads(conn.params[f"decision_dist_{index}"]) == {"4": 1, "2": 1}
+    assert json.loads(conn.params[f"channel_dist_{index}"]) == {"TV": 2}
+    assert "{values}" not in conn.sql
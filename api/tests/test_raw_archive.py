@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+
+from app.core.sportmonks.raw_archive import pack_payload, unpack_payload
+
+
+def test_pack_keeps_original_bytes():
+    raw = b'{"data": [{"id": 1, "name": "K\\u00f6ln"}]}'
+    packed = pack_payload(raw)
+
+    assert gzip.decompress(packed["payload_gz"]) == raw
+    assert packed["payload_sha256"] == hashlib.sha256(raw).hexdigest()
+    assert packed["payload_bytes"] == len(raw)
+    assert unpack_payload(packed["payload_gz"]) == {"data": [{"id": 1, "name": "Köln"}]}
+
+
+def test_unpack_falls_back_to_legacy_jsonb():
+    assert unpack_payload(None, {"data": []}) == {"data": []}
+
+
+def test_content_hash_ignores_rate_limit_counters():
+    from app.core.sportmonks.raw_archive import content_sha256
+
+    first = b'{"data":[],"rate_limit":{"resets_in_seconds":3599,"remaining":2999,"requested_entity":"Fixture"}}'
+    second = b'{"data":[],"rate_limit":{"resets_in_seconds":3580,"remaining":2998,"requested_entity":"Fixture"}}'
+    changed = b'{"data":[{"id":1}],"rate_limit":{"resets_in_seconds":3580,"remaining":2998,"requested_entity":"Fixture"}}'
+
+    assert content_sha256(first) == content_sha256(second)
+    assert content_sha256(first) != content_sha256(changed)
+    assert pack_payload(first)["payload_sha256"] != pack_payload(second)["payload_sha256"]
+
+
+def test_partition_name_is_utc_day():
+    from datetime import date
+
+    from app.core.sportmonks.raw_partitions import partition_name
+
+    assert partition_name(date(2026, 10, 17)) == "sportmonks_inplay_raw_p20261017"
+
+
+def test_write_path_never_creates_partitions(monkeypatch):
+    from datetime import datetime, timezone
+
+    from app.core.sportmonks import raw_partitions
+
+    statements = []
+
+    class _Result:
+        def first(self):
+            return (1,)
+
+        def scalar(self):
+            return None
+
+    class _Conn:
+        def execute(self, statement, params=None):
+            statements.append(str(statement).strip().lower())
+            return _Result()
+
+    monkeypatch.setattr(raw_partitions, "_partitioned", None)
+    monkeypatch.setattr(raw_partitions, "_ensured_days", set())
+    ts = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+    raw_partitions.check_partition_for(_Conn(), ts)
+    raw_partitions.check_partition_for(_Conn(), ts)
+
+    assert not any(sql.startswith("create") for sql in statements)
+    # einmal pro Prozess und Tag: Partitionierung + Existenz pruefen
+    assert len(statements) == 2
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from app.core.schema import SchemaRegistry
+
+
+class _Conn:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+
+    def execute(self, *args, **kwargs):
+        self.calls += 1
+        return self
+
+    def all(self):
+        return self.rows
+
+
+def test_registry_introspects_once_until_refresh():
+    conn = _Conn([
+        ("referee_ratings", "scenes", "scene_id"),
+        ("referee_ratings", "scenes", "description"),
+        ("public", "audit_log", "actor_user_id"),
+    ])
+    registry = SchemaRegistry()
+
+    assert registry.has_column("referee_ratings", "scenes", "description", conn)
+    assert not registry.has_column("referee_ratings", "scenes", "created_by", conn)
+    assert registry.has_column("public", "audit_log", "actor_user_id", conn)
+    assert not registry.has_table("referee_ratings", "users", conn)
+    assert conn.calls == 1
+
+    conn.rows = [("referee_ratings", "scenes", "scene_id")]
+    registry.refresh(conn)
+    assert not registry.has_column("referee_ratings", "scenes", "description", conn)
+    assert conn.calls == 2
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timezone
+from uuid import UUID
+
+from app.core import snapshots
+
+
+def test_serialize_is_deterministic():
+    a = snapshots.serialize({"b": 1, "a": {"y": 2, "x": UUID(int=1)}})
+    b = snapshots.serialize({"a": {"x": UUID(int=1), "y": 2}, "b": 1})
+    assert a == b
+    assert a == b'{"a":{"x":"00000000-0000-0000-0000-000000000001","y":2},"b":1}'
+    assert snapshots.serialize({"at": datetime(2024, 10, 1, tzinfo=timezone.utc)}) == b'{"at":"2024-10-01T00:00:00+00:00"}'
+
+
+def test_snapshot_response_headers_and_304():
+    body = b'{"rating_count":3}'
+    sha = hashlib.sha256(body).hexdigest()
+    snapshot = {"content_sha256": sha, "body": body}
+
+    response = snapshots.snapshot_response(snapshot, None, "/api")
+    assert response.status_code == 200
+    assert response.body == body
+    assert response.headers["ETag"] == f'"{sha}"'
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert response.headers["Content-Location"] == f"/api/snapshots/{sha}"
+
+    not_modified = snapshots.snapshot_response(snapshot, f'W/"{sha}"', "/api")
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
+
+
+def test_drop_snapshots_clears_process_cache():
+    class _Conn:
+        params = None
+
+        def __init__(self):
+            self.info = {}
+
+        def execute(self, sql, params):
+            self.params = params
+
+    snapshots.snapshot_cache.set((snapshots.SCENE_AGGREGATE, "s1"), {"content_sha256": "x", "body": b"{}"})
+    conn = _Conn()
+    snapshots.drop_snapshots(conn, snapshots.SCENE_AGGREGATE, ["s1", None, "s1"])
+    assert conn.params == {"resource": snapshots.SCENE_AGGREGATE, "ids": ["s1"]}
+    assert snapshots.snapshot_cache.get((snapshots.SCENE_AGGREGATE, "s1")) is None
+
+    # parallel gelesen, bevor die Transaktion committet war -> nach dem Commit nochmal weg
+    snapshots.snapshot_cache.set((snapshots.SCENE_AGGREGATE, "s1"), {"content_sha256": "x", "body": b"{}"})
+
+    class _Record:
+        info = conn.info
+
+    snapshots._evict_after_commit(None, _Record())
+    assert snapshots.snapshot_cache.get((snapshots.SCENE_AGGREGATE, "s1")) is None
+    assert conn.info == {}
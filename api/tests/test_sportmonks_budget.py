@@ -0,0 +1,83 @@
+import json
+
+import httpx
+import pytest
+
+from app.core.sportmonks import budget as budget_module
+from app.core.sportmonks.budget import (
+    INPLAY,
+    SCHEDULE,
+    SHADOW,
+    BudgetExhausted,
+    RequestBudget,
+    parse_rate_limit,
+)
+from app.core.sportmonks.client import SportMonksClient
+
+
+def _raw(remaining, resets_in=1800, entity="Fixture"):
+    payload = {
+        "data": [{"id": i} for i in range(50)],
+        "rate_limit": {"resets_in_seconds": resets_in, "remaining": remaining, "requested_entity": entity},
+        "timezone": "UTC",
+    }
+    return json.dumps(payload).encode()
+
+
+def test_parse_rate_limit_reads_tail_only_object():
+    assert parse_rate_limit(_raw(42)) == {"resets_in_seconds": 1800, "remaining": 42, "requested_entity": "Fixture"}
+    assert parse_rate_limit(b'{"data": []}') is None
+
+
+def test_unknown_budget_lets_everything_through():
+    budget = RequestBudget()
+    assert budget.check("livescores/inplay", SHADOW) == 0.0
+
+
+def test_low_budget_is_reserved_for_inplay(monkeypatch):
+    monkeypatch.setitem(budget_module.RESERVES, SCHEDULE, 10)
+    monkeypatch.setitem(budget_module.RESERVES, SHADOW, 100)
+    budget = RequestBudget()
+    budget.observe("livescores/inplay", _raw(50))
+    budget.observe("fixtures", _raw(50))
+
+    with pytest.raises(BudgetExhausted) as excinfo:
+        budget.check("livescores/inplay", SHADOW)
+    assert excinfo.value.entity == "Fixture"
+    assert excinfo.value.retry_after > 1000
+    assert budget.check("fixtures", SCHEDULE) == 0.0
+    assert budget.check("livescores/inplay", INPLAY) == 0.0
+
+    stats = budget.stats()
+    # vorgemerkte Requests zaehlen sofort
+    assert stats["entities"]["Fixture"]["remaining"] == 48
+    assert stats["shed"]["shadow"] == 1
+    assert stats["requests"] == {"inplay": 1, "schedule": 1, "shadow": 0}
+
+
+def test_reset_close_by_delays_instead_of_shedding(monkeypatch):
+    monkeypatch.setitem(budget_module.RESERVES, SCHEDULE, 10)
+    budget = RequestBudget()
+    budget.observe("fixtures", _raw(3, resets_in=5))
+    assert 0 < budget.check("fixtures", SCHEDULE) <= 5
+    assert budget.stats()["delayed"]["schedule"] == 1
+
+
+def test_client_feeds_budget_and_sheds_shadow_calls():
+    budget = RequestBudget()
+    client = SportMonksClient(
+        "token",
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=_raw(2))),
+        budget=budget,
+    )
+    try:
+        client.get_livescores_inplay_raw("participants")
+        with pytest.raises(BudgetExhausted):
+            client.get("livescores/inplay", "/livescores/inplay", priority=SHADOW)
+        client.get_livescores_inplay_raw("participants")
+    finally:
+        client.close()
+    stats = budget.stats()
+    assert stats["endpoints"] == {"livescores/inplay": "Fixture"}
+    assert stats["requests"]["inplay"] == 2
+    assert stats["shed"]["shadow"] == 1
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import threading
+
+import httpx
+import pytest
+
+from app.core.sportmonks.budget import RequestBudget
+from app.core.sportmonks.client import SportMonksClient
+
+
+def _client(handler, **kwargs):
+    kwargs.setdefault("budget", RequestBudget())
+    return SportMonksClient("token", transport=httpx.MockTransport(handler), **kwargs)
+
+
+def test_requests_share_one_client_and_record_endpoint_stats():
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, content=json.dumps({"data": []}).encode())
+
+    client = _client(handler)
+    try:
+        assert client.get_livescores_inplay("participants") == {"data": []}
+        client.get_livescores_inplay_raw("participants")
+        client.get_league_schedule_raw(82, 25646, include="participants")
+        stats = client.stats()
+    finally:
+        client.close()
+
+    assert [r.url.path for r in seen] == ["/v3/football/livescores/inplay"] * 2 + ["/v3/football/fixtures"]
+    assert all(r.url.params["api_token"] == "token" for r in seen)
+    inplay = stats["endpoints"]["livescores/inplay"]
+    assert inplay["requests"] == 2
+    assert inplay["errors"] == 0
+    assert inplay["bytes"] == 2 * len(b'{"data": []}')
+    assert stats["endpoints"]["fixtures"]["requests"] == 1
+    assert stats["open"] is True
+    assert client.stats()["open"] is False
+
+
+def test_http_errors_raise_and_count():
+    client = _client(lambda request: httpx.Response(429, content=b"slow down"))
+    try:
+        with pytest.raises(RuntimeError):
+            client.get_team_schedule_raw(1)
+        assert client.stats()["endpoints"]["schedules/teams"]["errors"] == 1
+    finally:
+        client.close()
+
+
+def test_concurrency_is_bounded():
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    async def handler(request):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        with lock:
+            active -= 1
+        return httpx.Response(200, content=b"{}")
+
+    client = _client(handler, max_concurrency=2)
+
+    async def burst():
+        await asyncio.gather(*(client.aget("fixtures", "/fixtures") for _ in range(6)))
+
+    try:
+        asyncio.run(burst())
+    finally:
+        client.close()
+    assert peak == 2
+    assert client.stats()["endpoints"]["fixtures"]["requests"] == 6
+
+
+def _page_response(request, last_page, per_page=2, **extra):
+    number = int(request.url.params.get("page", 1))
+    data = [{"id": number * 100 + i} for i in range(per_page)] if number <= last_page else []
+    body = {
+        "data": data,
+        "pagination": {"count": len(data), "per_page": per_page, "current_page": number, "has_more": number < last_page},
+        **extra,
+    }
+    return httpx.Response(200, content=json.dumps(body).encode())
+
+
+def test_iter_pages_fetches_follow_up_pages_concurrently():
+    requested = []
+
+    def handler(request):
+        requested.append(int(request.url.params["page"]))
+        return _page_response(request, last_page=5)
+
+    client = _client(handler)
+    try:
+        pages = list(client.iter_pages("fixtures", "/fixtures", {"per_page": 2}, concurrency=3))
+        ids = sorted(item["id"] for item in client.iter_data("fixtures", "/fixtures", max_pages=2))
+    finally:
+        client.close()
+
+    assert sorted(page.number for page in pages) == [1, 2, 3, 4, 5]
+    assert pages[0].number == 1
+    # hoechstens concurrency-1 leere Seiten hinter dem Ende
+    assert max(requested) <= 5 + 2
+    assert ids == [100, 101, 200, 201]
+
+
+def test_iter_pages_retries_rate_limited_pages(monkeypatch):
+    from app.core.sportmonks import client as client_module
+
+    monkeypatch.setattr(client_module, "RETRY_BASE_SECONDS", 0.001)
+    calls = {"page2": 0}
+
+    def handler(request):
+        if request.url.params["page"] == "2":
+            calls["page2"] += 1
+            if calls["page2"] == 1:
+                return httpx.Response(429, headers={"Retry-After": "0"}, content=b"{}")
+            if calls["page2"] == 2:
+                return httpx.Response(502, content=b"bad gateway")
+        return _page_response(request, last_page=2)
+
+    client = _client(handler)
+    try:
+        pages = list(client.iter_pages("fixtures", "/fixtures"))
+        stats = client.stats()
+    finally:
+        client.close()
+
+    assert sorted(page.number for page in pages) == [1, 2]
+    assert calls["page2"] == 3
+    assert stats["retries"] == 2
+    assert stats["rate_limit_pauses"] == 1
+
+
+def test_iter_pages_gives_up_on_client_errors():
+    client = _client(lambda request: httpx.Response(403, content=b'{"message": "no access"}'))
+    try:
+        with pytest.raises(RuntimeError, match="403"):
+            list(client.iter_pages("seasons", "/seasons"))
+        assert client.stats()["endpoints"]["seasons"]["requests"] == 1
+    finally:
+        client.close()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from app.core.sportmonks.inplay_repository import build_inplay_state_rows
+from app.core.sportmonks.mapper import map_fixture_to_match
+from app.core.sportmonks.profiles import (
+    INPLAY_FULL,
+    INPLAY_STATE,
+    SCHEDULE,
+    apply_profile,
+    compare_profiles,
+    get_profile,
+    parse_include,
+)
+
+
+def _recorded_inplay():
+    fixture_path = Path(__file__).resolve().parent / "fixtures" / "sportmonks" / "inplay_example.json"
+    return json.loads(fixture_path.read_text(encoding="utf-8"))
+
+
+def test_profile_params():
+    assert INPLAY_FULL.params() == {"include": "participants;scores;periods;events;league.country;round"}
+    assert INPLAY_STATE.params()["select"].startswith("name,starting_at")
+    with pytest.raises(ValueError):
+        get_profile("everything")
+
+
+def test_parse_include_nested_and_field_lists():
+    tree = parse_include("participants:name;league.country;scores:score,description")
+    assert tree["participants"]["fields"] == {"name"}
+    assert tree["league"]["fields"] is None
+    assert "country" in tree["league"]["children"]
+    assert tree["scores"]["fields"] == {"score", "description"}
+
+
+def test_inplay_state_profile_keeps_everything_the_poll_reads():
+    payload = _recorded_inplay()
+    trimmed = apply_profile(payload, INPLAY_STATE)
+    fetched_at = datetime(2025, 10, 4, 14, 0, tzinfo=timezone.utc)
+
+    assert build_inplay_state_rows(trimmed, fetched_at) == build_inplay_state_rows(payload, fetched_at)
+    assert [map_fixture_to_match(f) for f in trimmed["data"]] == [map_fixture_to_match(f) for f in payload["data"]]
+    fixture = trimmed["data"][0]
+    assert "events" not in fixture and "league" not in fixture
+    assert fixture["participants"][0]["meta"]["location"] == "home"
+    assert fixture["scores"][0]["score"] == {"goals": 1, "participant": "home"}
+    # Metadaten der Antwort bleiben
+    assert trimmed["rate_limit"] == payload["rate_limit"]
+
+
+def test_compare_profiles_reports_savings():
+    rows = {row["profile"]: row for row in compare_profiles(_recorded_inplay())}
+    assert rows["inplay-full"]["saved_pct"] == 0.0
+    assert rows["inplay-state"]["bytes"] < rows["inplay-full"]["bytes"]
+    assert rows[SCHEDULE.name]["saved_pct"] > rows["inplay-state"]["saved_pct"] > 0
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from app.core import user_cache
+
+
+class _CountingEngine:
+    def __init__(self, row):
+        self.row = row
+        self.calls = 0
+
+    def connect(self):
+        engine = self
+
+        class _Conn:
+            def execute(self, *args, **kwargs):
+                engine.calls += 1
+                return self
+
+            def mappings(self):
+                return self
+
+            def first(self):
+                return engine.row
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, exc_type, exc, tb):
+                return False
+
+        return _Conn()
+
+
+def test_user_status_cached_until_invalidated(monkeypatch):
+    engine = _CountingEngine({"is_active": True, "is_admin": False, "email_verified": True})
+    monkeypatch.setattr(user_cache, "engine", engine)
+    user_cache.invalidate_user_status()
+    uid = "00000000-0000-0000-0000-000000000001"
+
+    assert user_cache.get_user_status(uid)["is_active"] is True
+    assert user_cache.get_user_status(uid)["is_admin"] is False
+    assert engine.calls == 1
+
+    engine.row = {"is_active": False, "is_admin": False, "email_verified": True}
+    user_cache.invalidate_user_status(uid)
+    assert user_cache.get_user_status(uid)["is_active"] is False
+    assert engine.calls == 2
+
+
+def test_unknown_user_not_cached(monkeypatch):
+    engine = _CountingEngine(None)
+    monkeypatch.setattr(user_cache, "engine", engine)
+    user_cache.invalidate_user_status()
+    uid = "00000000-0000-0000-0000-000000000002"
+
+    assert user_cache.get_user_status(uid) is None
+    assert user_cache.get_user_status(uid) is None
+    assert engine.calls == 2
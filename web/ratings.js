@@ -188,6 +188,8 @@ const matchCache = {};
 const allMatches = [];
 const sceneCache = {};
 let scenesLoadedMatchId = "";
+const myRatedScenes = new Set();
+let myRatedMatchId = "";
 let currentTab = "match";
 const matchVoteCountCache = {};
 
@@ -547,6 +549,7 @@ async function initRatePage() {
   await loadScenesByMatch(matchId);
   updateRateHeader(matchId);
   showTab("scene");
+  watchRatePage(matchId);
 }
 
 async function loadMatchesForRate() {
@@ -632,6 +635,7 @@ function renderMatchList(list) {
     return;
   }
 
+  const voteTargets = new Map();
   for (const m of list) {
     const btn = document.createElement("div");
     btn.className = "match-card";
@@ -672,7 +676,7 @@ function renderMatchList(list) {
     statLink.setAttribute("title", "Statistik");
     if (matchId) {
       statLink.href = `/match-stats.html?match_id=${encodeURIComponent(matchId)}`;
-      loadMatchVoteCount(matchId, statLink);
+      voteTargets.set(matchId, statLink);
     } else {
       statLink.href = "#";
       statLink.setAttribute("aria-disabled", "true");
@@ -688,44 +692,48 @@ function renderMatchList(list) {
   listEl.appendChild(btn);
   }
 
+  loadMatchVoteCounts(voteTargets);
   updateMatchListActive(document.getElementById("matchesSelect")?.value || "");
 }
 
-async function loadMatchVoteCount(matchId, targetEl) {
-  if (!matchId || !targetEl) return;
-  if (matchVoteCountCache[matchId] != null) {
-    const cached = matchVoteCountCache[matchId];
-    const countEl = targetEl.querySelector(".stat-count");
-    if (countEl) countEl.textContent = String(cached);
-    return;
-  }
+function setMatchVoteCount(targetEl, count) {
+  const countEl = targetEl.querySelector(".stat-count");
+  if (countEl) countEl.textContent = String(count);
+}
 
-  let total = 0;
-  try {
-    const scenesUrl = `/scenes?match_id=${encodeURIComponent(matchId)}&limit=500&offset=0`;
-    let r = await apiFetch(scenesUrl);
-    let list = normalizeList(r.data);
-    if (!list || list.length === 0) {
-      const fallback = await apiFetch(`/scenes?limit=500&offset=0`);
-      const allList = normalizeList(fallback.data);
-      if (allList) {
-        list = allList.filter(s => String(s.match_id) === String(matchId));
-      }
+const VOTE_COUNTS_BATCH_SIZE = 200;
+
+async function loadMatchVoteCounts(targets) {
+  const missing = [];
+  for (const [matchId, targetEl] of targets) {
+    if (matchVoteCountCache[matchId] != null) {
+      setMatchVoteCount(targetEl, matchVoteCountCache[matchId]);
+    } else {
+      missing.push(matchId);
     }
-    if (list && list.length) {
-      const ids = list.map(s => s.scene_id).filter(Boolean);
-      const results = await Promise.all(ids.map(id => apiFetch(`/ratings?scene_id=${encodeURIComponent(id)}`)));
-      for (const res of results) {
-        const arr = Array.isArray(res.data) ? res.data : [];
-        total += arr.length;
-      }
+  }
+  if (!missing.length) return;
+
+  // API nimmt max. VOTE_COUNTS_BATCH_SIZE IDs pro Request (sonst 400)
+  const batches = [];
+  for (let i = 0; i < missing.length; i += VOTE_COUNTS_BATCH_SIZE) {
+    batches.push(missing.slice(i, i + VOTE_COUNTS_BATCH_SIZE));
+  }
+  const counts = {};
+  await Promise.all(batches.map(async (batch) => {
+    try {
+      const r = await apiFetch(`/matches/vote-counts?match_ids=${batch.map(encodeURIComponent).join(",")}`);
+      if (r.res.ok && r.data && typeof r.data === "object") Object.assign(counts, r.data);
+    } catch (e) {
+      // Batch ohne Zahlen -> 0 wie bisher
     }
-  } catch (e) {
-    total = 0;
+  }));
+  for (const matchId of missing) {
+    const total = Number(counts[matchId] || 0);
+    matchVoteCountCache[matchId] = total;
+    const targetEl = targets.get(matchId);
+    if (targetEl) setMatchVoteCount(targetEl, total);
   }
-  matchVoteCountCache[matchId] = total;
-  const countEl = targetEl.querySelector(".stat-count");
-  if (countEl) countEl.textContent = String(total);
 }
 
 async function loadScenesForMatchStats(matchId) {
@@ -802,6 +810,7 @@ async function initMatchStatsPage() {
 
   await loadScenesForMatchStats(matchId);
   await loadMatchRatingsSummary();
+  watchMatchStatsPage(matchId);
 }
 
 function updateSceneListActive(sceneId) {
@@ -1140,6 +1149,29 @@ async function loadMatches() {
   await applyMatchFilters();
 }
 
+async function loadMyRatingsForMatch(matchId) {
+  // Ein Request pro Match statt /ratings/me/{scene_id} pro Szene
+  myRatedScenes.clear();
+  myRatedMatchId = "";
+  if (!matchId) return;
+  try {
+    const r = await apiFetch(`/ratings/me?match_id=${encodeURIComponent(matchId)}`);
+    if (!r.res.ok || !Array.isArray(r.data)) return;
+    for (const rating of r.data) myRatedScenes.add(String(rating.scene_id));
+    myRatedMatchId = String(matchId);
+  } catch (e) {
+    myRatedMatchId = "";
+  }
+}
+
+async function hasRatedScene(matchId, sceneId) {
+  if (myRatedMatchId && myRatedMatchId === String(matchId)) {
+    return myRatedScenes.has(String(sceneId));
+  }
+  const r = await apiFetch(`/ratings/me/${encodeURIComponent(sceneId)}`);
+  return Boolean(r.res && r.res.status === 200);
+}
+
 async function loadScenesByMatch(matchId) {
   const sel = document.getElementById("scenesSelect");
   sel.innerHTML = "";
@@ -1207,6 +1239,7 @@ async function loadScenesByMatch(matchId) {
   }
 
   if (list.length) {
+    await loadMyRatingsForMatch(matchId);
     document.getElementById("manualSceneId").value = "";
     setSceneHeader(matchId, null);
     setAggregateStars(null, null, 0);
@@ -1303,8 +1336,7 @@ async function onSceneChanged(sceneIdOverride = "") {
   updateTabs();
   updateSceneListActive(sceneId);
   if (matchId && sceneId) {
-    const r = await apiFetch(`/ratings/me/${encodeURIComponent(sceneId)}`);
-    if (r.res && r.res.status === 200) {
+    if (await hasRatedScene(matchId, sceneId)) {
       if (notice) {
         notice.textContent = "Du hast diese Szene bereits bewertet.";
         notice.style.display = "block";
@@ -1590,6 +1622,7 @@ async function sendRating() {
       body: JSON.stringify(body)
     });
     if (r.res.status === 201 || r.res.status === 200) {
+      myRatedScenes.add(String(scene_id));
       logOut("ratingOut", "Bewertung gespeichert.");
       await loadAggregate();
       showTab("scene");
@@ -1706,74 +1739,27 @@ async function loadMatchRatingsSummary() {
   let totalRatings = 0;
   let ratedScenes = 0;
 
-  const sceneRows = [];
-
   const box = document.getElementById("matchSummaryBox");
   box.style.display = "block";
   document.getElementById("sumTotalRatings").textContent = "l\u00e4dt...";
   document.getElementById("sumRatedScenes").textContent = "";
 
-  for (const s of scenes) {
-    try {
-      const r = await apiFetch(`/ratings?scene_id=${encodeURIComponent(s.scene_id)}`);
-      const list = Array.isArray(r.data) ? r.data : [];
-      const cnt = list.length;
-
-      if (cnt > 0) ratedScenes++;
-      totalRatings += cnt;
-
-      const d = { "1":0,"2":0,"3":0,"4":0,"5":0 };
-      const c = { "1":0,"2":0,"3":0,"4":0,"5":0 };
-      const ch = {};
-      const tt = {};
-
-      for (const it of list) {
-        const ds = String(it.decision_score);
-        const cs = String(it.confidence_score);
-        if (d[ds] != null) d[ds] += 1;
-        if (c[cs] != null) c[cs] += 1;
-
-        const pch = it.perception_channel || "UNKNOWN";
-        const rtt = it.rating_time_type || "UNKNOWN";
-        ch[pch] = (ch[pch] || 0) + 1;
-        tt[rtt] = (tt[rtt] || 0) + 1;
-      }
-
-      mergeDist(decisionDist, d);
-      mergeDist(confidenceDist, c);
-      mergeDist(channelDist, ch);
-      mergeDist(timeDist, tt);
-
-      const avgD = cnt ? list.reduce((a,x)=>a+safeNum(x.decision_score),0)/cnt : null;
-      const avgC = cnt ? list.reduce((a,x)=>a+safeNum(x.confidence_score),0)/cnt : null;
-
-      const sceneDesc = getSceneDescription(s) || "";
-      sceneRows.push({
-        scene_id: s.scene_id,
-        minute: `${s.minute}${s.stoppage_time ? "+" + s.stoppage_time : ""}`,
-        scene_type: getSceneTypeLabel(s),
-        description: sceneDesc.slice(0, 90) + (sceneDesc.length > 90 ? "..." : ""),
-        rating_count: cnt,
-        avg_decision: avgD,
-        avg_confidence: avgC
-      });
-
-    } catch (e) {
-      const sceneDesc = getSceneDescription(s) || "";
-      sceneRows.push({
-        scene_id: s.scene_id,
-        minute: `${s.minute}${s.stoppage_time ? "+" + s.stoppage_time : ""}`,
-        scene_type: getSceneTypeLabel(s),
-        description: sceneDesc.slice(0, 90) + (sceneDesc.length > 90 ? "..." : ""),
-        rating_count: 0,
-        avg_decision: null,
-        avg_confidence: null
-      });
+  // Ein Request statt /ratings?scene_id=... pro Szene (Server aggregiert).
+  try {
+    const r = await apiFetch(`/matches/${encodeURIComponent(matchId)}/stats`);
+    if (r.res && r.res.status === 200 && r.data && typeof r.data === "object") {
+      totalRatings = safeNum(r.data.rating_count);
+      ratedScenes = safeNum(r.data.rated_scene_count);
+      mergeDist(decisionDist, r.data.decision_dist);
+      mergeDist(confidenceDist, r.data.confidence_dist);
+      mergeDist(channelDist, r.data.channel_dist);
+      mergeDist(timeDist, r.data.time_type_dist);
     }
+  } catch (e) {
+    totalRatings = 0;
+    ratedScenes = 0;
   }
 
-  sceneRows.sort((a,b) => (b.rating_count - a.rating_count));
-
   const avgDecision = calcAvgFromDist(decisionDist);
   const avgConfidence = calcAvgFromDist(confidenceDist);
 
@@ -1805,6 +1791,105 @@ async function loadMatchRatingsSummary() {
   // Scene table removed in favor of a jump button for mobile UX.
 }
 
+// Live-Updates per SSE (/matches/{id}/stream) statt Polling. fetch statt EventSource,
+// damit der Bearer-Token mitgeht; Reconnect mit Backoff, danach einmal neu laden.
+let matchStreamController = null;
+
+function parseSseBlock(block) {
+  let event = "message";
+  const data = [];
+  for (const line of block.split("\n")) {
+    if (line.startsWith("event:")) event = line.slice(6).trim();
+    else if (line.startsWith("data:")) data.push(line.slice(5).trim());
+  }
+  if (!data.length) return null;
+  try { return { event, data: JSON.parse(data.join("\n")) }; } catch { return null; }
+}
+
+function subscribeMatchStream(matchId, onEvent) {
+  if (matchStreamController) matchStreamController.abort();
+  if (!matchId || typeof ReadableStream === "undefined") return;
+  const controller = new AbortController();
+  matchStreamController = controller;
+  let delay = 2000;
+
+  const connect = async () => {
+    const headers = new Headers({ "Accept": "text/event-stream" });
+    const token = getAccessToken();
+    if (token) headers.set("Authorization", `Bearer ${token}`);
+    try {
+      const url = normalizeBase(getApiBase()) + `/matches/${encodeURIComponent(matchId)}/stream`;
+      const res = await fetch(url, { headers, signal: controller.signal, cache: "no-store" });
+      if (res.status === 401 || res.status === 403) return;
+      if (!res.ok || !res.body) throw new Error(`stream ${res.status}`);
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      delay = 2000;
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let idx;
+        while ((idx = buffer.indexOf("\n\n")) >= 0) {
+          const msg = parseSseBlock(buffer.slice(0, idx));
+          buffer = buffer.slice(idx + 2);
+          if (msg) onEvent(msg.event, msg.data);
+        }
+      }
+    } catch (e) {
+      if (controller.signal.aborted) return;
+    }
+    if (controller.signal.aborted) return;
+    // Verbindung weg: Events koennen verpasst sein -> nach dem Reconnect neu laden
+    setTimeout(() => { onEvent("resync", {}); connect(); }, delay);
+    delay = Math.min(delay * 2, 60000);
+  };
+  connect();
+}
+
+function debounce(fn, ms) {
+  let timer = null;
+  return () => {
+    clearTimeout(timer);
+    timer = setTimeout(fn, ms);
+  };
+}
+
+async function reloadScenesKeepingSelection(matchId) {
+  const sceneId = document.getElementById("scenesSelect")?.value || "";
+  await loadScenesByMatch(matchId);
+  if (sceneId && sceneId !== "__all__" && sceneCache[sceneId]) {
+    await onSceneChanged(sceneId);
+  }
+}
+
+function watchRatePage(matchId) {
+  const reloadScenes = debounce(() => reloadScenesKeepingSelection(matchId), 300);
+  subscribeMatchStream(matchId, (event, data) => {
+    if (event === "aggregate_updated") {
+      const sid = document.getElementById("manualSceneId").value.trim() || document.getElementById("scenesSelect")?.value || "";
+      if (data && String(data.scene_id) === sid) {
+        setAggregateStars(data.avg_decision, data.avg_confidence, data.rating_count);
+      }
+      return;
+    }
+    if (event.startsWith("scene_") || event === "resync") reloadScenes();
+  });
+}
+
+function watchMatchStatsPage(matchId) {
+  const reloadSummary = debounce(() => loadMatchRatingsSummary(), 500);
+  const reloadScenes = debounce(async () => {
+    await loadScenesForMatchStats(matchId);
+    await loadMatchRatingsSummary();
+  }, 300);
+  subscribeMatchStream(matchId, (event) => {
+    if (event === "aggregate_updated") reloadSummary();
+    else if (event.startsWith("scene_") || event === "resync") reloadScenes();
+  });
+}
+
 function init() {
   const page = document.body?.dataset?.page || "";
   if (page === "ratings") {